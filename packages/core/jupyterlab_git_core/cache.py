@@ -0,0 +1,61 @@
+"""
+In-memory caches used to avoid recomputing git results that cannot change
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class LRUCache:
+    """Mapping keeping at most ``maxsize`` entries, evicting the least recently used.
+
+    If ``maxbytes`` is set, the entries are also evicted once the sum of their
+    sizes (as provided to ``put``) exceeds it.
+    """
+
+    def __init__(self, maxsize: int = 128, maxbytes: Optional[int] = None):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.nbytes = 0
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the value for ``key`` and mark it as recently used."""
+        try:
+            self._data.move_to_end(key)
+        except KeyError:
+            return default
+        return self._data[key]
+
+    def put(self, key: Hashable, value: Any, nbytes: int = 0) -> None:
+        """Store ``value`` of size ``nbytes`` for ``key``, evicting old entries if needed.
+
+        A value larger than ``maxbytes`` is not stored.
+        """
+        self.pop(key)
+        if self.maxbytes is not None and nbytes > self.maxbytes:
+            return
+        self._data[key] = value
+        self._sizes[key] = nbytes
+        self.nbytes += nbytes
+        while len(self._data) > self.maxsize or (
+            self.maxbytes is not None and self.nbytes > self.maxbytes
+        ):
+            evicted, _ = self._data.popitem(last=False)
+            self.nbytes -= self._sizes.pop(evicted)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        self.nbytes -= self._sizes.pop(key, 0)
+        return self._data.pop(key, default)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._sizes.clear()
+        self.nbytes = 0
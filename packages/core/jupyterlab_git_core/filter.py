@@ -0,0 +1,149 @@
+"""
+Git filter stripping the notebook outputs from the blobs added to the index.
+
+git starts ``python -m jupyterlab_git_core.filter`` once per command and
+exchanges the files with it using the long-running filter protocol; see
+``filter.<driver>.process`` in gitattributes(5). The working tree files are
+left untouched.
+
+This module only depends on the standard library to start quickly.
+"""
+
+import json
+import sys
+from typing import BinaryIO, List, Optional
+
+# Name of the filter driver in the git configuration and attributes
+FILTER_DRIVER = "jupyterlab-git-outputs"
+# Maximal size of the data of a packet
+PKT_MAX_DATA = 65516
+# Metadata removed from the code cells, as nbconvert ClearOutputPreprocessor does
+CLEARED_METADATA = ("collapsed", "scrolled")
+
+
+def clear_cell_outputs(nb: dict) -> bool:
+    """Clear the outputs, execution counts and display metadata of the code cells.
+
+    Returns:
+        Whether the notebook was modified
+    """
+    modified = False
+    for cell in nb.get("cells", []):
+        if cell.get("cell_type") != "code":
+            continue
+        if cell.get("outputs") or cell.get("execution_count") is not None:
+            cell["outputs"] = []
+            cell["execution_count"] = None
+            modified = True
+        for field in CLEARED_METADATA:
+            if cell.get("metadata", {}).pop(field, None) is not None:
+                modified = True
+    return modified
+
+
+def clean_notebook(content: bytes) -> bytes:
+    """Strip the outputs of a notebook content.
+
+    The content is returned as is if it is not a notebook or has no outputs;
+    otherwise it is serialized like nbformat does.
+    """
+    try:
+        nb = json.loads(content)
+    except ValueError:
+        return content
+    if not isinstance(nb, dict) or not clear_cell_outputs(nb):
+        return content
+    return (json.dumps(nb, sort_keys=True, indent=1, ensure_ascii=False) + "\n").encode(
+        "utf-8"
+    )
+
+
+def read_packet(stream: BinaryIO) -> Optional[bytes]:
+    """Read a packet; None is returned for a flush packet.
+
+    Raises:
+        EOFError: if the stream is closed
+    """
+    header = stream.read(4)
+    if not header:
+        raise EOFError()
+    size = int(header, 16)
+    if size == 0:
+        return None
+    return stream.read(size - 4)
+
+
+def read_text(stream: BinaryIO) -> List[str]:
+    """Read text packets up to a flush packet."""
+    lines = []
+    while True:
+        packet = read_packet(stream)
+        if packet is None:
+            return lines
+        lines.append(packet.decode("utf-8").rstrip("\n"))
+
+
+def read_content(stream: BinaryIO) -> bytes:
+    """Read data packets up to a flush packet."""
+    chunks = []
+    while True:
+        packet = read_packet(stream)
+        if packet is None:
+            return b"".join(chunks)
+        chunks.append(packet)
+
+
+def write_packet(stream: BinaryIO, data: Optional[bytes]) -> None:
+    """Write a packet; None writes a flush packet."""
+    if data is None:
+        stream.write(b"0000")
+    else:
+        stream.write(b"%04x" % (len(data) + 4) + data)
+
+
+def write_text(stream: BinaryIO, *lines: str) -> None:
+    """Write text packets followed by a flush packet."""
+    for line in lines:
+        write_packet(stream, f"{line}\n".encode("utf-8"))
+    write_packet(stream, None)
+    stream.flush()
+
+
+def write_content(stream: BinaryIO, content: bytes) -> None:
+    """Write data packets followed by a flush packet."""
+    for start in range(0, len(content), PKT_MAX_DATA):
+        write_packet(stream, content[start : start + PKT_MAX_DATA])
+    write_packet(stream, None)
+    stream.flush()
+
+
+def run(stdin: BinaryIO, stdout: BinaryIO) -> None:
+    """Serve the clean requests of git until it closes the stream."""
+    if read_text(stdin) != ["git-filter-client", "version=2"]:
+        raise ValueError("Unsupported filter protocol")
+    write_text(stdout, "git-filter-server", "version=2")
+    capabilities = read_text(stdin)
+    write_text(stdout, *(c for c in capabilities if c == "capability=clean"))
+
+    while True:
+        try:
+            request = read_text(stdin)
+        except EOFError:
+            return
+        content = read_content(stdin)
+        if "command=clean" not in request:
+            write_text(stdout, "status=error")
+            continue
+        try:
+            content = clean_notebook(content)
+        except Exception:
+            write_text(stdout, "status=error")
+            continue
+        write_text(stdout, "status=success")
+        write_content(stdout, content)
+        # Keep the status
+        write_text(stdout)
+
+
+if __name__ == "__main__":
+    run(sys.stdin.buffer, sys.stdout.buffer)
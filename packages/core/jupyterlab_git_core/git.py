@@ -4,20 +4,25 @@ Module for executing git commands, sending results back to the handlers
 
 import anyio
 import base64
+import functools
+import hashlib
+import json
 import os
 import pathlib
 import re
 import shlex
 import shutil
 import subprocess
+import sys
+import tempfile
 import traceback
 from enum import Enum, IntEnum
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
 from urllib.parse import unquote
 
-import nbformat
 import pexpect
+from anyio.streams.buffered import BufferedByteReceiveStream
 from inspect import isawaitable
 
 try:
@@ -26,7 +31,36 @@ except ImportError:
     diff_notebooks = None
     merge_notebooks = None
 
+from .cache import LRUCache
+from .filter import FILTER_DRIVER
+from .history import (
+    HISTORY_INDEX_FILE,
+    HISTORY_LOG_FORMAT,
+    HistoryIndex,
+    parse_history_log,
+    relative_date,
+)
 from .log import get_logger
+from .refs import (
+    REFTABLE_HEAD,
+    RefsIndex,
+    config_files,
+    config_fingerprint,
+    find_git_dirs,
+    for_each_ref_command,
+    merge_refs,
+    parse_config,
+    parse_refs,
+    read_head,
+    refs_fingerprint,
+)
+from .notebook import (
+    NotebookPool,
+    clear_notebook_outputs,
+    diff_notebook_contents,
+    merge_notebook_contents,
+    scan_blob_outputs,
+)
 
 # Regex pattern to capture (key, value) of Git configuration options.
 # See https://git-scm.com/docs/git-config#_syntax for git var syntax
@@ -34,6 +68,56 @@ CONFIG_PATTERN = re.compile(r"(?:^|\n)([\w\-\.]+)\=")
 DEFAULT_REMOTE_NAME = "origin"
 # Maximum number of character of command output to print in debug log
 MAX_LOG_OUTPUT = 500  # type: int
+# Default number of candidate files above which only exact renames are detected
+RENAME_LIMIT = 1000
+# Default time in seconds after which a diff is computed without rename detection
+RENAME_TIMEOUT = 10.0
+# Maximal number of changed files lists kept in memory
+CHANGED_FILES_CACHE_SIZE = 128
+# Maximal number of single file histories kept in memory
+FOLLOW_CACHE_SIZE = 128
+# Maximal number of file line attributions kept in memory
+BLAME_CACHE_SIZE = 32
+# Maximal number of parsed detailed logs kept in memory; a commit may list many files
+DETAILED_LOG_CACHE_SIZE = 8
+# Maximal number and total size (in characters) of the blob contents kept in memory
+CONTENT_CACHE_SIZE = 256
+CONTENT_CACHE_BYTES = 64 * 1024 * 1024
+# Maximal number and total size (in bytes of JSON) of the notebook diffs kept in memory
+NBDIFF_CACHE_SIZE = 64
+NBDIFF_CACHE_BYTES = 64 * 1024 * 1024
+# Attributes applying the output stripping filter to the notebooks
+OUTPUT_FILTER_ATTRIBUTES = f"*.ipynb filter={FILTER_DRIVER}"
+# Extensions of the text files jupytext may pair with a notebook
+JUPYTEXT_EXTENSIONS = (
+    ".py",
+    ".pct.py",
+    ".lgt.py",
+    ".md",
+    ".myst.md",
+    ".Rmd",
+    ".qmd",
+    ".R",
+    ".jl",
+)
+# Size of the beginning of a text file searched for the jupytext header
+JUPYTEXT_HEADER_SIZE = 4096
+# Formats listed in the jupytext header of a paired text file
+JUPYTEXT_FORMATS = re.compile(r"^[#\s]*formats:\s*['\"]?([^\s'\"]+)", re.MULTILINE)
+# Maximal number of notebooks stripped in a server thread rather than in the notebook workers
+STRIP_IN_PROCESS_MAX = 4
+# Maximal number of commits returned by a batched detailed log
+DETAILED_LOGS_MAX_COUNT = 100
+# Maximal number of notebook output scans kept in memory
+NOTEBOOK_OUTPUTS_CACHE_SIZE = 1024
+# Maximal number of repositories whose references snapshot is kept in memory
+REFS_CACHE_SIZE = 16
+# Default maximal number of commits scanned for notebook outputs
+NOTEBOOK_OUTPUTS_MAX_COUNT = 1000
+# Default number of notebooks and commits reported by the notebook outputs scan
+NOTEBOOK_OUTPUTS_LIMIT = 20
+# Number of cells reported per notebook by the notebook outputs scan
+NOTEBOOK_OUTPUTS_CELLS = 5
 # Ensure on NFS or similar, that we give the .git/index.lock time to be removed
 MAX_WAIT_FOR_LOCK_S = 5
 # How often should we check for the lock above to be free? This comes up more on things like NFS
@@ -48,6 +132,22 @@ GIT_BRANCH_STATUS = re.compile(
 GIT_DETACHED_HEAD = re.compile(r"^\(HEAD detached at (?P<commit>.+?)\)$")
 # Parse Git branch rebase name
 GIT_REBASING_BRANCH = re.compile(r"^\(no branch, rebasing (?P<branch>.+?)\)$")
+# Parse the line range header of git blame --incremental
+GIT_BLAME_RANGE = re.compile(
+    r"^(?P<commit>[0-9a-f]{40,64}) (?P<original_line>\d+) (?P<final_line>\d+) (?P<lines>\d+)$"
+)
+# Full commit hash; such a revision can never point to another commit
+GIT_FULL_SHA = re.compile(r"^[0-9a-f]{40,64}$")
+# Parse the header of a unified diff hunk
+GIT_DIFF_HUNK = re.compile(
+    r"^@@ -(?P<old_start>\d+)(?:,(?P<old_lines>\d+))? \+(?P<new_start>\d+)(?:,(?P<new_lines>\d+))? @@ ?(?P<header>.*)$"
+)
+# Object name of the empty tree
+EMPTY_TREE = "4b825dc642cb6eb9a060e54bf8d69288fbee4904"
+# Default number of context lines around the changes of a diff hunk
+DIFF_CONTEXT_LINES = 3
+# Size of the chunks read when streaming a file content
+CONTENT_CHUNK_SIZE = 64 * 1024
 # Git cache as a credential helper
 GIT_CREDENTIAL_HELPER_CACHE = re.compile(r"cache\b")
 # Parse git stash list
@@ -116,6 +216,7 @@ async def execute(
     username: "Optional[str]" = None,
     password: "Optional[str]" = None,
     is_binary=False,
+    timeout: "Optional[float]" = None,
 ) -> "Tuple[int, str, str]":
     """Asynchronously execute a command.
 
@@ -125,8 +226,12 @@ async def execute(
         env (Optional[Dict[str, str]]): Defines the environment variables for the new process
         username (Optional[str]): User name
         password (Optional[str]): User password
+        timeout (Optional[float]): Time in seconds after which the command is killed;
+            not supported with authentication
     Returns:
         (int, str, str): (return code, stdout, stderr)
+    Raises:
+        subprocess.TimeoutExpired: if the command is killed after timeout
     """
 
     async def call_subprocess_with_authentication(
@@ -176,11 +281,17 @@ async def execute(
         cwd: "Optional[str]" = None,
         env: "Optional[Dict[str, str]]" = None,
         is_binary=is_binary,
+        timeout=timeout,
     ) -> "Tuple[int, str, str]":
         process = subprocess.Popen(
             cmdline, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=cwd, env=env
         )
-        output, error = process.communicate()
+        try:
+            output, error = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            raise
         if is_binary:
             return (
                 process.returncode,
@@ -211,7 +322,7 @@ async def execute(
             )
         else:
             code, output, error = await anyio.to_thread.run_sync(
-                call_subprocess, cmdline, cwd, env, is_binary
+                call_subprocess, cmdline, cwd, env, is_binary, timeout
             )
         log_output = (
             output[:MAX_LOG_OUTPUT] + "..." if len(output) > MAX_LOG_OUTPUT else output
@@ -222,6 +333,9 @@ async def execute(
         get_logger().debug(
             "Code: {}\nOutput: {}\nError: {}".format(code, log_output, log_error)
         )
+    except subprocess.TimeoutExpired:
+        get_logger().debug("Command {!s} timed out.".format(cmdline))
+        raise
     except BaseException:
         code, output, error = -1, "", traceback.format_exc()
         get_logger().warning("Fail to execute {!s}".format(cmdline), exc_info=True)
@@ -229,6 +343,278 @@ async def execute(
     return code, output, error
 
 
+async def execute_stream(
+    cmdline: "List[str]",
+    cwd: "str",
+    env: "Optional[Dict[str, str]]" = None,
+    timeout: "Optional[float]" = None,
+) -> "AsyncIterator[bytes]":
+    """Asynchronously execute a command, yielding its output as it is produced.
+
+    The standard error is spooled to a temporary file rather than a pipe, so
+    that a command writing a lot of warnings cannot block on it while its
+    output is being read.
+
+    Args:
+        cmdline (List[str]): Command line to be executed
+        cwd (Optional[str]): Current working directory
+        env (Optional[Dict[str, str]]): Defines the environment variables for the new process
+        timeout (Optional[float]): Time in seconds without output after which
+            the command is killed
+    Yields:
+        bytes: Chunks of the standard output
+    Raises:
+        GitCommandError: if the command fails
+        subprocess.TimeoutExpired: if the command is killed after timeout
+    """
+    get_logger().debug("Stream {!s} in {!s}.".format(cmdline, cwd))
+    with tempfile.TemporaryFile() as stderr:
+        process = await anyio.open_process(
+            cmdline, stdin=subprocess.DEVNULL, stderr=stderr, cwd=cwd, env=env
+        )
+        try:
+            while True:
+                try:
+                    with anyio.fail_after(timeout):
+                        chunk = await process.stdout.receive()
+                except anyio.EndOfStream:
+                    break
+                except TimeoutError:
+                    get_logger().debug("Command {!s} timed out.".format(cmdline))
+                    raise subprocess.TimeoutExpired(cmdline, timeout)
+                # Not within the cancel scope: the consumer runs on yield
+                yield chunk
+            await process.wait()
+            if process.returncode != 0:
+                stderr.seek(0)
+                error = stderr.read().decode("utf-8", errors="replace")
+                get_logger().debug(
+                    "Code: {}\nError: {}".format(process.returncode, error)
+                )
+                raise GitCommandError(
+                    f"Error [{error}] occurred while executing [{' '.join(cmdline)}] command.",
+                    command=cmdline,
+                )
+        finally:
+            # The consumer may stop before the end of the output
+            with anyio.CancelScope(shield=True):
+                if process.returncode is None:
+                    process.kill()
+                    await process.wait()
+                await process.aclose()
+
+
+# Whether git cat-file supports --batch-command (git 2.36+); unknown if None
+_batch_command_supported = None
+
+
+def _parse_object_header(header: bytes) -> "Optional[Tuple[str, str, int]]":
+    fields = header.decode("utf-8").split(" ")
+    # Otherwise the object is missing or ambiguous
+    if len(fields) != 3:
+        return None
+    return fields[0], fields[1], int(fields[2])
+
+
+async def read_object(
+    cwd: "str",
+    object_name: "str",
+    with_contents: "Callable[[str, str, int], bool]" = lambda oid, type_, size: True,
+) -> "Optional[Tuple[str, str, int, Optional[bytes]]]":
+    """Look up a git object and read its content within a single git process.
+
+    Execute git cat-file --batch-command; the object information is
+    requested first and its content only if ``with_contents`` agrees.
+    With git older than 2.36, the object is looked up with --batch-check
+    and its content read by a second process.
+
+    Args:
+        cwd (str): Git repository path
+        object_name (str): Object to look up; e.g. <ref>:<filename>
+        with_contents (Callable[[str, str, int], bool]): Whether to read the
+            content given the object name, type and size
+    Returns:
+        (object name, type, size, content or None) or None if the object does not exist
+    Raises:
+        GitCommandError: if the command fails
+    """
+    global _batch_command_supported
+    if _batch_command_supported is not False:
+        try:
+            result = await _read_object_batch_command(cwd, object_name, with_contents)
+        except GitCommandError as error:
+            if _batch_command_supported or "unknown option" not in str(error):
+                raise
+            _batch_command_supported = False
+        else:
+            _batch_command_supported = True
+            return result
+
+    info = (await read_objects_info(cwd, [object_name]))[object_name]
+    if info is None:
+        return None
+    oid, object_type, size = info
+    content = None
+    if with_contents(oid, object_type, size):
+        content = (await read_objects(cwd, [oid]))[oid]
+    return (oid, object_type, size, content)
+
+
+async def _read_object_batch_command(
+    cwd: "str",
+    object_name: "str",
+    with_contents: "Callable[[str, str, int], bool]",
+) -> "Optional[Tuple[str, str, int, Optional[bytes]]]":
+    command = ["git", "cat-file", "--batch-command"]
+    get_logger().debug("Look up {!s} in {!s}.".format(object_name, cwd))
+    process = await anyio.open_process(command, cwd=cwd)
+    stdout = BufferedByteReceiveStream(process.stdout)
+    result = None
+    try:
+        try:
+            await process.stdin.send(f"info {object_name}\n".encode("utf-8"))
+            info = _parse_object_header(await stdout.receive_until(b"\n", 4096))
+            if info is not None:
+                oid, object_type, size = info
+                content = None
+                if with_contents(oid, object_type, size):
+                    await process.stdin.send(f"contents {oid}\n".encode("utf-8"))
+                    await stdout.receive_until(b"\n", 4096)
+                    content = await stdout.receive_exactly(size) if size else b""
+                    await stdout.receive_exactly(1)
+                result = (oid, object_type, size, content)
+            await process.stdin.aclose()
+        except (anyio.BrokenResourceError, anyio.EndOfStream, anyio.IncompleteRead):
+            # git exited early; the error is reported below
+            pass
+        await process.wait()
+        if process.returncode != 0:
+            error = b"".join([chunk async for chunk in process.stderr])
+            error = error.decode("utf-8", errors="replace")
+            get_logger().debug("Code: {}\nError: {}".format(process.returncode, error))
+            raise GitCommandError(
+                f"Error [{error}] occurred while executing [{' '.join(command)}] command.",
+                command=command,
+            )
+        return result
+    finally:
+        if process.returncode is None:
+            process.kill()
+        await process.aclose()
+
+
+async def read_objects_info(
+    cwd: "str", object_names: "List[str]"
+) -> "Dict[str, Optional[Tuple[str, str, int]]]":
+    """Look up several git objects within a single git process.
+
+    Execute git cat-file --batch-check.
+
+    Args:
+        cwd (str): Git repository path
+        object_names (List[str]): Objects to look up
+    Returns:
+        (object name, type, size) per object name; None if the object does not exist
+    Raises:
+        GitCommandError: if the command fails
+    """
+    if not object_names:
+        return {}
+    command = ["git", "cat-file", "--batch-check"]
+    get_logger().debug("Look up {} objects in {!s}.".format(len(object_names), cwd))
+    names = "".join(f"{name}\n" for name in object_names)
+    process = await anyio.run_process(
+        command, input=names.encode("utf-8"), cwd=cwd, check=False
+    )
+    if process.returncode != 0:
+        error = process.stderr.decode("utf-8", errors="replace")
+        raise GitCommandError(
+            f"Error [{error}] occurred while executing [{' '.join(command)}] command.",
+            command=command,
+        )
+    headers = process.stdout.split(b"\n")
+    return {
+        name: _parse_object_header(header)
+        for name, header in zip(object_names, headers)
+    }
+
+
+async def read_objects(
+    cwd: "str", object_names: "List[str]"
+) -> "Dict[str, Optional[bytes]]":
+    """Read the content of several git objects within a single git process.
+
+    Execute git cat-file --batch; the object names are written while the
+    contents are read.
+
+    Args:
+        cwd (str): Git repository path
+        object_names (List[str]): Objects to read
+    Returns:
+        Content per object name; None if the object does not exist
+    Raises:
+        GitCommandError: if the command fails
+    """
+    if not object_names:
+        return {}
+    command = ["git", "cat-file", "--batch"]
+    get_logger().debug("Read {} objects in {!s}.".format(len(object_names), cwd))
+    process = await anyio.open_process(command, cwd=cwd)
+    stdout = BufferedByteReceiveStream(process.stdout)
+    contents = {}
+
+    async def write():
+        for name in object_names:
+            await process.stdin.send(f"{name}\n".encode("utf-8"))
+        await process.stdin.aclose()
+
+    try:
+        try:
+            async with anyio.create_task_group() as tg:
+                tg.start_soon(write)
+                for name in object_names:
+                    header = await stdout.receive_until(b"\n", 4096)
+                    fields = header.decode("utf-8").split(" ")
+                    if len(fields) != 3:
+                        contents[name] = None
+                        continue
+                    size = int(fields[2])
+                    contents[name] = await stdout.receive_exactly(size) if size else b""
+                    await stdout.receive_exactly(1)
+        except (anyio.BrokenResourceError, anyio.EndOfStream, anyio.IncompleteRead):
+            # git exited early; the error is reported below
+            pass
+        await process.wait()
+        if process.returncode != 0:
+            error = b"".join([chunk async for chunk in process.stderr])
+            error = error.decode("utf-8", errors="replace")
+            get_logger().debug("Code: {}\nError: {}".format(process.returncode, error))
+            raise GitCommandError(
+                f"Error [{error}] occurred while executing [{' '.join(command)}] command.",
+                command=command,
+            )
+        return contents
+    finally:
+        if process.returncode is None:
+            process.kill()
+        await process.aclose()
+
+
+def decode_blob(data: bytes) -> "Tuple[str, bool]":
+    """Decode a blob content as text or, if it is binary, as base64.
+
+    A blob is binary if it contains a NUL byte within its first 8000 bytes,
+    the heuristic used by git. The ``binary`` and ``-diff`` attributes of
+    .gitattributes are not taken into account.
+
+    Returns:
+        (content, is_binary)
+    """
+    if b"\x00" in data[:8000]:
+        return base64.encodebytes(data).decode("ascii"), True
+    return data.decode("utf-8", errors="replace"), False
+
+
 def strip_and_split(s):
     """strip trailing \x00 and split on \x00
     Useful for parsing output of git commands with -z flag.
@@ -248,10 +634,58 @@ class Git:
         self._execute_timeout = (
             20.0 if self._config is None else self._config.git_command_timeout
         )
+        self._rename_limit = (
+            RENAME_LIMIT if self._config is None else self._config.rename_limit
+        )
+        self._rename_timeout = (
+            RENAME_TIMEOUT if self._config is None else self._config.rename_timeout
+        )
+        # Whether git supports the ahead-behind atom of for-each-ref; unknown if None
+        self._ahead_behind_atom = None
+        # References snapshot and storage fingerprint per repository
+        self._refs_cache = LRUCache(REFS_CACHE_SIZE)
+        # Configuration options and configuration files fingerprint per repository
+        self._config_cache = LRUCache(REFS_CACHE_SIZE)
+        # Sorted indexes of the references per (repository, kind) with their snapshot
+        self._refs_index_cache = LRUCache(3 * REFS_CACHE_SIZE)
+        # Changed files per (repository, resolved commits[, index fingerprint])
+        self._changed_files_cache = LRUCache(CHANGED_FILES_CACHE_SIZE)
+        # Single file histories per (repository, file, tip commit)
+        self._follow_cache = LRUCache(FOLLOW_CACHE_SIZE)
+        # Latest tip commit for which a single file history was computed
+        self._follow_tips = LRUCache(FOLLOW_CACHE_SIZE)
+        # Line attributions per (repository, file, commit)
+        self._blame_cache = LRUCache(BLAME_CACHE_SIZE)
+        # Parsed detailed logs per (repository, commit)
+        self._detailed_log_cache = LRUCache(DETAILED_LOG_CACHE_SIZE)
+        # File contents per blob object name
+        self._content_cache = LRUCache(CONTENT_CACHE_SIZE, CONTENT_CACHE_BYTES)
+        # Notebook diffs and merges per hashes of the compared contents
+        self._nbdiff_cache = LRUCache(NBDIFF_CACHE_SIZE, NBDIFF_CACHE_BYTES)
+        # Notebook output scans per blob object name
+        self._notebook_outputs_cache = LRUCache(NOTEBOOK_OUTPUTS_CACHE_SIZE)
+        self._nbdiff_max_size = (
+            0 if self._config is None else self._config.notebook_diff_max_size
+        )
+        self._notebook_pool = (
+            NotebookPool()
+            if self._config is None
+            else NotebookPool(
+                self._config.notebook_diff_processes,
+                self._config.notebook_diff_timeout,
+                self._config.notebook_diff_max_tasks_per_process,
+            )
+        )
 
-    def __del__(self):
+    def close(self):
+        """Terminate the credential cache daemon and the notebook workers."""
         if self._GIT_CREDENTIAL_CACHE_DAEMON_PROCESS:
             self._GIT_CREDENTIAL_CACHE_DAEMON_PROCESS.terminate()
+            self._GIT_CREDENTIAL_CACHE_DAEMON_PROCESS = None
+        self._notebook_pool.close()
+
+    def __del__(self):
+        self.close()
 
     async def __execute(
         self,
@@ -261,6 +695,7 @@ class Git:
         username: "Optional[str]" = None,
         password: "Optional[str]" = None,
         is_binary=False,
+        timeout: "Optional[float]" = None,
     ) -> "Tuple[int, str, str]":
         lock = _get_execution_lock()
         with anyio.move_on_after(self._execute_timeout) as scope:
@@ -268,6 +703,7 @@ class Git:
         if scope.cancelled_caught:
             return 1, "", "Unable to get the lock on the directory"
         try:
+            kwargs = {} if timeout is None else {"timeout": timeout}
             return await execute(
                 cmdline,
                 cwd=cwd,
@@ -275,10 +711,45 @@ class Git:
                 username=username,
                 password=password,
                 is_binary=is_binary,
+                **kwargs,
             )
         finally:
             lock.release()
 
+    async def _execute_with_rename_budget(
+        self, cmdline: "List[str]", cwd: "str"
+    ) -> "Tuple[int, str, str, str]":
+        """Execute a git diff or log command within the rename detection budget.
+
+        Renames are detected with ``-l<rename_limit>``: beyond that number of
+        candidate files, git only detects exact renames. If the command does
+        not complete within ``rename_timeout`` seconds, it is killed and run
+        again without rename detection.
+
+        Returns:
+            (return code, stdout, stderr, renames) with renames being "full",
+            "exact" or "none" depending on the rename detection applied
+        """
+        try:
+            code, output, error = await self.__execute(
+                cmdline[:2] + [f"-l{self._rename_limit}"] + cmdline[2:],
+                cwd=cwd,
+                timeout=self._rename_timeout or None,
+            )
+        except subprocess.TimeoutExpired:
+            get_logger().warning(
+                "Rename detection of {!s} exceeded {} seconds; running it without rename detection.".format(
+                    cmdline, self._rename_timeout
+                )
+            )
+            code, output, error = await self.__execute(
+                cmdline[:2] + ["--no-renames"] + cmdline[2:], cwd=cwd
+            )
+            return code, output, error, "none"
+
+        renames = "exact" if "rename detection was skipped" in error else "full"
+        return code, output, error, renames
+
     async def config(self, path, **kwargs):
         """Get or set Git options.
 
@@ -330,6 +801,7 @@ class Git:
             dict -- the response of format {
                 "code": int, # Command status code
                 "files": [string, string], # List of files changed.
+                "renames": string, # Rename detection applied: "full", "exact" or "none"
                 "message": [string] # Error response
             }
         """
@@ -347,9 +819,16 @@ class Git:
                 "Either single_commit or (base and remote) must be provided"
             )
 
+        key = await self._changed_files_key(path, base, remote, single_commit)
+        if key is not None and key in self._changed_files_cache:
+            files, renames = self._changed_files_cache.get(key)
+            return {"code": 0, "files": list(files), "renames": renames}
+
         response = {}
         try:
-            code, output, error = await self.__execute(cmd, cwd=path)
+            code, output, error, renames = await self._execute_with_rename_budget(
+                cmd, path
+            )
         except subprocess.CalledProcessError as e:
             response["code"] = e.returncode
             response["message"] = e.output.decode("utf-8")
@@ -360,9 +839,48 @@ class Git:
                 response["message"] = error
             else:
                 response["files"] = strip_and_split(output)
+                response["renames"] = renames
+                if key is not None:
+                    self._changed_files_cache.put(
+                        key, (tuple(response["files"]), renames)
+                    )
 
         return response
 
+    async def _changed_files_key(self, path, base, remote, single_commit):
+        """Get the key identifying the result of ``changed_files``.
+
+        Refs are resolved to commits with git rev-parse. A comparison with the
+        index also depends on the index file fingerprint. A comparison with the
+        working tree is never cached as files may change without git noticing.
+
+        Returns:
+            The cache key or None if the result must not be cached
+        """
+        if single_commit:
+            revisions = [single_commit]
+        elif base == "WORKING":
+            return None
+        elif base == "INDEX":
+            revisions = [remote]
+        else:
+            revisions = [base, remote]
+
+        with_index = base == "INDEX" and not single_commit
+        cmd = ["git", "rev-parse"] + (["--git-path", "index"] if with_index else [])
+        code, output, _ = await self.__execute(cmd + revisions, cwd=path)
+        if code != 0:
+            return None
+
+        lines = output.splitlines()
+        if with_index:
+            try:
+                stat = os.stat(os.path.join(path, lines.pop(0)))
+            except OSError:
+                return None
+            return (path, "INDEX", stat.st_ino, stat.st_size, stat.st_mtime_ns, *lines)
+        return (path, *lines)
+
     async def clone(self, path, repo_url, auth=None, versioning=True, submodules=False):
         """
         Execute `git clone`.
@@ -468,54 +986,107 @@ class Git:
                 {"base": Dict, "diff": Dict}
             else:
                 {"base": Dict, "merge_decisions": Dict}
+
+        The results are cached per hashes of the contents. Diffs and merges
+        are computed in worker processes.
+
+        Raises:
+            GitParameterError: if the contents exceed the configured size limit
+            TimeoutError: if the computation exceeds the configured timeout
         """
 
-        def read_notebook(content):
+        def content_hash(content):
             if not content:
-                return nbformat.versions[nbformat.current_nbformat].new_notebook()
+                return "", 0
             if isinstance(content, dict):
-                # Content may come from model as a dict directly
-                return (
-                    nbformat.versions[
-                        content.get("nbformat", nbformat.current_nbformat)
-                    ]
-                    .nbjson.JSONReader()
-                    .to_notebook(content)
+                content = json.dumps(content, sort_keys=True)
+            content = content.encode("utf-8")
+            return hashlib.sha256(content).hexdigest(), len(content)
+
+        hashes = await anyio.to_thread.run_sync(
+            lambda: [
+                content_hash(c) for c in (prev_content, curr_content, base_content)
+            ]
+        )
+        size = sum(s for _, s in hashes)
+        if self._nbdiff_max_size and size > self._nbdiff_max_size:
+            raise GitParameterError(
+                f"Notebooks too large to be compared: {size} bytes exceed the limit of {self._nbdiff_max_size} bytes."
+            )
+
+        key = tuple(h for h, _ in hashes)
+        result = self._nbdiff_cache.get(key)
+        if result is None:
+            if base_content:
+                if merge_notebooks is None:
+                    raise RuntimeError(
+                        "nbdime is required for notebook merging. Install it with: pip install nbdime"
+                    )
+                result = await self._notebook_pool.run(
+                    merge_notebook_contents, prev_content, curr_content, base_content
                 )
             else:
-                return nbformat.reads(content, as_version=4)
-
-        # TODO Fix this in nbdime
-        def remove_cell_ids(nb):
-            for cell in nb.cells:
-                cell.pop("id", None)
-            return nb
-
-        prev_nb = await anyio.to_thread.run_sync(read_notebook, prev_content)
-        curr_nb = await anyio.to_thread.run_sync(read_notebook, curr_content)
-        if base_content:
-            if merge_notebooks is None:
-                raise RuntimeError(
-                    "nbdime is required for notebook merging. Install it with: pip install nbdime"
+                if diff_notebooks is None:
+                    raise RuntimeError(
+                        "nbdime is required for notebook diffing. Install it with: pip install nbdime"
+                    )
+                result = await self._notebook_pool.run(
+                    diff_notebook_contents, prev_content, curr_content
                 )
-            base_nb = await anyio.to_thread.run_sync(read_notebook, base_content)
-            # Only remove ids from merge_notebooks as a workaround
-            _, merge_decisions = await anyio.to_thread.run_sync(
-                merge_notebooks,
-                remove_cell_ids(base_nb),
-                remove_cell_ids(prev_nb),
-                remove_cell_ids(curr_nb),
+            size = await anyio.to_thread.run_sync(lambda: len(json.dumps(result)))
+            self._nbdiff_cache.put(key, result, size)
+        return result
+
+    async def get_nbdiff_at_references(
+        self,
+        path,
+        filename,
+        previous,
+        current,
+        base=None,
+        contents_manager=None,
+        pairing=False,
+    ) -> dict:
+        """Compute the diff of a notebook between two references.
+
+        The notebook versions are read on the server; see ``get_nbdiff``.
+
+        With ``pairing``, a notebook paired by jupytext with a text file is
+        diffed through that file; the result is then the one of ``diff_file``.
+        Merge conflicts are always resolved on the notebooks.
+
+        Args:
+            path: Git repository path
+            filename: Notebook path relatively to the repository
+            previous: Previous reference in the format of ``get_content_at_reference``
+            current: Current reference
+            base: Base reference - only passed during a merge conflict
+            contents_manager: Server contents manager; required for the working tree
+            pairing: Whether to diff the paired text file if any
+        """
+        if pairing and not base:
+            paired_file = await self._get_paired_file_of_diff(
+                path, filename, previous, current
+            )
+            if paired_file is not None:
+                result = await self.diff_file(path, paired_file, previous, current)
+                result["paired_file"] = paired_file
+                return result
+
+        references = [previous, current] + ([base] if base else [])
+        contents = [None] * len(references)
+
+        async def read(index, reference):
+            result = await self.get_content_at_reference(
+                filename, reference, path, contents_manager
             )
+            contents[index] = result["content"]
 
-            return {"base": base_nb, "merge_decisions": merge_decisions}
-        else:
-            if diff_notebooks is None:
-                raise RuntimeError(
-                    "nbdime is required for notebook diffing. Install it with: pip install nbdime"
-                )
-            thediff = await anyio.to_thread.run_sync(diff_notebooks, prev_nb, curr_nb)
+        async with anyio.create_task_group() as tg:
+            for index, reference in enumerate(references):
+                tg.start_soon(read, index, reference)
 
-            return {"base": prev_nb, "diff": thediff}
+        return await self.get_nbdiff(*contents)
 
     async def status(self, path: str) -> dict:
         """
@@ -532,7 +1103,7 @@ class Git:
             }
 
         # Add attribute `is_binary`
-        command = [  # Compare stage to an empty tree see `_is_binary`
+        command = [  # Compare stage to the empty tree
             "git",
             "diff",
             "--numstat",
@@ -637,21 +1208,10 @@ class Git:
         """
         Execute git log command & return the result.
         """
-        is_single_file = follow_path != None
-        cmd = [
-            "git",
-            "log",
-            "--pretty=format:%H%n%an%n%ar%n%s%n%P",
-            ("-%d" % history_count),
-        ]
-        if is_single_file:
-            cmd += [
-                "-z",
-                "--numstat",
-                "--follow",
-                "--",
-                follow_path,
-            ]
+        if follow_path is not None:
+            return await self._follow_log(path, history_count, follow_path)
+
+        cmd = self._log_command(history_count)
         code, my_output, my_error = await self.__execute(
             cmd,
             cwd=path,
@@ -666,8 +1226,117 @@ class Git:
                 return {"code": 0, "commits": []}
             return {"code": code, "command": " ".join(cmd), "message": my_error}
 
+        return {"code": code, "commits": self._parse_log(my_output)}
+
+    async def _follow_log(self, path, history_count, follow_path):
+        """Get the history of a single file, following its renames.
+
+        `git log --follow` reruns the rename detection over the whole history
+        on each call. So the commits are cached per (file, tip commit) and,
+        when the tip moves forward without merges, only the new commits are
+        requested.
+        Commit dates are cached as timestamps and made relative on return.
+        """
+
+        def with_relative_date(commits):
+            return [
+                dict(commit, date=relative_date(int(commit["date"])))
+                for commit in commits[:history_count]
+            ]
+
+        code, output, _ = await self.__execute(
+            ["git", "rev-parse", "--verify", "--quiet", "HEAD"], cwd=path
+        )
+        if code != 0:
+            # A git repo may be initialized but not have any commits yet
+            return {"code": 0, "commits": []}
+        head = output.strip()
+
+        cached = self._follow_cache.get((path, follow_path, head))
+        if cached is not None and (
+            cached["complete"] or len(cached["commits"]) >= history_count
+        ):
+            return {"code": 0, "commits": with_relative_date(cached["commits"])}
+
+        previous_tip = self._follow_tips.get((path, follow_path))
+        previous = self._follow_cache.get((path, follow_path, previous_tip))
+        if (
+            previous is not None
+            and previous_tip != head
+            and (previous["complete"] or len(previous["commits"]) >= history_count)
+        ):
+            code, _, _ = await self.__execute(
+                ["git", "merge-base", "--is-ancestor", previous_tip, head], cwd=path
+            )
+            if code == 0:
+                # Prepending the new commits only keeps the order of `git log`
+                # if they are linear; a merge interleaves the commits by date.
+                code, merges, _ = await self.__execute(
+                    [
+                        "git",
+                        "rev-list",
+                        "--merges",
+                        "-n",
+                        "1",
+                        f"{previous_tip}..{head}",
+                    ],
+                    cwd=path,
+                )
+            if code == 0 and not merges.strip():
+                cmd = self._log_command(
+                    history_count, follow_path, f"{previous_tip}..{head}"
+                )
+                code, my_output, my_error = await self.__execute(cmd, cwd=path)
+                if code != 0:
+                    return {"code": code, "command": " ".join(cmd), "message": my_error}
+
+                new_commits = self._parse_log(my_output, True)
+                # The cached commits can only be reused if the file was not
+                # renamed by the new commits and if all new commits were listed.
+                if len(new_commits) < history_count and not any(
+                    "previous_file_path" in commit for commit in new_commits
+                ):
+                    commits = new_commits + previous["commits"]
+                    self._cache_follow_log(
+                        path, follow_path, head, commits, previous["complete"]
+                    )
+                    return {"code": 0, "commits": with_relative_date(commits)}
+
+        cmd = self._log_command(history_count, follow_path, head)
+        code, my_output, my_error = await self.__execute(cmd, cwd=path)
+        if code != 0:
+            return {"code": code, "command": " ".join(cmd), "message": my_error}
+
+        commits = self._parse_log(my_output, True)
+        self._cache_follow_log(
+            path, follow_path, head, commits, len(commits) < history_count
+        )
+        return {"code": code, "commits": with_relative_date(commits)}
+
+    def _cache_follow_log(self, path, follow_path, tip, commits, complete):
+        self._follow_cache.put(
+            (path, follow_path, tip), {"commits": commits, "complete": complete}
+        )
+        self._follow_tips.put((path, follow_path), tip)
+
+    def _log_command(self, history_count, follow_path=None, revision=None):
+        date_format = "%ar" if follow_path is None else "%at"
+        cmd = [
+            "git",
+            "log",
+            f"--pretty=format:%H%n%an%n{date_format}%n%s%n%P",
+            ("-%d" % history_count),
+        ]
+        if follow_path is not None:
+            cmd += ["-z", "--numstat", "--follow"]
+            if revision is not None:
+                cmd.append(revision)
+            cmd += ["--", follow_path]
+        return cmd
+
+    def _parse_log(self, output, is_single_file=False):
         result = []
-        line_array = my_output.splitlines()
+        line_array = output.splitlines()
 
         if is_single_file:
             parsed_lines = []
@@ -704,39 +1373,252 @@ class Git:
 
             result.append(commit)
 
-        return {"code": code, "commits": result}
+        return result
+
+    async def search_log(
+        self,
+        path,
+        author=None,
+        message=None,
+        file_path=None,
+        since=None,
+        until=None,
+        limit=25,
+        offset=0,
+    ):
+        """Search the commit history using the persistent history index.
+
+        The index is stored in the repository git directory and is extended
+        with the commits that are new since the last query before answering.
+        It covers the history of every branch checked out since its creation,
+        but only the commits reachable from HEAD are returned.
+
+        Args:
+            path: Git repository path
+            author: Substring of the author name or email
+            message: Substring of the commit message
+            file_path: File or directory touched by the commits
+            since: Minimal commit timestamp in seconds (included)
+            until: Maximal commit timestamp in seconds (included)
+            limit: Maximal number of commits returned
+            offset: Number of matching commits to skip
+        Returns:
+            {"code": int, "commits": List[dict]}
+        """
+        cmd = ["git", "rev-parse", "--absolute-git-dir", "HEAD"]
+        code, output, error = await self.__execute(cmd, cwd=path)
+        if code != 0:
+            # A git repo may be initialized but not have any commits yet
+            if "unknown revision" in error.lower():
+                return {"code": 0, "commits": []}
+            return {"code": code, "command": " ".join(cmd), "message": error}
+
+        git_dir, head = output.strip().splitlines()
+        index = HistoryIndex(os.path.join(git_dir, HISTORY_INDEX_FILE))
+        tips = await anyio.to_thread.run_sync(index.tips)
+        if head not in tips and tips:
+            # Tips rewritten by an amend or a rebase may have been garbage collected
+            cmd = ["git", "rev-list", "--no-walk", "--ignore-missing"] + tips
+            code, output, error = await self.__execute(cmd, cwd=path)
+            if code != 0:
+                return {"code": code, "command": " ".join(cmd), "message": error}
+            existing = set(output.split())
+            missing = [tip for tip in tips if tip not in existing]
+            if missing:
+                await anyio.to_thread.run_sync(index.remove_tips, missing)
+                tips = [tip for tip in tips if tip in existing]
+        if head not in tips:
+            cmd = [
+                "git",
+                "log",
+                "-z",
+                "--name-only",
+                "--no-renames",
+                f"--format={HISTORY_LOG_FORMAT}",
+                head,
+            ]
+            if tips:
+                cmd += ["--not"] + tips
+            code, output, error = await self.__execute(cmd, cwd=path)
+            if code != 0:
+                return {"code": code, "command": " ".join(cmd), "message": error}
+            commits = parse_history_log(output)
+            await anyio.to_thread.run_sync(index.add, commits, head)
+
+        commits = await anyio.to_thread.run_sync(
+            functools.partial(
+                index.search,
+                head,
+                author=author,
+                message=message,
+                file_path=file_path,
+                since=since,
+                until=until,
+                limit=limit,
+                offset=offset,
+            )
+        )
+        return {"code": 0, "commits": commits}
 
-    async def detailed_log(self, selected_hash, path):
+    async def detailed_log(
+        self,
+        selected_hash,
+        path,
+        offset=0,
+        limit=None,
+        summary=False,
+        directory=None,
+    ):
         """
         Execute git log -m --cc -1 --numstat --oneline -z command (used to get
         insertions & deletions per file) & return the result.
+
+        Commits touching many files can be browsed lazily:
+
+        - ``directory`` restricts the result to the files within that directory.
+        - ``summary`` replaces the list of files by the number of files changed
+          and the insertions & deletions per direct sub-directory; files directly
+          within the browsed directory are gathered under the directory itself.
+        - ``offset`` and ``limit`` page the list of files (or of directories).
+
+        The totals always describe all the files of the (browsed directory of
+        the) commit.
+        """
+        key = (path, selected_hash)
+        if GIT_FULL_SHA.match(selected_hash) and key in self._detailed_log_cache:
+            commit_body, modified_files, renames = self._detailed_log_cache.get(key)
+        else:
+            cmd = [
+                "git",
+                "log",
+                "--cc",
+                "-m",
+                "-1",
+                "--oneline",
+                "--numstat",
+                "--pretty=format:%b%x00",
+                "-z",
+                selected_hash,
+            ]
+
+            code, my_output, my_error, renames = await self._execute_with_rename_budget(
+                cmd, path
+            )
+            if code != 0:
+                return {"code": code, "command": " ".join(cmd), "message": my_error}
+
+            first_split = my_output.split("\x00", 1)
+            commit_body = first_split[0].strip()
+            modified_files = self._parse_numstat(first_split[1])
+            if GIT_FULL_SHA.match(selected_hash):
+                self._detailed_log_cache.put(
+                    key, (commit_body, modified_files, renames)
+                )
+
+        if directory:
+            prefix = directory.strip("/") + "/"
+            modified_files = [
+                f for f in modified_files if f["modified_file_path"].startswith(prefix)
+            ]
+        result = self._format_detailed_log(commit_body, modified_files)
+        end = None if limit is None else offset + limit
+        if summary:
+            directories = self._summarize_directories(modified_files, directory)
+            del result["modified_files"]
+            result["directories_count"] = len(directories)
+            result["directories"] = directories[offset:end]
+        else:
+            result["modified_files"] = modified_files[offset:end]
+        result["renames"] = renames
+        result["code"] = 0
+        return result
+
+    async def detailed_logs(
+        self,
+        path,
+        selected_hashes=None,
+        revision_range=None,
+        offset=0,
+        limit=DETAILED_LOGS_MAX_COUNT,
+    ):
+        """
+        Execute a single git log -m --cc --numstat -z command for several commits
+        & return the insertions & deletions per file of each commit.
+
+        Renames are detected within the budget of ``detailed_log``.
+
+        Args:
+            path: Git repository path
+            selected_hashes: List of commits; ignored if revision_range is provided
+            revision_range: Commit range; e.g. "main..feature"
+            offset: Number of commits to skip
+            limit: Maximal number of commits returned, at most DETAILED_LOGS_MAX_COUNT
+        Returns:
+            {"code": int, "commits": List[dict], "renames": str} with each commit
+            in the format of ``detailed_log`` completed with a "commit" key.
+        Raises:
+            GitParameterError: if no commit is provided or a revision is an option
         """
+        if revision_range:
+            revisions = [revision_range]
+        elif selected_hashes:
+            revisions = list(selected_hashes)
+        else:
+            raise GitParameterError(
+                "Either selected_hashes or revision_range must be provided"
+            )
+        if any(revision.startswith("-") for revision in revisions):
+            raise GitParameterError("Revisions cannot start with '-'")
+        limit = min(limit or DETAILED_LOGS_MAX_COUNT, DETAILED_LOGS_MAX_COUNT)
+
         cmd = [
             "git",
             "log",
             "--cc",
             "-m",
-            "-1",
-            "--oneline",
             "--numstat",
-            "--pretty=format:%b%x00",
+            "--pretty=format:%x1e%H%x00%b%x00",
             "-z",
-            selected_hash,
+            f"--skip={int(offset)}",
+            f"--max-count={int(limit)}",
         ]
+        if not revision_range:
+            cmd.append("--no-walk=unsorted")
+        cmd.append("--end-of-options")
+        cmd.extend(revisions)
 
-        code, my_output, my_error = await self.__execute(
-            cmd,
-            cwd=path,
+        code, my_output, my_error, renames = await self._execute_with_rename_budget(
+            cmd, path
         )
         if code != 0:
             return {"code": code, "command": " ".join(cmd), "message": my_error}
 
-        total_insertions = 0
-        total_deletions = 0
+        # Merge commits are output once per parent; gather their numstat
+        bodies = {}
+        numstats = {}
+        for record in my_output.split("\x1e"):
+            if not record:
+                continue
+            sha, body, numstat = (record.split("\x00", 2) + ["", ""])[:3]
+            bodies.setdefault(sha, body.strip())
+            numstats.setdefault(sha, []).append(numstat)
+
+        commits = []
+        for sha, numstat in numstats.items():
+            details = self._parse_detailed_log(bodies[sha], "\x00".join(numstat))
+            details["commit"] = sha
+            commits.append(details)
+
+        return {"code": code, "commits": commits, "renames": renames}
+
+    def _parse_detailed_log(self, commit_body, numstat):
+        """Parse the ``--numstat -z`` output of a commit."""
+        return self._format_detailed_log(commit_body, self._parse_numstat(numstat))
+
+    def _parse_numstat(self, numstat):
+        """Parse the ``--numstat -z`` output into the list of modified files."""
         result = []
-        first_split = my_output.split("\x00", 1)
-        commit_body = first_split[0].strip()
-        line_iterable = iter(strip_and_split(first_split[1].strip()))
+        line_iterable = iter(strip_and_split(numstat.strip()))
         for line in line_iterable:
             is_binary = line.startswith("-\t-\t")
             previous_file_path = ""
@@ -770,8 +1652,13 @@ class Git:
                     file_info["previous_file_path"] = previous_file_path
 
                 result.append(file_info)
-                total_insertions += int(insertions)
-                total_deletions += int(deletions)
+
+        return result
+
+    def _format_detailed_log(self, commit_body, result):
+        """Format the detailed log of a commit from its modified files."""
+        total_insertions = sum(int(f["insertion"]) for f in result)
+        total_deletions = sum(int(f["deletion"]) for f in result)
 
         modified_file_note = "{num_files} files changed, {insertions} insertions(+), {deletions} deletions(-)".format(
             num_files=len(result),
@@ -780,7 +1667,6 @@ class Git:
         )
 
         return {
-            "code": code,
             "commit_body": commit_body,
             "modified_file_note": modified_file_note,
             "modified_files_count": str(len(result)),
@@ -789,9 +1675,33 @@ class Git:
             "modified_files": result,
         }
 
+    def _summarize_directories(self, modified_files, directory=None):
+        """Aggregate the modified files per direct sub-directory of ``directory``."""
+        prefix = directory.strip("/") + "/" if directory else ""
+        directories = {}
+        for file_info in modified_files:
+            relative_path = file_info["modified_file_path"][len(prefix) :]
+            head, separator, _ = relative_path.partition("/")
+            name = prefix + head if separator else prefix.rstrip("/")
+            entry = directories.setdefault(
+                name,
+                {
+                    "directory": name,
+                    "modified_files_count": 0,
+                    "insertion": 0,
+                    "deletion": 0,
+                },
+            )
+            entry["modified_files_count"] += 1
+            entry["insertion"] += int(file_info["insertion"])
+            entry["deletion"] += int(file_info["deletion"])
+        return sorted(directories.values(), key=lambda entry: entry["directory"])
+
     async def diff(self, path, previous=None, current=None):
         """
         Execute git diff command & return the result.
+
+        Renamed files also have a "previous_filename".
         """
         cmd = ["git", "diff", "--numstat", "-z"]
 
@@ -800,37 +1710,320 @@ class Git:
             if current:
                 cmd.append(current)
 
-        code, my_output, my_error = await self.__execute(cmd, cwd=path)
+        code, my_output, my_error, renames = await self._execute_with_rename_budget(
+            cmd, path
+        )
 
         if code != 0:
             return {"code": code, "command": " ".join(cmd), "message": my_error}
 
         result = []
-        line_array = strip_and_split(my_output)
-        for line in line_array:
-            linesplit = line.split()
-            result.append(
-                {
-                    "insertions": linesplit[0],
-                    "deletions": linesplit[1],
-                    "filename": linesplit[2],
-                }
+        line_iterable = iter(strip_and_split(my_output))
+        for line in line_iterable:
+            insertions, deletions, filename = line.split("\t", 2)
+            file_info = {"insertions": insertions, "deletions": deletions}
+            if filename == "":
+                # file was renamed or moved, we need next two lines of output
+                file_info["previous_filename"] = next(line_iterable)
+                filename = next(line_iterable)
+            file_info["filename"] = filename
+            result.append(file_info)
+        return {"code": code, "result": result, "renames": renames}
+
+    async def diff_file(
+        self,
+        path,
+        filename,
+        previous,
+        current,
+        context=DIFF_CONTEXT_LINES,
+        pairing=False,
+    ):
+        """
+        Execute git diff -U<context> on a single file between two references
+        & return its hunks.
+
+        References follow the format of ``get_content_at_reference``; the
+        working tree ({"special": "WORKING"}) is only supported as current
+        reference. An empty previous reference stands for a new file.
+
+        Args:
+            path: Git repository path
+            filename: File path relatively to the repository
+            previous: Previous reference
+            current: Current reference
+            context: Number of context lines around the changes
+            pairing: Whether to diff the text file paired with a notebook instead
+        Returns:
+            {"code": int, "is_binary": bool, "hunks": List[dict]} with the
+            hunk lines kept in the unified diff format (prefixed by " ", "+",
+            "-" or "\\"). "paired_file" is set if the paired text file was
+            diffed.
+        """
+        if pairing:
+            paired_file = await self._get_paired_file_of_diff(
+                path, filename, previous, current
             )
-        return {"code": code, "result": result}
+            if paired_file is not None:
+                result = await self.diff_file(
+                    path, paired_file, previous, current, context
+                )
+                result["paired_file"] = paired_file
+                return result
+
+        cmd = [
+            "git",
+            "diff",
+            "--no-color",
+            "--no-ext-diff",
+            f"-U{int(context)}",
+        ]
+        previous_object = self._object_name(filename, previous)
+        if current.get("special") == "WORKING":
+            self._working_file(path, filename)
+            if previous_object is None:
+                # New file; --no-index exits with 1 if the files differ
+                cmd.extend(["--no-index", "--", os.devnull, filename])
+            elif previous.get("special") == "INDEX":
+                cmd.extend(["--", filename])
+            elif "git" in previous:
+                cmd.extend([previous["git"], "--", filename])
+            else:
+                raise GitParameterError(
+                    f"Unsupported previous reference '{previous}' for a working tree diff"
+                )
+        elif previous_object is None:
+            # New file; compare with the empty tree
+            if current.get("special") == "INDEX":
+                cmd.extend(["--cached", EMPTY_TREE, "--", filename])
+            elif "git" in current:
+                cmd.extend([EMPTY_TREE, current["git"], "--", filename])
+            else:
+                raise GitParameterError(
+                    f"Unsupported current reference '{current}' for a new file"
+                )
+        else:
+            current_object = self._object_name(filename, current)
+            if current_object is None:
+                raise GitParameterError(f"Unsupported current reference '{current}'")
+            cmd.extend([previous_object, current_object])
+
+        code, my_output, my_error = await self.__execute(cmd, cwd=path)
+        if code != 0 and not (code == 1 and "--no-index" in cmd and not my_error):
+            return {"code": code, "command": " ".join(cmd), "message": my_error}
+
+        is_binary = False
+        hunks = []
+        for line in my_output.split("\n"):
+            match = GIT_DIFF_HUNK.match(line)
+            if match is not None:
+                hunks.append(
+                    {
+                        "old_start": int(match.group("old_start")),
+                        "old_lines": int(match.group("old_lines") or 1),
+                        "new_start": int(match.group("new_start")),
+                        "new_lines": int(match.group("new_lines") or 1),
+                        "header": match.group("header"),
+                        "lines": [],
+                    }
+                )
+            elif hunks:
+                if line:
+                    hunks[-1]["lines"].append(line)
+            elif line.startswith("Binary files "):
+                is_binary = True
 
-    async def branch(self, path):
+        return {"code": 0, "is_binary": is_binary, "hunks": hunks}
+
+    async def file_lines(self, path, filename, reference, start, end):
         """
-        Execute 'git for-each-ref' command & return the result.
+        Get the lines ``start`` to ``end`` (1-based, included) of a file version.
+
+        Used to expand the context of diff hunks lazily; the content is read
+        only up to the last requested line.
+
+        Args:
+            path: Git repository path
+            filename: File path relatively to the repository
+            reference: File version in the format of ``get_content_at_reference``
+            start: First line
+            end: Last line
+        Returns:
+            {"code": int, "lines": List[str]}
         """
-        heads = await self.branch_heads(path)
-        if heads["code"] != 0:
+        start = max(1, int(start))
+        end = int(end)
+        if reference.get("special") == "WORKING":
+            lines = await anyio.to_thread.run_sync(
+                self._read_lines, self._working_file(path, filename), start, end
+            )
+            return {"code": 0, "lines": lines}
+
+        object_name = self._object_name(filename, reference)
+        if object_name is None:
+            return {"code": 0, "lines": []}
+
+        lines = []
+        remaining = b""
+        line_number = 0
+        stream = execute_stream(
+            ["git", "cat-file", "blob", object_name],
+            cwd=path,
+            timeout=self._execute_timeout,
+        )
+        try:
+            async for chunk in stream:
+                *completed, remaining = (remaining + chunk).split(b"\n")
+                for line in completed:
+                    line_number += 1
+                    if line_number >= start:
+                        lines.append(line.decode("utf-8", errors="replace"))
+                    if line_number >= end:
+                        break
+                if line_number >= end:
+                    break
+            else:
+                if remaining and start <= line_number + 1 <= end:
+                    lines.append(remaining.decode("utf-8", errors="replace"))
+        finally:
+            await stream.aclose()
+
+        return {"code": 0, "lines": lines}
+
+    def _object_name(self, filename, reference):
+        """Get the git object name of ``filename`` at ``reference``.
+
+        Returns None if the reference does not point to a file version stored
+        by git (i.e. an empty reference).
+        """
+        if "special" in reference:
+            if reference["special"] == "INDEX":
+                return f":0:{filename}"
+            elif reference["special"] == "BASE":
+                return f":1:{filename}"
+            elif reference["special"] == "WORKING":
+                raise GitParameterError(
+                    "The working tree is only supported as current reference"
+                )
+            raise GitParameterError(f"Unknown special ref '{reference['special']}'")
+        elif "git" in reference:
+            return f"{reference['git']}:{filename}"
+        return None
+
+    async def get_paired_file(self, path, filename, reference):
+        """Get the text file paired by jupytext with a notebook.
+
+        The candidates are the files next to the notebook with the same name
+        and a text extension supported by jupytext. A candidate is the pair of
+        the notebook if its jupytext header lists the ipynb format.
+
+        Args:
+            path: Git repository path
+            filename: Notebook path relatively to the repository
+            reference: Reference in the format of ``get_content_at_reference``
+        Returns:
+            The paired file path relatively to the repository or None
+        """
+        if not filename.endswith(".ipynb"):
+            return None
+        stem = filename[: -len(".ipynb")]
+        candidates = [stem + extension for extension in JUPYTEXT_EXTENSIONS]
+
+        headers = {}
+        if reference.get("special") == "WORKING":
+            for candidate in candidates:
+                filepath = self._working_file(path, candidate)
+                if os.path.isfile(filepath):
+                    with open(filepath, "rb") as f:
+                        headers[candidate] = f.read(JUPYTEXT_HEADER_SIZE)
+        else:
+            object_names = {
+                self._object_name(candidate, reference): candidate
+                for candidate in candidates
+            }
+            if None in object_names:
+                return None
+            contents = await read_objects(path, list(object_names))
+            for object_name, content in contents.items():
+                if content is not None:
+                    headers[object_names[object_name]] = content[:JUPYTEXT_HEADER_SIZE]
+
+        for candidate in candidates:
+            header = headers.get(candidate)
+            if header is None:
+                continue
+            match = JUPYTEXT_FORMATS.search(header.decode("utf-8", errors="replace"))
+            if match is not None and any(
+                f.split(":")[0].endswith("ipynb") for f in match.group(1).split(",")
+            ):
+                return candidate
+        return None
+
+    async def _get_paired_file_of_diff(self, path, filename, previous, current):
+        """Get the text file paired with a notebook at the current reference,
+        or at the previous one if the pairing was removed."""
+        for reference in (current, previous):
+            if reference:
+                paired_file = await self.get_paired_file(path, filename, reference)
+                if paired_file is not None:
+                    return paired_file
+        return None
+
+    @staticmethod
+    def _working_file(path, filename):
+        """Resolve a file of the working tree.
+
+        Raises:
+            GitParameterError: if the file resolves outside of the working
+                tree, symbolic links included, or within the .git directory
+        """
+        root = os.path.realpath(path)
+        filepath = os.path.realpath(os.path.join(root, filename))
+        relative = os.path.relpath(filepath, root)
+        if (
+            relative == os.curdir
+            or relative == os.pardir
+            or relative.startswith(os.pardir + os.sep)
+            or relative.split(os.sep)[0] == ".git"
+        ):
+            raise GitParameterError(f"'{filename}' is not in the working tree")
+        return filepath
+
+    @staticmethod
+    def _read_lines(filepath, start, end):
+        lines = []
+        with open(filepath, "rb") as f:
+            for line_number, line in enumerate(f, start=1):
+                if line_number > end:
+                    break
+                if line_number >= start:
+                    lines.append(line.rstrip(b"\n").decode("utf-8", errors="replace"))
+        return lines
+
+    async def branch(
+        self, path, query="", prefix=False, sort="name", offset=0, limit=None
+    ):
+        """
+        List the branches from the references snapshot & return the result.
+
+        The branches can be searched and paged:
+
+        - ``query`` is searched in the branch names, ignoring the case; with
+          ``prefix`` the names must start with it, also ignoring the case.
+        - ``sort`` lists the local then the remote branches by "name" or
+          all branches by "date", most recent first.
+        - ``offset`` and ``limit`` page the matching branches; "total" counts
+          all of them. The current branch is always returned.
+        """
+        refs = await self.refs(path)
+        if refs["code"] != 0:
             # error; bail
-            return heads
+            return refs
 
-        remotes = await self.branch_remotes(path)
-        if remotes["code"] != 0:
+        heads = await self._heads_with_current_branch(path, refs)
+        if heads["code"] != 0:
             # error; bail
-            return remotes
+            return heads
 
         # Extract commit hash in case of detached head
         is_detached = GIT_DETACHED_HEAD.match(heads["current_branch"]["name"])
@@ -848,125 +2041,145 @@ class Git:
                 except KeyError:
                     pass
 
+        try:
+            local = self._refs_index(path, refs, "heads").select(query, prefix, sort)
+            # The current branch when missing from the snapshot, e.g. a detached head
+            missing = RefsIndex(heads["branches"][len(refs["heads"]) :]).select(
+                query, prefix, sort
+            )
+            remote = self._refs_index(path, refs, "remotes").select(query, prefix, sort)
+        except ValueError as error:
+            return {"code": -1, "message": str(error)}
+
         # all's good; concatenate results and return
+        branches = merge_refs(sort, local, missing, remote)
+        end = None if limit is None else offset + limit
         return {
             "code": 0,
-            "branches": heads["branches"] + remotes["branches"],
+            "branches": branches[offset:end],
             "current_branch": heads["current_branch"],
+            "total": len(branches),
         }
 
-    async def branch_delete(self, path, branch):
-        """Execute 'git branch -D <branchname>'"""
-        cmd = ["git", "branch", "-D", branch]
-        code, _, error = await self.__execute(cmd, cwd=path)
-        if code != 0:
-            return {"code": code, "command": " ".join(cmd), "message": error}
-        else:
-            return {"code": code}
+    def _refs_index(self, path, refs, kind):
+        """Get the index of the references of a kind of a snapshot."""
+        cached = self._refs_index_cache.get((path, kind))
+        if cached is None or cached[0] is not refs:
+            cached = (refs, RefsIndex(refs[kind]))
+            self._refs_index_cache.put((path, kind), cached)
+        return cached[1]
 
-    async def branch_heads(self, path):
-        """
-        Execute 'git for-each-ref' command on refs/heads & return the result.
+    async def refs(self, path):
         """
-        # Format reference: https://git-scm.com/docs/git-for-each-ref#_field_names
-        formats = ["refname:short", "objectname", "upstream:short", "HEAD"]
-        cmd = [
-            "git",
-            "for-each-ref",
-            "--format=" + "%09".join("%({})".format(f) for f in formats),
-            "refs/heads/",
-        ]
+        Execute 'git for-each-ref' once on the branches, remote branches and
+        tags & return the references snapshot.
 
+        The branches come with their upstream and the number of commits ahead
+        and behind it; with git 2.41 or later, also with the number of commits
+        ahead and behind HEAD ("head_ahead_behind").
+
+        The snapshot is kept until the references, HEAD or the configuration
+        of the repository change on disk; see ``refs_fingerprint``. It must
+        not be modified by the callers.
+
+        Returns:
+            {"code": int, "heads": List[dict], "remotes": List[dict], "tags": List[dict]}
+            see ``parse_refs``
+        """
+        # The fingerprint is taken first so changes made while git runs are seen next time
+        git_dirs = find_git_dirs(path)
+        fingerprint = None
+        if git_dirs is not None:
+            fingerprint = await anyio.to_thread.run_sync(refs_fingerprint, *git_dirs)
+        if fingerprint is not None:
+            cached = self._refs_cache.get(path)
+            if cached is not None and cached[0] == fingerprint:
+                return cached[1]
+
+        ahead_behind = self._ahead_behind_atom is not False
+        cmd = for_each_ref_command(ahead_behind)
         code, output, error = await self.__execute(cmd, cwd=path)
+        if code != 0 and ahead_behind:
+            # The atom requires git 2.41 and a valid HEAD
+            if "unknown field name" in error:
+                self._ahead_behind_atom = False
+            cmd = for_each_ref_command()
+            code, output, error = await self.__execute(cmd, cwd=path)
+        elif code == 0 and ahead_behind:
+            self._ahead_behind_atom = True
         if code != 0:
             return {"code": code, "command": " ".join(cmd), "message": error}
 
-        current_branch = None
-        results = []
         try:
-            for name, commit_sha, upstream_name, is_current_branch in (
-                line.split("\t") for line in output.splitlines()
-            ):
-                is_current_branch = bool(is_current_branch.strip())
-
-                branch = {
-                    "is_current_branch": is_current_branch,
-                    "is_remote_branch": False,
-                    "name": name,
-                    "upstream": upstream_name if upstream_name else None,
-                    "top_commit": commit_sha,
-                    "tag": None,
-                }
-                results.append(branch)
-                if is_current_branch:
-                    current_branch = branch
-
-            # Above can fail in certain cases, such as an empty repo with
-            # no commits. In that case, just fall back to determining
-            # current branch
-            if not current_branch:
-                current_name = await self.get_current_branch(path)
-                branch = {
-                    "is_current_branch": True,
-                    "is_remote_branch": False,
-                    "name": current_name,
-                    "upstream": None,
-                    "top_commit": None,
-                    "tag": None,
-                }
-                results.append(branch)
-                current_branch = branch
-
-            return {
-                "code": code,
-                "branches": results,
-                "current_branch": current_branch,
-            }
-
-        except Exception as downstream_error:
+            snapshot = {"code": code, **parse_refs(output)}
+        except ValueError as downstream_error:
             return {
                 "code": -1,
                 "command": " ".join(cmd),
                 "message": str(downstream_error),
             }
+        if fingerprint is not None:
+            self._refs_cache.put(path, (fingerprint, snapshot))
+        return snapshot
 
-    async def branch_remotes(self, path):
-        """
-        Execute 'git for-each-ref' command on refs/heads & return the result.
-        """
-        # Format reference: https://git-scm.com/docs/git-for-each-ref#_field_names
-        formats = ["refname:short", "objectname"]
-        cmd = [
-            "git",
-            "for-each-ref",
-            "--format=" + "%09".join("%({})".format(f) for f in formats),
-            "refs/remotes/",
-        ]
-
-        code, output, error = await self.__execute(cmd, cwd=path)
+    async def branch_delete(self, path, branch):
+        """Execute 'git branch -D <branchname>'"""
+        cmd = ["git", "branch", "-D", branch]
+        code, _, error = await self.__execute(cmd, cwd=path)
         if code != 0:
             return {"code": code, "command": " ".join(cmd), "message": error}
+        else:
+            return {"code": code}
 
-        results = []
-        try:
-            for name, commit_sha in (line.split("\t") for line in output.splitlines()):
-                results.append(
-                    {
-                        "is_current_branch": False,
-                        "is_remote_branch": True,
-                        "name": name,
-                        "upstream": None,
-                        "top_commit": commit_sha,
-                        "tag": None,
-                    }
-                )
-            return {"code": code, "branches": results}
-        except Exception as downstream_error:
-            return {
-                "code": -1,
-                "command": " ".join(cmd),
-                "message": str(downstream_error),
+    async def branch_heads(self, path):
+        """
+        List the local branches from the references snapshot & return the result.
+        """
+        refs = await self.refs(path)
+        if refs["code"] != 0:
+            return refs
+        return await self._heads_with_current_branch(path, refs)
+
+    async def _heads_with_current_branch(self, path, refs):
+        """Complete the local branches of a references snapshot with the current branch."""
+        results = list(refs["heads"])
+        current_branch = next(
+            (branch for branch in results if branch["is_current_branch"]), None
+        )
+
+        # The current branch is not listed in certain cases, such as an empty
+        # repo with no commits or a detached head. In that case, just fall
+        # back to determining current branch
+        if not current_branch:
+            try:
+                current_name = await self.get_current_branch(path)
+            except Exception as downstream_error:
+                return {"code": -1, "message": str(downstream_error)}
+            current_branch = {
+                "is_current_branch": True,
+                "is_remote_branch": False,
+                "name": current_name,
+                "upstream": None,
+                "top_commit": None,
+                "tag": None,
+                "date": None,
             }
+            results.append(current_branch)
+
+        return {
+            "code": 0,
+            "branches": results,
+            "current_branch": current_branch,
+        }
+
+    async def branch_remotes(self, path):
+        """
+        List the remote branches from the references snapshot & return the result.
+        """
+        refs = await self.refs(path)
+        if refs["code"] != 0:
+            return refs
+        return {"code": 0, "branches": refs["remotes"]}
 
     async def show_top_level(self, path):
         """
@@ -1237,57 +2450,355 @@ class Git:
             return {"code": code, "command": " ".join(cmd), "message": error}
         return {"code": code, "message": output.strip()}
 
-    async def check_notebooks_with_outputs(self, path):
-        code, stdout, _ = await self.__execute(
-            ["git", "diff", "--cached", "--name-only", "--diff-filter=ACM"], cwd=path
-        )
-        staged_files = stdout.splitlines()
-        notebooks = [f for f in staged_files if f.endswith(".ipynb")]
+    async def check_notebooks_with_outputs(self, path, sizes=False):
+        """Look for outputs in the staged notebooks.
 
-        dirty_notebooks = []
+        The staged blobs are scanned, as they are what will be committed, in
+        parallel by the notebook workers. A scan stops at the first code cell
+        with outputs unless ``sizes`` is set. Scans are cached per blob object
+        name so notebooks not staged again are not read again.
 
-        for nb_path in notebooks:
-            full_nb_path = os.path.join(path, nb_path)
+        Args:
+            path: Git repository path
+            sizes: Whether to report the byte size of the outputs per notebook
+        """
+        code, stdout, _ = await self.__execute(
+            [
+                "git",
+                "diff",
+                "--cached",
+                "--raw",
+                "-z",
+                "--no-abbrev",
+                "--diff-filter=ACM",
+            ],
+            cwd=path,
+        )
+        staged_blobs = {}
+        fields = stdout.split("\x00")
+        while len(fields) > 1:
+            info, *fields = fields
+            # Copies list the source and the destination
+            if info.split(" ")[-1].startswith("C"):
+                fields = fields[1:]
+            nb_path, *fields = fields
+            if nb_path.endswith(".ipynb"):
+                staged_blobs[nb_path] = info.split(" ")[3]
+        notebooks = list(staged_blobs)
+
+        results = {}
+
+        async def scan(nb_path):
             try:
-                nb = nbformat.read(full_nb_path, as_version=nbformat.NO_CONVERT)
-                for cell in nb.get("cells", []):
-                    if cell.get("cell_type") == "code" and cell.get("outputs"):
-                        dirty_notebooks.append(nb_path)
-                        break
-            except Exception:
-                pass
+                results[nb_path] = await self._scan_blob_outputs(
+                    path, staged_blobs[nb_path], sizes
+                )
+            except Exception as e:
+                get_logger().debug(f"Failed to scan notebook {nb_path}: {e}")
 
-        return {
+        async with anyio.create_task_group() as tg:
+            for nb_path in notebooks:
+                tg.start_soon(scan, nb_path)
+
+        dirty_notebooks = [
+            nb_path
+            for nb_path in notebooks
+            if nb_path in results and results[nb_path]["has_outputs"]
+        ]
+        response = {
             "notebooks_with_outputs": dirty_notebooks,
             "has_outputs": len(dirty_notebooks) > 0,
         }
+        if sizes:
+            response["output_sizes"] = {
+                nb_path: results[nb_path]["output_bytes"]
+                for nb_path in notebooks
+                if nb_path in results
+            }
+        return response
+
+    async def _scan_blob_outputs(self, path: str, oid: str, sizes: bool) -> dict:
+        """Scan a notebook blob for outputs in the notebook workers.
+
+        Scans are cached per full blob object name, which identifies the
+        content in any repository; a scan stopped at the first outputs is not
+        reused when their sizes are requested.
+        """
+        if not GIT_FULL_SHA.match(oid):
+            return await self._notebook_pool.run(scan_blob_outputs, path, oid, sizes)
+        cached = self._notebook_outputs_cache.get(oid)
+        if cached is not None and (cached[1] or not sizes):
+            return cached[0]
+        result = await self._notebook_pool.run(scan_blob_outputs, path, oid, sizes)
+        self._notebook_outputs_cache.put(oid, (result, sizes))
+        return result
+
+    async def notebook_outputs(
+        self,
+        path: str,
+        reference: str = "HEAD",
+        history: bool = False,
+        max_count: int = NOTEBOOK_OUTPUTS_MAX_COUNT,
+        limit: int = NOTEBOOK_OUTPUTS_LIMIT,
+    ) -> dict:
+        """Report the notebooks, cells and commits with the largest outputs.
+
+        The notebooks of the ``reference`` tree (or of the index for "INDEX")
+        are scanned. With ``history``, the notebooks added or modified by the
+        last ``max_count`` commits reachable from ``reference`` are scanned
+        instead, and the commits are ranked by the size of the outputs they
+        added: the growth of the outputs of each notebook over its version in
+        the parent commit. Blobs are streamed and their scans cached per
+        object name.
+
+        Args:
+            path: Git repository path
+            reference: Commit-ish to scan or "INDEX"
+            history: Whether to scan the history rather than a tree
+            max_count: Maximal number of commits scanned in history mode
+            limit: Maximal number of notebooks and commits reported
+        Returns:
+            {"code", "output_bytes", "files": [{"path", "oid", "commit", "output_bytes", "cells"}][, "commits"]}
+        """
+        if history:
+            cmd = [
+                "git",
+                "log",
+                "--format=%H",
+                "-z",
+                "--raw",
+                "--no-abbrev",
+                "--no-renames",
+                "--diff-filter=AM",
+                f"--max-count={max_count}",
+                reference,
+                "--",
+                "*.ipynb",
+            ]
+        elif reference == "INDEX":
+            cmd = ["git", "ls-files", "--stage", "-z"]
+        else:
+            cmd = ["git", "ls-tree", "-r", "-z", reference]
+        code, output, error = await self.__execute(cmd, cwd=path)
+        if code != 0:
+            return {"code": code, "command": " ".join(cmd), "message": error}
+
+        # (path, object name, commit, parent object name) of the notebook blobs
+        blobs = []
+        if history:
+            commit = None
+            fields = output.split("\x00")
+            while fields:
+                field = fields.pop(0).strip("\n")
+                if field.startswith(":"):
+                    _, _, parent_oid, oid, _ = field.split(" ")
+                    if not parent_oid.strip("0"):
+                        parent_oid = None
+                    blobs.append((fields.pop(0), oid, commit, parent_oid))
+                elif field:
+                    commit = field
+        else:
+            for line in output.split("\x00"):
+                info, _, filename = line.partition("\t")
+                if filename.endswith(".ipynb"):
+                    oid = info.split(" ")[1 if reference == "INDEX" else 2]
+                    blobs.append((filename, oid, None, None))
+
+        weights = {}
+
+        async def scan(oid):
+            try:
+                weights[oid] = await self._scan_blob_outputs(path, oid, True)
+            except Exception as e:
+                get_logger().debug(f"Failed to scan notebook blob {oid}: {e}")
+
+        scanned = {oid for _, oid, _, _ in blobs}
+        parents = {parent_oid for _, _, _, parent_oid in blobs if parent_oid}
+        async with anyio.create_task_group() as tg:
+            for oid in scanned | parents:
+                tg.start_soon(scan, oid)
+
+        def output_bytes(oid):
+            weight = weights.get(oid)
+            return weight["output_bytes"] if weight else 0
+
+        files = []
+        commits = {}
+        seen = set()
+        for filename, oid, commit, parent_oid in blobs:
+            added = output_bytes(oid) - output_bytes(parent_oid)
+            if commit is not None and added > 0:
+                commits[commit] = commits.get(commit, 0) + added
+            weight = weights.get(oid)
+            if not weight or not weight["output_bytes"] or (filename, oid) in seen:
+                continue
+            seen.add((filename, oid))
+            cells = sorted(weight["cells"], key=lambda cell: cell[1], reverse=True)
+            files.append(
+                {
+                    "path": filename,
+                    "oid": oid,
+                    "commit": commit,
+                    "output_bytes": weight["output_bytes"],
+                    "cells": [
+                        {"index": index, "output_bytes": size}
+                        for index, size in cells[:NOTEBOOK_OUTPUTS_CELLS]
+                    ],
+                }
+            )
+
+        files.sort(key=lambda file: file["output_bytes"], reverse=True)
+        response = {
+            "code": 0,
+            "output_bytes": sum(output_bytes(oid) for oid in scanned),
+            "files": files[:limit],
+        }
+        if history:
+            response["commits"] = [
+                {"commit": commit, "output_bytes": size}
+                for commit, size in sorted(
+                    commits.items(), key=lambda item: item[1], reverse=True
+                )[:limit]
+            ]
+        return response
 
     async def strip_notebook_outputs(self, notebooks: list, repo_path: str):
-        for nb_path in notebooks:
+        """Strip the outputs of notebooks and stage them.
+
+        With the builtin engine, the outputs are cleared in a server thread or,
+        for more than STRIP_IN_PROCESS_MAX notebooks, in the notebook workers.
+        Otherwise the configured cleaning command is run on each notebook. The
+        stripped notebooks are then staged with a single git add.
+        """
+        engine = (
+            "builtin" if self._config is None else self._config.output_cleaning_engine
+        )
+        in_process = len(notebooks) <= STRIP_IN_PROCESS_MAX
+        stripped = []
+
+        async def strip(nb_path):
             full_path = os.path.join(repo_path, nb_path)
 
             try:
-                full_cmd = (
-                    shlex.split(self._config.output_cleaning_command)
-                    + shlex.split(self._config.output_cleaning_options)
-                    + [full_path]
-                )
-
-                code, _, stderr = await self.__execute(full_cmd, cwd=repo_path)
-                if code != 0:
-                    raise RuntimeError(f"Cleaning failed: {stderr}")
+                if engine == "builtin":
+                    if in_process:
+                        await anyio.to_thread.run_sync(
+                            clear_notebook_outputs, full_path
+                        )
+                    else:
+                        await self._notebook_pool.run(clear_notebook_outputs, full_path)
+                else:
+                    full_cmd = (
+                        shlex.split(self._config.output_cleaning_command)
+                        + shlex.split(self._config.output_cleaning_options)
+                        + [full_path]
+                    )
 
-                code, _, stderr = await self.__execute(
-                    ["git", "add", nb_path], cwd=repo_path
-                )
-                if code != 0:
-                    raise RuntimeError(f"Git add failed: {stderr}")
+                    code, _, stderr = await self.__execute(full_cmd, cwd=repo_path)
+                    if code != 0:
+                        raise RuntimeError(f"Cleaning failed: {stderr}")
+                stripped.append(nb_path)
 
             except Exception as e:
                 get_logger().error(
                     f"Failed to strip notebook outputs for {nb_path}: {e}"
                 )
 
+        if engine == "builtin":
+            async with anyio.create_task_group() as tg:
+                for nb_path in notebooks:
+                    tg.start_soon(strip, nb_path)
+        else:
+            # Cleaning commands are run one after the other
+            for nb_path in notebooks:
+                await strip(nb_path)
+
+        if stripped:
+            # Keep the order of the request
+            stripped.sort(key=notebooks.index)
+            code, _, stderr = await self.__execute(
+                ["git", "add", "--"] + stripped, cwd=repo_path
+            )
+            if code != 0:
+                get_logger().error(f"Failed to stage stripped notebooks: {stderr}")
+
+    async def get_output_filter(self, path: str) -> dict:
+        """Tell whether the output stripping filter is enabled in a repository.
+
+        Args:
+            path: Git repository path
+        """
+        code, _, _ = await self.__execute(
+            ["git", "config", "--local", "--get", f"filter.{FILTER_DRIVER}.process"],
+            cwd=path,
+        )
+        enabled = False
+        if code == 0:
+            attributes = await self._get_info_attributes(path)
+            if attributes is not None and attributes.exists():
+                lines = attributes.read_text().splitlines()
+                enabled = OUTPUT_FILTER_ATTRIBUTES in lines
+        return {"code": 0, "enabled": enabled}
+
+    async def set_output_filter(self, path: str, enabled: bool) -> dict:
+        """Enable or disable the output stripping filter in a repository.
+
+        The filter driver is a long-running process configured in the local
+        git configuration and applied to the notebooks through the repository
+        info/attributes file rather than a committed .gitattributes. Notebooks
+        are then staged without their outputs while the working tree files
+        keep them.
+
+        Args:
+            path: Git repository path
+            enabled: Whether to enable the filter
+        """
+        attributes = await self._get_info_attributes(path)
+        if attributes is None:
+            return {"code": 128, "message": "Not a git repository."}
+
+        if enabled:
+            process = f"{shlex.quote(sys.executable)} -m jupyterlab_git_core.filter"
+            cmd = [
+                "git",
+                "config",
+                "--local",
+                f"filter.{FILTER_DRIVER}.process",
+                process,
+            ]
+        else:
+            cmd = [
+                "git",
+                "config",
+                "--local",
+                "--remove-section",
+                f"filter.{FILTER_DRIVER}",
+            ]
+        code, _, error = await self.__execute(cmd, cwd=path)
+        # Removing a missing section is not an error
+        if code != 0 and enabled:
+            return {"code": code, "command": " ".join(cmd), "message": error}
+
+        try:
+            lines = attributes.read_text().splitlines() if attributes.exists() else []
+            lines = [line for line in lines if line != OUTPUT_FILTER_ATTRIBUTES]
+            if enabled:
+                lines.append(OUTPUT_FILTER_ATTRIBUTES)
+            attributes.parent.mkdir(parents=True, exist_ok=True)
+            attributes.write_text("".join(line + "\n" for line in lines))
+        except OSError as error:
+            return {"code": -1, "message": str(error)}
+        return {"code": 0, "enabled": enabled}
+
+    async def _get_info_attributes(self, path: str) -> Optional[Path]:
+        """Get the path of the repository info/attributes file."""
+        code, output, _ = await self.__execute(
+            ["git", "rev-parse", "--git-path", "info/attributes"], cwd=path
+        )
+        if code != 0:
+            return None
+        return Path(path) / output.strip()
+
     async def commit(self, commit_msg, amend, path, author=None):
         """
         Execute git commit <filename> command & return the result.
@@ -1419,22 +2930,25 @@ class Git:
         Push the current branch to the specified remote or determine default remote.
         Handles upstream configuration if needed.
         """
-        current_local_branch = await self.get_current_branch(local_path)
+        metadata = await self.repository_metadata(local_path)
+        if metadata["code"] != 0:
+            return metadata
+        current_local_branch = metadata["current_branch"]
+        if current_local_branch is None:
+            # Detached head or rebasing
+            current_local_branch = await self.get_current_branch(local_path)
         set_upstream = False
-        current_upstream_branch = await self.get_upstream_branch(
-            local_path, current_local_branch
-        )
+        current_upstream_branch = metadata["upstream"]
 
         if remote is not None:
-            set_upstream = current_upstream_branch["code"] != 0
+            set_upstream = current_upstream_branch is None
             remote_name, _, remote_branch = remote.partition("/")
             current_upstream_branch = {
-                "code": 0,
                 "remote_branch": remote_branch or current_local_branch,
                 "remote_short_name": remote_name,
             }
 
-        if current_upstream_branch["code"] == 0:
+        if current_upstream_branch is not None:
             branch = ":".join(["HEAD", current_upstream_branch["remote_branch"]])
             return await self.push(
                 current_upstream_branch["remote_short_name"],
@@ -1446,11 +2960,8 @@ class Git:
             )
 
         # fallback: use push.default or single remote
-        config = await self.config(local_path)
-        config_options = config["options"]
-        list_remotes = await self.remote_show(local_path)
-        remotes = list_remotes.get("remotes", [])
-        push_default = config_options.get("remote.pushdefault")
+        remotes = metadata["remotes"]
+        push_default = metadata["push_default"]
         default_remote = None
         if push_default is not None and push_default in remotes:
             default_remote = push_default
@@ -1582,34 +3093,140 @@ class Git:
             )
 
     async def get_upstream_branch(self, path, branch_name):
-        """Execute 'git rev-parse --abbrev-ref branch_name@{upstream}' to get
-        upstream branch name tracked by given local branch.
-        Reference : https://git-scm.com/docs/git-rev-parse#git-rev-parse-emltbranchnamegtupstreamemegemmasterupstreamememuem
-        """
-        command = [
-            "git",
-            "rev-parse",
-            "--abbrev-ref",
-            "{}@{{upstream}}".format(branch_name),
-        ]
-        code, output, error = await self.__execute(command, cwd=path)
-        if code != 0:
-            return {"code": code, "command": " ".join(command), "message": error}
-        rev_parse_output = output.strip()
+        """Get the upstream branch tracked by given local branch from the
+        references snapshot.
 
-        command = ["git", "config", "--local", "branch.{}.remote".format(branch_name)]
-        code, output, error = await self.__execute(command, cwd=path)
-        if code != 0:
-            return {"code": code, "command": " ".join(command), "message": error}
+        Returns:
+            {"code": int, "remote_short_name": str, "remote_branch": str}; the
+            code is 128 if the branch does not exist or has no upstream.
+        """
+        refs = await self.refs(path)
+        if refs["code"] != 0:
+            return refs
+
+        branch = next((b for b in refs["heads"] if b["name"] == branch_name), None)
+        if branch is None or branch["upstream_merge"] is None:
+            message = (
+                f"fatal: no such branch: '{branch_name}'"
+                if branch is None
+                else f"fatal: no upstream configured for branch '{branch_name}'"
+            )
+            return {
+                "code": 128,
+                "command": " ".join(for_each_ref_command()),
+                "message": message,
+            }
 
-        remote_name = output.strip()
-        remote_branch = rev_parse_output.strip().replace(remote_name + "/", "", 1)
+        remote_branch = branch["upstream_merge"]
+        if remote_branch.startswith("refs/heads/"):
+            remote_branch = remote_branch[len("refs/heads/") :]
         return {
-            "code": code,
-            "remote_short_name": remote_name,
+            "code": 0,
+            "remote_short_name": branch["upstream_remote"],
             "remote_branch": remote_branch,
         }
 
+    async def repository_metadata(self, path):
+        """Get the current branch, its upstream, the remotes and the default
+        push remote of a repository.
+
+        The current branch is read from HEAD and the rest from
+        `git config -z --list --show-origin`, whose options are kept until one
+        of the files they were read from, one of the default configuration
+        files or the git configuration environment changes.
+
+        Returns:
+            {
+                "code": int,
+                "current_branch": str | None,  # None if HEAD is detached
+                "upstream": {"remote_short_name": str, "remote_branch": str} | None,
+                "remotes": List[str],
+                "push_default": str | None,
+            }
+        """
+        git_dirs = find_git_dirs(path)
+        options = None
+        cached = None if git_dirs is None else self._config_cache.get(path)
+        if cached is not None:
+            files, fingerprint, cached_options = cached
+            if fingerprint == await anyio.to_thread.run_sync(config_fingerprint, files):
+                options = cached_options
+        if options is None:
+            cmd = ["git", "config", "-z", "--list", "--show-origin"]
+            code, output, error = await self.__execute(cmd, cwd=path)
+            if code != 0:
+                return {
+                    "code": code,
+                    "command": " ".join(cmd),
+                    "message": error.strip(),
+                }
+            options, origins = parse_config(output, path)
+            if git_dirs is not None:
+                files = config_files(*git_dirs)
+                files.extend(f for f in origins if f not in files)
+                fingerprint = await anyio.to_thread.run_sync(config_fingerprint, files)
+                if fingerprint is not None:
+                    self._config_cache.put(path, (files, fingerprint, options))
+
+        current_branch = None if git_dirs is None else read_head(git_dirs[0])
+        if (
+            git_dirs is None
+            or current_branch == REFTABLE_HEAD
+            or os.path.isdir(os.path.join(git_dirs[1], "reftable"))
+        ):
+            code, output, _ = await self.__execute(
+                ["git", "symbolic-ref", "-q", "--short", "HEAD"], cwd=path
+            )
+            current_branch = output.strip() if code == 0 and output.strip() else None
+        upstream = None
+        if current_branch is not None:
+            remote = options.get(f"branch.{current_branch}.remote")
+            merge = options.get(f"branch.{current_branch}.merge")
+            if remote and merge:
+                if merge.startswith("refs/heads/"):
+                    merge = merge[len("refs/heads/") :]
+                upstream = {"remote_short_name": remote, "remote_branch": merge}
+
+        remotes = []
+        for key in options:
+            if key.startswith("remote.") and key.endswith(".url"):
+                name = key[len("remote.") : -len(".url")]
+                if name not in remotes:
+                    remotes.append(name)
+
+        return {
+            "code": 0,
+            "current_branch": current_branch,
+            "upstream": upstream,
+            "remotes": remotes,
+            "push_default": options.get("remote.pushdefault"),
+        }
+
+    async def get_current_upstream_branch(self, path):
+        """Get the upstream branch tracked by the current branch from the
+        repository metadata.
+
+        Returns:
+            {"code": int, "remote_short_name": str, "remote_branch": str}; the
+            code is 128 if HEAD is detached or the branch has no upstream.
+        """
+        metadata = await self.repository_metadata(path)
+        if metadata["code"] != 0:
+            return metadata
+
+        if metadata["upstream"] is None:
+            branch_name = metadata["current_branch"]
+            return {
+                "code": 128,
+                "command": "git config -z --list --show-origin",
+                "message": (
+                    "fatal: HEAD does not point to a branch"
+                    if branch_name is None
+                    else f"fatal: no upstream configured for branch '{branch_name}'"
+                ),
+            }
+        return {"code": 0, **metadata["upstream"]}
+
     async def _get_tag(self, path, commit_sha):
         """Execute 'git describe commit_sha' to get
         nearest tag associated with latest commit in branch.
@@ -1630,25 +3247,111 @@ class Git:
                 )
             )
 
-    async def _get_base_ref(self, path, filename):
-        """Get the object reference for an unmerged ``filename`` at base stage.
-
-        Execute git ls-files -u -z <filename>
+    async def conflicts(self, path, contents=False, max_size=None):
+        """
+        Execute git ls-files -u -z & return the blobs of each unmerged file.
 
+        Args:
+            path: Git repository path
+            contents: Whether to read the blob contents; for notebooks, the
+                nbdime merge decisions are computed instead
+            max_size: Size in bytes above which the versions are not read
         Returns:
-            The object reference or None
+            {"code": int, "files": List[dict]} with for each file its "path"
+            and the blob object names "base", "ours" and "theirs" (None if the
+            file does not exist at that stage). If ``contents`` is requested,
+            a file has either "contents" ({"base", "ours", "theirs"} each
+            {"content", "is_binary", "size"} as returned by
+            ``get_content_at_reference``, None for a missing stage), "merge"
+            (three-way result of ``get_nbdiff``), "diff" (two-way result of
+            ``get_nbdiff`` for a notebook without base or with an empty one),
+            "too_large" with the "sizes" of the versions if one of them is
+            larger than ``max_size``, or "error".
         """
-        command = ["git", "ls-files", "-u", "-z", filename]
-
-        code, output, error = await self.__execute(command, cwd=path)
+        cmd = ["git", "ls-files", "-u", "-z"]
+        code, output, error = await self.__execute(cmd, cwd=path)
         if code != 0:
-            raise subprocess.CalledProcessError(
-                code, " ".join(command), output=output, stderr=error
+            return {"code": code, "command": " ".join(cmd), "message": error}
+
+        stages = {"1": "base", "2": "ours", "3": "theirs"}
+        files = {}
+        for line in strip_and_split(output):
+            if not line:
+                continue
+            info, filename = line.split("\t", 1)
+            _, blob, stage = info.split(" ")
+            entry = files.setdefault(
+                filename,
+                {"path": filename, "base": None, "ours": None, "theirs": None},
             )
+            entry[stages[stage]] = blob
+        files = list(files.values())
+
+        if contents:
+            blobs = {
+                entry[stage]
+                for entry in files
+                for stage in stages.values()
+                if entry[stage] is not None
+            }
+            sizes = {}
+            for blob, info in (await read_objects_info(path, sorted(blobs))).items():
+                if info is not None:
+                    sizes[blob] = info[2]
+            too_large = {
+                blob for blob, size in sizes.items() if max_size and size > max_size
+            }
+            # (content, is_binary) per blob
+            decoded = {}
+            for blob in blobs - too_large:
+                if blob in self._content_cache:
+                    decoded[blob] = self._content_cache.get(blob)
+            missing = sorted(blobs - too_large - decoded.keys())
+            for blob, data in (await read_objects(path, missing)).items():
+                if data is not None:
+                    content, is_binary = decode_blob(data)
+                    self._content_cache.put(blob, (content, is_binary), len(content))
+                    decoded[blob] = (content, is_binary)
+
+            def version(blob):
+                if blob not in decoded:
+                    return None
+                content, is_binary = decoded[blob]
+                return {"content": content, "is_binary": is_binary, "size": sizes[blob]}
+
+            async def fill(entry):
+                if any(entry[stage] in too_large for stage in stages.values()):
+                    entry["too_large"] = True
+                    entry["sizes"] = {
+                        stage: sizes.get(entry[stage]) for stage in stages.values()
+                    }
+                    return
+                versions = {stage: version(entry[stage]) for stage in stages.values()}
+                if not entry["path"].endswith(".ipynb"):
+                    entry["contents"] = versions
+                    return
+                ours, theirs, base = (
+                    versions[stage]["content"] if versions[stage] else ""
+                    for stage in ("ours", "theirs", "base")
+                )
+                try:
+                    if base:
+                        entry["merge"] = await self.get_nbdiff(ours, theirs, base)
+                    else:
+                        # Added on both sides or empty base: there is no common
+                        # version to merge from
+                        entry["diff"] = await self.get_nbdiff(ours, theirs)
+                except Exception as e:
+                    get_logger().error(
+                        f"Error computing the merge of {entry['path']}.", exc_info=e
+                    )
+                    entry["error"] = str(e)
 
-        split_line = strip_and_split(output)[0].split()
+            async with anyio.create_task_group() as tg:
+                for entry in files:
+                    tg.start_soon(fill, entry)
 
-        return split_line[1] if len(split_line) > 1 else None
+        return {"code": 0, "files": files}
 
     async def show(self, path, ref, filename=None, is_binary=False):
         """
@@ -1694,6 +3397,86 @@ class Git:
                 command=command,
             )
 
+    async def blame(self, path, filename, commit="HEAD"):
+        """Stream the attribution of the lines of a file at a given commit.
+
+        Execute git blame --incremental --porcelain <commit> -- <filename>
+
+        Line ranges are yielded as soon as git attributes them, by batches.
+        The full attribution is cached per (file, commit) once it completes.
+
+        Args:
+            path: Git repository path
+            filename: File path relatively to the repository
+            commit: Commit reference
+        Yields:
+            List[dict]: Line ranges in the format {
+                "commit": str, "original_line": int, "final_line": int,
+                "lines": int, "author": str, "author_mail": str,
+                "author_time": int, "summary": str, "filename": str
+            }
+        Raises:
+            GitCommandError: if the commit or the file cannot be found
+        """
+        command = ["git", "rev-parse", "--verify", "--quiet", f"{commit}^{{commit}}"]
+        code, output, error = await self.__execute(command, cwd=path)
+        if code != 0:
+            raise GitCommandError(
+                f"Error [{error}] occurred while executing [{' '.join(command)}] command to blame '{filename}'.",
+                command=command,
+            )
+        sha = output.strip()
+
+        key = (path, filename, sha)
+        cached = self._blame_cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+
+        command = ["git", "blame", "--incremental", "--porcelain", sha, "--", filename]
+        ranges = []
+        commits = {}
+        current = None
+        remainder = b""
+        async for chunk in execute_stream(
+            command, cwd=path, timeout=self._execute_timeout
+        ):
+            lines = (remainder + chunk).split(b"\n")
+            remainder = lines.pop()
+            batch = []
+            for line in lines:
+                line = line.decode("utf-8", errors="replace")
+                if current is None:
+                    match = GIT_BLAME_RANGE.match(line)
+                    if match is None:
+                        continue
+                    current = {
+                        "commit": match.group("commit"),
+                        "original_line": int(match.group("original_line")),
+                        "final_line": int(match.group("final_line")),
+                        "lines": int(match.group("lines")),
+                    }
+                    commits.setdefault(current["commit"], {})
+                    continue
+
+                key_name, _, value = line.partition(" ")
+                if key_name == "filename":
+                    current.update(commits[current["commit"]])
+                    current["filename"] = value
+                    batch.append(current)
+                    current = None
+                elif key_name in ("author", "author-mail", "summary", "previous"):
+                    commits[current["commit"]][key_name.replace("-", "_")] = value
+                elif key_name == "author-time":
+                    commits[current["commit"]]["author_time"] = int(value)
+                elif key_name == "boundary":
+                    commits[current["commit"]]["boundary"] = True
+            if batch:
+                ranges.extend(batch)
+                yield batch
+
+        self._blame_cache.put(key, ranges)
+
     async def get_content(self, contents_manager, filename, path):
         """
         Get the file content of filename.
@@ -1720,107 +3503,158 @@ class Git:
         return model["content"]
 
     async def get_content_at_reference(
-        self, filename, reference, path, contents_manager
+        self, filename, reference, path, contents_manager, max_size=None, pairing=False
     ):
         """
         Collect get content of the file at the git reference.
+
+        Except for the working tree, the object information and content are
+        read within a single git process. As blobs are immutable, their
+        content is cached per object name.
+
+        Args:
+            filename: File path relatively to the repository
+            reference: {"git": <ref>} or {"special": "WORKING" | "INDEX" | "BASE"}
+            path: Git repository path
+            contents_manager: Server contents manager
+            max_size: Size in bytes above which the content is not read
+            pairing: Whether to read the text file paired with a notebook instead
+        Returns:
+            {"content": str} completed by "size" and "is_binary" for git
+            objects; if the file is larger than ``max_size``, the content is
+            None and "too_large" is set. "paired_file" is set if the content
+            is the one of the paired text file.
         """
+        if pairing:
+            paired_file = await self.get_paired_file(path, filename, reference)
+            if paired_file is not None:
+                result = await self.get_content_at_reference(
+                    paired_file, reference, path, contents_manager, max_size
+                )
+                result["paired_file"] = paired_file
+                return result
+
         if "special" in reference:
             if reference["special"] == "WORKING":
+                filepath = self._working_file(path, filename)
+                if max_size:
+                    size = os.path.getsize(filepath) if os.path.isfile(filepath) else 0
+                    if size > max_size:
+                        return {"content": None, "size": size, "too_large": True}
                 content = await self.get_content(contents_manager, filename, path)
+                return {"content": content}
             elif reference["special"] == "INDEX":
-                is_binary = await self._is_binary(filename, "INDEX", path)
-                if is_binary:
-                    content = await self.show(
-                        path, reference["git"], filename, is_binary=True
-                    )
-                else:
-                    content = await self.show(path, "", filename)
+                object_name = f":{filename}"
             elif reference["special"] == "BASE":
                 # Special case of file in merge conflict for which we want the base (aka common ancestor) version
-                ref = await self._get_base_ref(path, filename)
-                content = await self.show(path, ref)
+                object_name = f":1:{filename}"
             else:
                 raise GitError(
                     f"Error while retrieving plaintext content, unknown special ref '{reference['special']}'"
                 )
         elif "git" in reference:
-            is_binary = await self._is_binary(filename, reference["git"], path)
-            if is_binary:
-                content = await self.show(
-                    path, reference["git"], filename, is_binary=True
-                )
-            else:
-                content = await self.show(path, reference["git"], filename)
+            object_name = f"{reference['git']}:{filename}"
         else:
-            content = ""
+            return {"content": ""}
 
-        return {"content": content}
-
-    async def _is_binary(self, filename, ref, path):
-        """
-        Determine whether Git handles a file as binary or text.
+        def with_contents(oid, object_type, size):
+            return (
+                object_type == "blob"
+                and oid not in self._content_cache
+                and not (max_size and size > max_size)
+            )
 
-        ## References
+        result = await read_object(path, object_name, with_contents)
+        if result is None or result[1] != "blob":
+            return {"content": ""}
 
-        -   <https://stackoverflow.com/questions/6119956/how-to-determine-if-git-handles-a-file-as-binary-or-as-text/6134127#6134127>
-        -   <https://git-scm.com/docs/git-diff#Documentation/git-diff.txt---numstat>
-        -   <https://git-scm.com/docs/git-diff#_other_diff_formats>
+        oid, _, size, data = result
+        if data is not None:
+            content, is_binary = decode_blob(data)
+            self._content_cache.put(oid, (content, is_binary), len(content))
+        elif oid in self._content_cache:
+            content, is_binary = self._content_cache.get(oid)
+        else:
+            return {"content": None, "size": size, "too_large": True}
 
-        Args:
-            filename (str): Filename (relative to the git repository)
-            ref (str): Commit reference or "INDEX" if file is staged
-            path (str): Git repository filepath
+        return {"content": content, "size": size, "is_binary": is_binary}
 
-        Returns:
-            bool: Is file binary?
+    async def content_size(self, path, filename, reference):
+        """
+        Get the size in bytes of the file at the git reference.
 
-        Raises:
-            HTTPError: if git command failed
+        Execute git cat-file -s <object> unless the reference is the working tree.
         """
-        if ref == "INDEX":
-            command = [
-                "git",
-                "diff",
-                "--numstat",
-                "--cached",
-                "4b825dc642cb6eb9a060e54bf8d69288fbee4904",
-                "--",
-                filename,
-            ]
-        else:
-            command = [
-                "git",
-                "diff",
-                "--numstat",
-                "4b825dc642cb6eb9a060e54bf8d69288fbee4904",
-                ref,
-                "--",
-                filename,
-            ]  # where 4b825... is a magic SHA which represents the empty tree
-        code, output, error = await self.__execute(command, cwd=path)
+        if reference.get("special") == "WORKING":
+            return os.path.getsize(self._working_file(path, filename))
 
-        if code != 0:
-            error_messages = map(
-                lambda n: n.lower(),
-                [
-                    "fatal: Path '{}' does not exist (neither on disk nor in the index)".format(
-                        filename
-                    ),
-                    "fatal: bad revision 'HEAD'",
-                ],
-            )
-            lower_error = error.lower()
-            if any([msg in lower_error for msg in error_messages]):
-                return False
+        object_name = self._object_name(filename, reference)
+        if object_name is None:
+            return 0
 
+        command = ["git", "cat-file", "-s", object_name]
+        code, output, error = await self.__execute(command, cwd=path)
+        if code != 0:
             raise GitCommandError(
-                f"Error while determining if file is binary or text '{error}'",
+                f"Error [{error}] occurred while executing [{' '.join(command)}] command.",
                 command=command,
             )
+        return int(output)
+
+    async def stream_content(
+        self, path, filename, reference, start=0, end=None
+    ) -> AsyncIterator[bytes]:
+        """
+        Stream the raw content of the file at the git reference.
+
+        Args:
+            path: Git repository path
+            filename: File path relatively to the repository
+            reference: File version in the format of ``get_content_at_reference``
+            start: First byte
+            end: Byte after the last one; default to the end of the file
+        Yields:
+            Chunks of the content; never more than ``CONTENT_CHUNK_SIZE`` for
+            the working tree.
+        """
+        if reference.get("special") == "WORKING":
+            with open(self._working_file(path, filename), "rb") as f:
+                f.seek(start)
+                position = start
+                while end is None or position < end:
+                    size = CONTENT_CHUNK_SIZE
+                    if end is not None:
+                        size = min(size, end - position)
+                    chunk = await anyio.to_thread.run_sync(f.read, size)
+                    if not chunk:
+                        break
+                    position += len(chunk)
+                    yield chunk
+            return
+
+        object_name = self._object_name(filename, reference)
+        if object_name is None:
+            return
 
-        # For binary files, `--numstat` outputs two `-` characters separated by TABs:
-        return output.startswith("-\t-\t")
+        position = 0
+        stream = execute_stream(
+            ["git", "cat-file", "blob", object_name],
+            cwd=path,
+            timeout=self._execute_timeout,
+        )
+        try:
+            async for chunk in stream:
+                chunk_start = position
+                position += len(chunk)
+                if position <= start:
+                    continue
+                chunk = chunk[max(0, start - chunk_start) :]
+                if end is not None and position >= end:
+                    yield chunk[: len(chunk) - (position - end)]
+                    break
+                yield chunk
+        finally:
+            await stream.aclose()
 
     async def remote_add(self, path, url, name=DEFAULT_REMOTE_NAME):
         """Handle call to `git remote add` command.
@@ -2004,27 +3838,27 @@ class Git:
 
         return None
 
-    async def tags(self, path):
+    async def tags(
+        self, path, query="", prefix=False, sort="name", offset=0, limit=None
+    ):
         """List all tags of the git repository, including the commit each tag points to.
 
+        The tags are read from the references snapshot; annotated tags are
+        peeled to their commit. They are searched, sorted and paged like the
+        branches; see ``branch``.
+
         path: str
             Git path repository
         """
-        formats = ["refname:short", "objectname"]
-        command = [
-            "git",
-            "for-each-ref",
-            "--format=" + "%09".join("%({})".format(f) for f in formats),
-            "refs/tags",
-        ]
-        code, output, error = await self.__execute(command, cwd=path)
-        if code != 0:
-            return {"code": code, "command": " ".join(command), "message": error}
-        tags = []
-        for tag_name, commit_id in (line.split("\t") for line in output.splitlines()):
-            tag = {"name": tag_name, "baseCommitId": commit_id}
-            tags.append(tag)
-        return {"code": code, "tags": tags}
+        refs = await self.refs(path)
+        if refs["code"] != 0:
+            return refs
+        try:
+            tags = self._refs_index(path, refs, "tags").select(query, prefix, sort)
+        except ValueError as error:
+            return {"code": -1, "message": str(error)}
+        end = None if limit is None else offset + limit
+        return {"code": 0, "tags": tags[offset:end], "total": len(tags)}
 
     async def tag_checkout(self, path, tag):
         """Checkout the git repository at a given tag.
@@ -2397,6 +4231,19 @@ class Git:
 
         return {"code": code, "submodules": results, "error": error}
 
+    @property
+    def diff_paired_notebooks(self) -> bool:
+        """Whether notebooks paired with a text file are diffed through that file by default."""
+        return False if self._config is None else self._config.diff_paired_notebooks
+
+    @property
+    def content_size_limit(self) -> int:
+        """Size in bytes above which only the metadata of a file content are returned.
+
+        0 means no limit.
+        """
+        return 0 if self._config is None else self._config.content_size_limit
+
     @property
     def excluded_paths(self) -> List[str]:
         """Wildcard-style path patterns that do not support git commands.
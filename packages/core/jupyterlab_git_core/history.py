@@ -0,0 +1,289 @@
+"""
+Persistent per-repository index of the commit history, used to answer
+filtered log queries without walking the whole history.
+"""
+
+import os
+import sqlite3
+import time
+from contextlib import closing
+from typing import Dict, List, Optional
+
+# Name of the index file within the repository git directory
+HISTORY_INDEX_FILE = os.path.join("jupyterlab-git", "history.sqlite")
+# Maximal number of indexed tips remembered to compute the incremental updates
+MAX_INDEXED_TIPS = 50
+# Git log format used to fill the index; one record per commit
+HISTORY_LOG_FORMAT = "%x1e%H%x1f%an%x1f%ae%x1f%at%x1f%P%x1f%s%x1f%b"
+# Maximal number of searched heads whose set of ancestors is stored
+MAX_REACHABLE_SETS = 4
+# Version of the index schema; an index with another version is rebuilt
+HISTORY_SCHEMA_VERSION = 3
+
+_DROP = """
+DROP TABLE IF EXISTS commits;
+DROP TABLE IF EXISTS paths;
+DROP TABLE IF EXISTS parents;
+DROP TABLE IF EXISTS tips;
+DROP TABLE IF EXISTS reachable;
+DROP TABLE IF EXISTS reachable_heads;
+"""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS commits (
+    sha TEXT PRIMARY KEY,
+    author TEXT NOT NULL,
+    email TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    parents TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS commits_timestamp ON commits (timestamp);
+CREATE TABLE IF NOT EXISTS paths (
+    sha TEXT NOT NULL,
+    path TEXT NOT NULL,
+    PRIMARY KEY (path, sha)
+);
+CREATE TABLE IF NOT EXISTS parents (
+    sha TEXT NOT NULL,
+    parent TEXT NOT NULL,
+    PRIMARY KEY (sha, parent)
+);
+CREATE TABLE IF NOT EXISTS tips (
+    sha TEXT PRIMARY KEY,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS reachable (
+    head TEXT NOT NULL,
+    sha TEXT NOT NULL,
+    PRIMARY KEY (head, sha)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS reachable_heads (
+    head TEXT PRIMARY KEY,
+    used_at REAL NOT NULL
+);
+"""
+
+
+def parse_history_log(output: str) -> List[Dict]:
+    """Parse the output of `git log -z --name-only --format=HISTORY_LOG_FORMAT`."""
+    commits = []
+    for record in output.split("\x1e"):
+        if not record:
+            continue
+        header, _, names = record.partition("\x00")
+        sha, author, email, timestamp, parents, subject, body = header.split("\x1f", 6)
+        commits.append(
+            {
+                "sha": sha,
+                "author": author,
+                "email": email,
+                "timestamp": int(timestamp),
+                "parents": parents,
+                "subject": subject,
+                "body": body.strip(),
+                "paths": [name for name in names.strip("\n").split("\x00") if name],
+            }
+        )
+    return commits
+
+
+def relative_date(timestamp: int, now: Optional[float] = None) -> str:
+    """Format a timestamp relatively to now, like git `%ar` does."""
+    diff = max(0, int((time.time() if now is None else now) - timestamp))
+    if diff < 90:
+        return f"{diff} seconds ago"
+    diff = (diff + 30) // 60
+    if diff < 90:
+        return f"{diff} minutes ago"
+    diff = (diff + 30) // 60
+    if diff < 36:
+        return f"{diff} hours ago"
+    diff = (diff + 12) // 24
+    if diff < 14:
+        return f"{diff} days ago"
+    if diff < 70:
+        return f"{(diff + 3) // 7} weeks ago"
+    if diff < 365:
+        return f"{(diff + 15) // 30} months ago"
+    return f"{(diff + 183) // 365} years ago"
+
+
+class HistoryIndex:
+    """SQLite index of the commits reachable from the tips indexed so far.
+
+    Commits are immutable so once a commit is stored it never needs to be
+    refreshed; the commits rewritten since they were indexed are kept but
+    only the ancestors of the searched head are returned. The ancestors of
+    the last MAX_REACHABLE_SETS searched heads are stored, so that a search
+    only walks the parents of a head once. Methods are blocking and are
+    expected to be run in a worker thread.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        connection = sqlite3.connect(self.db_path)
+        (version,) = connection.execute("PRAGMA user_version").fetchone()
+        if version != HISTORY_SCHEMA_VERSION:
+            connection.executescript(
+                _DROP + _SCHEMA + f"PRAGMA user_version = {HISTORY_SCHEMA_VERSION};"
+            )
+        return connection
+
+    def tips(self) -> List[str]:
+        """Return the most recently indexed tips."""
+        with closing(self._connect()) as connection:
+            return [
+                row[0]
+                for row in connection.execute(
+                    "SELECT sha FROM tips ORDER BY indexed_at DESC"
+                )
+            ]
+
+    def add(self, commits: List[Dict], tip: str) -> None:
+        """Store new commits and record ``tip`` as fully indexed."""
+        with closing(self._connect()) as connection, connection:
+            connection.executemany(
+                "INSERT OR IGNORE INTO commits VALUES (:sha, :author, :email, :timestamp, :parents, :subject, :body)",
+                commits,
+            )
+            connection.executemany(
+                "INSERT OR IGNORE INTO paths VALUES (?, ?)",
+                ((c["sha"], p) for c in commits for p in c["paths"]),
+            )
+            connection.executemany(
+                "INSERT OR IGNORE INTO parents VALUES (?, ?)",
+                ((c["sha"], p) for c in commits for p in c["parents"].split()),
+            )
+            connection.execute(
+                "INSERT OR REPLACE INTO tips VALUES (?, ?)", (tip, time.time())
+            )
+            connection.execute(
+                "DELETE FROM tips WHERE sha NOT IN (SELECT sha FROM tips ORDER BY indexed_at DESC LIMIT ?)",
+                (MAX_INDEXED_TIPS,),
+            )
+
+    def _forget_reachable(self, connection: sqlite3.Connection, heads: List[str]):
+        connection.executemany(
+            "DELETE FROM reachable WHERE head = ?", ((head,) for head in heads)
+        )
+        connection.executemany(
+            "DELETE FROM reachable_heads WHERE head = ?", ((head,) for head in heads)
+        )
+
+    def _reachable(self, connection: sqlite3.Connection, head: str) -> None:
+        """Store the ancestors of ``head`` unless they already are."""
+        updated = connection.execute(
+            "UPDATE reachable_heads SET used_at = ? WHERE head = ?", (time.time(), head)
+        )
+        if updated.rowcount:
+            return
+        connection.execute(
+            "INSERT INTO reachable "
+            "WITH RECURSIVE ancestors(sha) AS (VALUES (?) UNION "
+            "SELECT parents.parent FROM parents JOIN ancestors ON parents.sha = ancestors.sha) "
+            "SELECT ?, sha FROM ancestors",
+            (head, head),
+        )
+        connection.execute(
+            "INSERT INTO reachable_heads VALUES (?, ?)", (head, time.time())
+        )
+        evicted = [
+            row[0]
+            for row in connection.execute(
+                "SELECT head FROM reachable_heads ORDER BY used_at DESC LIMIT -1 OFFSET ?",
+                (MAX_REACHABLE_SETS,),
+            )
+        ]
+        self._forget_reachable(connection, evicted)
+
+    def remove_tips(self, tips: List[str]) -> None:
+        """Forget indexed tips, e.g. because they were garbage collected.
+
+        The index is emptied if no tip remains.
+        """
+        with closing(self._connect()) as connection, connection:
+            connection.executemany(
+                "DELETE FROM tips WHERE sha = ?", ((tip,) for tip in tips)
+            )
+            self._forget_reachable(connection, tips)
+            (remaining,) = connection.execute("SELECT COUNT(*) FROM tips").fetchone()
+            if remaining == 0:
+                for table in ("commits", "paths", "parents", "reachable_heads"):
+                    connection.execute(f"DELETE FROM {table}")
+                connection.execute("DELETE FROM reachable")
+
+    def search(
+        self,
+        head: str,
+        author: Optional[str] = None,
+        message: Optional[str] = None,
+        file_path: Optional[str] = None,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+        limit: int = 25,
+        offset: int = 0,
+    ) -> List[Dict]:
+        """Return the indexed ancestors of ``head`` matching all given filters,
+        newest first.
+
+        Args:
+            head: Commit whose history is searched; it must be indexed
+            author: Substring of the author name or email
+            message: Substring of the commit message
+            file_path: File or directory touched by the commit
+            since: Minimal commit timestamp (included)
+            until: Maximal commit timestamp (included)
+            limit: Maximal number of commits returned
+            offset: Number of matching commits to skip
+        """
+        clauses = [
+            "EXISTS (SELECT 1 FROM reachable WHERE reachable.head = ? AND reachable.sha = commits.sha)"
+        ]
+        parameters = [head]
+        if author:
+            clauses.append("(instr(lower(author), ?) OR instr(lower(email), ?))")
+            parameters.extend([author.lower()] * 2)
+        if message:
+            clauses.append("(instr(lower(subject), ?) OR instr(lower(body), ?))")
+            parameters.extend([message.lower()] * 2)
+        if file_path:
+            file_path = file_path.strip("/")
+            clauses.append(
+                "sha IN (SELECT sha FROM paths WHERE path = ? OR (path > ? AND path < ?))"
+            )
+            # Paths within the directory ``file_path`` sort between "<dir>/" and "<dir>0"
+            parameters.extend([file_path, file_path + "/", file_path + "0"])
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            parameters.append(since)
+        if until is not None:
+            clauses.append("timestamp <= ?")
+            parameters.append(until)
+
+        query = "SELECT sha, author, email, timestamp, parents, subject FROM commits"
+        query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY timestamp DESC LIMIT ? OFFSET ?"
+        parameters.extend([limit, offset])
+
+        with closing(self._connect()) as connection:
+            with connection:
+                self._reachable(connection, head)
+            return [
+                {
+                    "commit": sha,
+                    "author": author_name,
+                    "email": email,
+                    "timestamp": timestamp,
+                    "date": relative_date(timestamp),
+                    "commit_msg": subject,
+                    "pre_commits": parents.split(" ") if parents else [],
+                }
+                for sha, author_name, email, timestamp, parents, subject in connection.execute(
+                    query, parameters
+                )
+            ]
@@ -0,0 +1,355 @@
+"""
+Notebook jobs run in worker processes: nbdime diffs and merges, output
+scans and output clearing.
+
+nbdime is pure Python and CPU bound; running it in a thread of the server
+holds the GIL and slows down every other request. The outputs of notebooks,
+files or git blobs, are scanned by streaming their JSON, without loading
+them, and cleared in place.
+"""
+
+import json
+import multiprocessing
+import multiprocessing.pool
+import re
+import subprocess
+from typing import Any, BinaryIO, Callable, Dict, Iterator, Optional, Tuple
+
+import anyio
+import nbformat
+
+try:
+    from nbdime import diff_notebooks, merge_notebooks
+except ImportError:
+    diff_notebooks = None
+    merge_notebooks = None
+
+from .filter import clear_cell_outputs
+from .log import get_logger
+
+# Size of the chunks read when scanning a notebook
+SCAN_CHUNK_SIZE = 1 << 20
+
+_JSON_STRUCTURE = re.compile(rb'["{}\[\],:]')
+_QUOTE = ord('"')
+_BACKSLASH = ord("\\")
+
+
+def read_notebook(content) -> nbformat.NotebookNode:
+    """Read a notebook from its text or its model."""
+    if not content:
+        return nbformat.versions[nbformat.current_nbformat].new_notebook()
+    if isinstance(content, dict):
+        # Content may come from model as a dict directly
+        return (
+            nbformat.versions[content.get("nbformat", nbformat.current_nbformat)]
+            .nbjson.JSONReader()
+            .to_notebook(content)
+        )
+    else:
+        return nbformat.reads(content, as_version=4)
+
+
+# TODO Fix this in nbdime
+def remove_cell_ids(nb: nbformat.NotebookNode) -> nbformat.NotebookNode:
+    for cell in nb.cells:
+        cell.pop("id", None)
+    return nb
+
+
+def diff_notebook_contents(prev_content, curr_content) -> dict:
+    """Compute the nbdime diff between two notebook contents."""
+    prev_nb = read_notebook(prev_content)
+    curr_nb = read_notebook(curr_content)
+    return {"base": prev_nb, "diff": diff_notebooks(prev_nb, curr_nb)}
+
+
+def merge_notebook_contents(prev_content, curr_content, base_content) -> dict:
+    """Compute the nbdime merge decisions of two notebook contents."""
+    prev_nb = read_notebook(prev_content)
+    curr_nb = read_notebook(curr_content)
+    base_nb = read_notebook(base_content)
+    # Only remove ids from merge_notebooks as a workaround
+    _, merge_decisions = merge_notebooks(
+        remove_cell_ids(base_nb),
+        remove_cell_ids(prev_nb),
+        remove_cell_ids(curr_nb),
+    )
+    return {"base": base_nb, "merge_decisions": merge_decisions}
+
+
+def _string_end(data: bytes, start: int, lower: int) -> int:
+    """Get the index after the closing quote of a JSON string.
+
+    ``start`` is where to look for the quote and ``lower`` the first index of
+    the string content. Returns -1 if the string is not terminated in ``data``.
+    """
+    while True:
+        end = data.find(b'"', start)
+        if end < 0:
+            return -1
+        escape = end
+        while escape > lower and data[escape - 1] == _BACKSLASH:
+            escape -= 1
+        if (end - escape) % 2 == 0:
+            return end + 1
+        start = end + 1
+
+
+def iter_cell_outputs(
+    stream: BinaryIO, chunk_size: int = SCAN_CHUNK_SIZE
+) -> Iterator[Tuple[Optional[str], int, int]]:
+    """Iterate over the cells of a notebook JSON stream.
+
+    The stream is read by chunks and only the structure of the document is
+    followed; strings are skipped except the keys and the cell types. So the
+    memory used does not depend on the notebook size.
+
+    Yields:
+        ``(cell_type, number of outputs, outputs size in bytes)`` for each cell
+        once it has been read
+
+    Raises:
+        ValueError: if the stream is not a JSON document
+    """
+    data = b""
+    offset = 0  # Position of data in the stream
+    position = 0
+    stack = []  # Opened containers
+    keys = []  # Current key of each opened container
+    expect_key = False
+    cell_type, outputs, outputs_start, outputs_size = None, 0, 0, 0
+
+    def refill(keep: int) -> bool:
+        nonlocal data, offset
+        chunk = stream.read(chunk_size)
+        offset += keep
+        data = data[keep:] + chunk
+        return bool(chunk)
+
+    while True:
+        match = _JSON_STRUCTURE.search(data, position)
+        if match is None:
+            if not refill(len(data)):
+                break
+            position = 0
+            continue
+
+        char = data[match.start()]
+        position = match.end()
+        depth = len(stack)
+        in_cells = depth >= 2 and keys[0] == "cells"
+
+        if char == _QUOTE:
+            capture = expect_key or (in_cells and depth == 3 and keys[2] == "cell_type")
+            start = position
+            end = _string_end(data, position, start)
+            while end < 0:
+                if capture:
+                    keep = start
+                else:
+                    # Only trailing backslashes matter to find the closing quote
+                    keep = len(data)
+                    while keep > start and data[keep - 1] == _BACKSLASH:
+                        keep -= 1
+                resume = len(data) - keep
+                if not refill(keep):
+                    raise ValueError("Unterminated JSON string")
+                start = 0
+                end = _string_end(data, resume, start)
+            position = end
+            if capture:
+                value = json.loads(b'"' + data[start : end - 1] + b'"')
+                if expect_key:
+                    keys[-1] = value
+                    expect_key = False
+                else:
+                    cell_type = value
+        elif char in b"{[":
+            if in_cells and depth == 2:
+                cell_type, outputs, outputs_start, outputs_size = None, 0, 0, 0
+            elif in_cells and depth == 3 and keys[2] == "outputs":
+                outputs_start = offset + match.start()
+            elif in_cells and depth == 4 and keys[2] == "outputs":
+                outputs += 1
+            stack.append(char)
+            keys.append(None)
+            expect_key = char == ord("{")
+        elif char in b"}]":
+            if not stack:
+                raise ValueError("Unbalanced JSON document")
+            stack.pop()
+            keys.pop()
+            expect_key = False
+            depth = len(stack)
+            if in_cells and depth == 3 and keys[2] == "outputs":
+                outputs_size = offset + match.end() - outputs_start
+            elif in_cells and depth == 2:
+                yield cell_type, outputs, outputs_size
+        elif char == ord(","):
+            expect_key = bool(stack) and stack[-1] == ord("{")
+        else:
+            expect_key = False
+
+    if stack:
+        raise ValueError("Truncated JSON document")
+
+
+def scan_notebook_outputs(filename: str, sizes: bool = False) -> dict:
+    """Look for code cell outputs in a notebook file.
+
+    The scan stops at the first code cell with outputs unless ``sizes`` is set;
+    then the whole notebook is read to sum up the size of the outputs and the
+    size of the outputs of each code cell is listed in ``cells``.
+
+    Returns:
+        ``{"has_outputs": bool, "output_bytes": int[, "cells": [(index, bytes)]]}``
+    """
+    with open(filename, "rb") as stream:
+        return _scan_outputs(stream, sizes)
+
+
+def scan_blob_outputs(cwd: str, oid: str, sizes: bool = False) -> dict:
+    """Look for code cell outputs in a notebook blob.
+
+    The blob is streamed from git cat-file; see ``scan_notebook_outputs``.
+
+    Raises:
+        ValueError: if the blob cannot be read or is not a JSON document
+    """
+    process = subprocess.Popen(
+        ["git", "cat-file", "blob", oid],
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    with process:
+        try:
+            result = _scan_outputs(process.stdout, sizes)
+            if process.stdout.read(1):
+                # The scan stopped before the end of the blob
+                process.kill()
+                return result
+        except BaseException:
+            process.kill()
+            raise
+    if process.returncode != 0:
+        raise ValueError(f"Failed to read blob {oid}")
+    return result
+
+
+def clear_notebook_outputs(filename: str) -> bool:
+    """Clear the outputs of a notebook file in place.
+
+    Like nbconvert ClearOutputPreprocessor, the outputs, the execution counts
+    and the collapsed and scrolled metadata of the code cells are removed.
+
+    Returns:
+        Whether the notebook was modified
+    """
+    nb = nbformat.read(filename, as_version=nbformat.NO_CONVERT)
+    modified = clear_cell_outputs(nb)
+    if modified:
+        nbformat.write(nb, filename)
+    return modified
+
+
+def _scan_outputs(stream: BinaryIO, sizes: bool) -> dict:
+    has_outputs = False
+    output_bytes = 0
+    cells = []
+    for index, (cell_type, outputs, outputs_size) in enumerate(
+        iter_cell_outputs(stream)
+    ):
+        if cell_type == "code" and outputs:
+            has_outputs = True
+            output_bytes += outputs_size
+            if not sizes:
+                break
+            cells.append((index, outputs_size))
+    result = {"has_outputs": has_outputs, "output_bytes": output_bytes}
+    if sizes:
+        result["cells"] = cells
+    return result
+
+
+class NotebookPool:
+    """Pool of worker processes running notebook jobs.
+
+    The workers are spawned on the first job and replaced after
+    ``max_tasks_per_child`` jobs to release the memory of large notebooks.
+    A job running longer than ``timeout`` seconds retires its pool: a new one
+    is started for the next jobs, and the retired pool, with its stuck worker,
+    is terminated once the other jobs running in it complete.
+
+    The results are awaited in threads limited to ``processes``, so that
+    queued jobs do not take the threads of the server from other calls.
+
+    If ``processes`` is 0, jobs are run in a thread of the server process.
+    """
+
+    def __init__(
+        self,
+        processes: int = 2,
+        timeout: float = 60.0,
+        max_tasks_per_child: int = 50,
+    ):
+        self.processes = processes
+        self.timeout = timeout
+        self.max_tasks_per_child = max_tasks_per_child
+        self._pool: Optional[multiprocessing.pool.Pool] = None
+        # Number of jobs running in the current and retired pools
+        self._jobs: Dict[multiprocessing.pool.Pool, int] = {}
+        self._limiter: Optional[anyio.CapacityLimiter] = None
+
+    def _get_pool(self) -> multiprocessing.pool.Pool:
+        if self._pool is None:
+            self._pool = multiprocessing.get_context("spawn").Pool(
+                self.processes, maxtasksperchild=self.max_tasks_per_child or None
+            )
+        return self._pool
+
+    async def run(self, func: Callable, *args) -> Any:
+        """Run ``func(*args)`` in a worker and return its result.
+
+        Raises:
+            TimeoutError: if the job did not complete in time
+        """
+        if not self.processes:
+            return await anyio.to_thread.run_sync(func, *args)
+
+        if self._limiter is None:
+            self._limiter = anyio.CapacityLimiter(self.processes)
+        pool = self._get_pool()
+        job = pool.apply_async(func, args)
+        self._jobs[pool] = self._jobs.get(pool, 0) + 1
+        try:
+            return await anyio.to_thread.run_sync(
+                job.get, self.timeout or None, limiter=self._limiter
+            )
+        except multiprocessing.TimeoutError:
+            get_logger().warning(
+                "Notebook job {} did not complete within {} seconds; replacing its workers.".format(
+                    func.__name__, self.timeout
+                )
+            )
+            # The pool may have been replaced by a concurrent timeout
+            if self._pool is pool:
+                self._pool = None
+            raise TimeoutError(
+                f"Notebook job did not complete within {self.timeout} seconds."
+            )
+        finally:
+            self._jobs[pool] -= 1
+            if not self._jobs[pool]:
+                del self._jobs[pool]
+                if pool is not self._pool:
+                    pool.terminate()
+
+    def close(self) -> None:
+        """Terminate the worker processes."""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
+        for pool in self._jobs:
+            pool.terminate()
@@ -0,0 +1,367 @@
+"""
+Snapshot of the branches, remote branches and tags of a repository, read
+with a single git for-each-ref process, and of the repository metadata read
+from HEAD and the configuration.
+"""
+
+import bisect
+import heapq
+import os
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Namespaces of the references in a snapshot
+REF_PREFIXES = ["refs/heads/", "refs/remotes/", "refs/tags/"]
+# Fields of git for-each-ref listed for each reference
+REF_FIELDS = [
+    "refname",
+    "refname:short",
+    "objectname",
+    "*objectname",
+    "HEAD",
+    "upstream:short",
+    "upstream:remotename",
+    "upstream:remoteref",
+    "upstream:track,nobracket",
+    "creatordate:unix",
+]
+# Commits ahead and behind HEAD, computed in one batch; requires git 2.41
+AHEAD_BEHIND_FIELD = "ahead-behind:HEAD"
+# Files of the git directory changed when a reference, HEAD or an upstream changes
+REFS_FILES = ["HEAD", os.path.join("logs", "HEAD")]
+# Files and directories of the common directory shared by the worktrees
+REFS_COMMON_FILES = ["packed-refs", "config"]
+REFS_COMMON_DIRECTORIES = ["refs", "reftable"]
+# Branch HEAD points to on disk when the references are stored in a reftable
+REFTABLE_HEAD = ".invalid"
+# Environment variables selecting the configuration files, besides GIT_CONFIG*
+CONFIG_ENVIRONMENT = ["HOME", "XDG_CONFIG_HOME"]
+# Age under which a modification time may hide a later change in the same clock tick
+REFS_RACY_DELAY_NS = 1_000_000_000
+
+GIT_TRACK_AHEAD = re.compile(r"ahead (?P<count>\d+)")
+GIT_TRACK_BEHIND = re.compile(r"behind (?P<count>\d+)")
+# Orders in which the references can be listed
+REF_SORTS = ["name", "date"]
+
+
+def for_each_ref_command(ahead_behind: bool = False) -> List[str]:
+    """Get the git for-each-ref command listing the references of a snapshot.
+
+    Args:
+        ahead_behind: Whether to count the commits ahead and behind HEAD
+    """
+    fields = REF_FIELDS + ([AHEAD_BEHIND_FIELD] if ahead_behind else [])
+    return [
+        "git",
+        "for-each-ref",
+        "--format=" + "%09".join("%({})".format(f) for f in fields),
+    ] + REF_PREFIXES
+
+
+def _track_count(pattern: re.Pattern, track: str) -> int:
+    match = pattern.search(track)
+    return 0 if match is None else int(match.group("count"))
+
+
+def parse_refs(output: str) -> Dict[str, List[dict]]:
+    """Parse the output of the ``for_each_ref_command``.
+
+    Returns:
+        {"heads": [...], "remotes": [...], "tags": [...]}; the branches follow
+        the format of ``Git.branch`` completed by the upstream remote name
+        and merge reference and, if the upstream exists, the number of
+        commits ahead and behind it. The tags refer to the commit they point
+        to, annotated tags being peeled. All references come with their
+        creation date as a timestamp: the commit date for the branches and
+        the lightweight tags, the tagger date for the annotated tags.
+    """
+    snapshot = {"heads": [], "remotes": [], "tags": []}
+    for line in output.splitlines():
+        (
+            refname,
+            name,
+            oid,
+            peeled,
+            head,
+            upstream,
+            remote,
+            merge,
+            track,
+            date,
+            *ahead_behind,
+        ) = line.split("\t")
+        date = int(date) if date else None
+        if refname.startswith("refs/heads/"):
+            has_upstream = bool(upstream) and track != "gone"
+            branch = {
+                "is_current_branch": head == "*",
+                "is_remote_branch": False,
+                "name": name,
+                "upstream": upstream or None,
+                "top_commit": oid,
+                "tag": None,
+                "date": date,
+                "upstream_remote": remote or None,
+                "upstream_merge": merge or None,
+                "ahead": _track_count(GIT_TRACK_AHEAD, track) if has_upstream else None,
+                "behind": (
+                    _track_count(GIT_TRACK_BEHIND, track) if has_upstream else None
+                ),
+            }
+            if ahead_behind:
+                branch["head_ahead_behind"] = [
+                    int(count) for count in ahead_behind[0].split(" ")
+                ]
+            snapshot["heads"].append(branch)
+        elif refname.startswith("refs/remotes/"):
+            snapshot["remotes"].append(
+                {
+                    "is_current_branch": False,
+                    "is_remote_branch": True,
+                    "name": name,
+                    "upstream": None,
+                    "top_commit": oid,
+                    "tag": None,
+                    "date": date,
+                }
+            )
+        else:
+            snapshot["tags"].append(
+                {"name": name, "baseCommitId": peeled or oid, "date": date}
+            )
+    return snapshot
+
+
+def _date_order(ref: dict) -> Tuple[bool, int]:
+    # Most recent first, references without date last
+    date = ref.get("date")
+    return date is None, -(date or 0)
+
+
+class RefsIndex:
+    """Sorted views of a list of references of a snapshot, to search and page it.
+
+    The names are searched ignoring the case; a prefix is searched by
+    bisection over the case folded names. The orders by case folded name
+    and by date are built on first use.
+    """
+
+    def __init__(self, refs: List[dict]):
+        self._refs = refs
+        self._folded = None
+        self._by_date = None
+
+    def select(self, query: str = "", prefix: bool = False, sort: str = "name"):
+        """Get the references whose name matches a query, in the given order.
+
+        Args:
+            query: Text searched in the names, ignoring the case
+            prefix: Whether the names must start with the query
+            sort: "name" or "date", most recent first
+
+        Raises:
+            ValueError: if the sort order is unknown
+        """
+        if sort not in REF_SORTS:
+            raise ValueError(
+                f"Unknown sort order '{sort}', expected one of {REF_SORTS}"
+            )
+        query = query.casefold()
+        if sort == "date":
+            if self._by_date is None:
+                self._by_date = sorted(self._refs, key=_date_order)
+            refs = self._by_date
+        elif prefix and query:
+            if self._folded is None:
+                # (case folded name, position in the snapshot)
+                self._folded = sorted(
+                    (ref["name"].casefold(), i) for i, ref in enumerate(self._refs)
+                )
+            start = bisect.bisect_left(self._folded, (query,))
+            end = bisect.bisect_left(self._folded, (query + chr(0x10FFFF),), start)
+            return [
+                self._refs[i]
+                for _, i in sorted(self._folded[start:end], key=lambda f: f[1])
+            ]
+        else:
+            refs = self._refs
+
+        if not query:
+            return refs
+        if prefix:
+            return [ref for ref in refs if ref["name"].casefold().startswith(query)]
+        return [ref for ref in refs if query in ref["name"].casefold()]
+
+
+def merge_refs(sort: str, *refs: List[dict]) -> List[dict]:
+    """Join lists of references selected with the same order."""
+    if sort == "date":
+        return list(heapq.merge(*refs, key=_date_order))
+    return [ref for selection in refs for ref in selection]
+
+
+def find_git_dirs(path: str) -> Optional[Tuple[str, str]]:
+    """Find the git directory and the common directory of a working tree.
+
+    The ``.git`` entry is looked up from ``path`` upwards; it is followed if
+    it is a file, as in linked worktrees and submodules.
+
+    Returns:
+        (git directory, common directory) or None if not found
+    """
+    directory = os.path.abspath(path)
+    while True:
+        dotgit = os.path.join(directory, ".git")
+        if os.path.isdir(dotgit):
+            git_dir = dotgit
+            break
+        if os.path.isfile(dotgit):
+            try:
+                with open(dotgit) as f:
+                    content = f.read().strip()
+            except OSError:
+                return None
+            if not content.startswith("gitdir:"):
+                return None
+            git_dir = os.path.join(directory, content[len("gitdir:") :].strip())
+            break
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+    common_dir = git_dir
+    commondir_file = os.path.join(git_dir, "commondir")
+    if os.path.isfile(commondir_file):
+        try:
+            with open(commondir_file) as f:
+                common_dir = os.path.join(git_dir, f.read().strip())
+        except OSError:
+            return None
+    return os.path.normpath(git_dir), os.path.normpath(common_dir)
+
+
+def _stat(filename: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(filename)
+    except OSError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def files_fingerprint(paths: List[str]) -> Optional[tuple]:
+    """Fingerprint files and directories by their inode, size and modification time.
+
+    Returns:
+        The fingerprint or None if one of them was modified too recently to
+        tell a later modification apart
+    """
+    now = time.time_ns()
+    fingerprint = tuple((p, _stat(p)) for p in paths)
+    if any(
+        st is not None and now - st[2] < REFS_RACY_DELAY_NS for _, st in fingerprint
+    ):
+        return None
+    return fingerprint
+
+
+def refs_fingerprint(git_dir: str, common_dir: str) -> Optional[tuple]:
+    """Fingerprint the storage of the references of a repository.
+
+    git updates a reference by renaming a lock file over it, so adding,
+    updating or deleting a loose reference changes the modification time of
+    its directory. Packing the references rewrites packed-refs; moving HEAD
+    rewrites HEAD and its reflog; changing an upstream rewrites the config.
+
+    Returns:
+        See ``files_fingerprint``
+    """
+    paths = [os.path.join(git_dir, f) for f in REFS_FILES]
+    paths.extend(os.path.join(common_dir, f) for f in REFS_COMMON_FILES)
+    for name in REFS_COMMON_DIRECTORIES:
+        paths.extend(root for root, _, _ in os.walk(os.path.join(common_dir, name)))
+    return files_fingerprint(paths)
+
+
+def config_files(git_dir: str, common_dir: str) -> List[str]:
+    """Get the configuration files read by git by default in a repository.
+
+    They are fingerprinted even if they do not exist or set no option, so
+    that creating them invalidates the cached configuration; the files
+    actually read, includes among them, are listed by ``parse_config``.
+    """
+    xdg_config = os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")
+    global_files = (
+        [os.environ["GIT_CONFIG_GLOBAL"]]
+        if "GIT_CONFIG_GLOBAL" in os.environ
+        else [
+            os.path.join(xdg_config, "git", "config"),
+            os.path.expanduser("~/.gitconfig"),
+        ]
+    )
+    return [
+        os.environ.get("GIT_CONFIG_SYSTEM", "/etc/gitconfig"),
+        *global_files,
+        os.path.join(common_dir, "config"),
+        os.path.join(git_dir, "config.worktree"),
+    ]
+
+
+def config_fingerprint(paths: List[str]) -> Optional[tuple]:
+    """Fingerprint the configuration files and the environment selecting them.
+
+    Returns:
+        See ``files_fingerprint``
+    """
+    files = files_fingerprint(paths)
+    if files is None:
+        return None
+    environment = tuple(
+        sorted(
+            (key, value)
+            for key, value in os.environ.items()
+            if key.startswith("GIT_CONFIG") or key in CONFIG_ENVIRONMENT
+        )
+    )
+    return environment, files
+
+
+def parse_config(output: str, cwd: str = "") -> Tuple[Dict[str, str], List[str]]:
+    """Parse the output of ``git config -z --list --show-origin``.
+
+    Args:
+        output: Output of the command
+        cwd: Directory the command was run in; the origins are relative to it
+    Returns:
+        (options, files) with the last value of each key and the files the
+        options were read from
+    """
+    options = {}
+    files = []
+    entries = output.split("\0")
+    for origin, entry in zip(entries[::2], entries[1::2]):
+        if origin.startswith("file:"):
+            filename = os.path.normpath(os.path.join(cwd, origin[len("file:") :]))
+            if filename not in files:
+                files.append(filename)
+        key, _, value = entry.partition("\n")
+        options[key] = value
+    return options, files
+
+
+def read_head(git_dir: str) -> Optional[str]:
+    """Get the name of the branch checked out, None if HEAD is detached.
+
+    In a reftable repository, HEAD points to the placeholder branch
+    ``REFTABLE_HEAD``; the branch checked out must be asked to git.
+    """
+    try:
+        with open(os.path.join(git_dir, "HEAD")) as f:
+            head = f.read().strip()
+    except OSError:
+        return None
+    if head.startswith("ref: refs/heads/"):
+        return head[len("ref: refs/heads/") :]
+    return None
@@ -0,0 +1,114 @@
+from unittest.mock import patch
+
+import pytest
+
+from jupyterlab_git_core.git import Git, GitCommandError
+
+COMMIT = "1437ec0a5f7eac766fe4f27d211ff45e4da5c71f"
+PREVIOUS = "4ba9318fe90e3416faf7ef49fa15ed6fe3601330"
+
+BLAME_OUTPUT = f"""{COMMIT} 3 2 2
+author Alice
+author-mail <alice@example.com>
+author-time 1700000100
+author-tz +0000
+committer Alice
+committer-mail <alice@example.com>
+committer-time 1700000100
+committer-tz +0000
+summary Update the file
+previous {PREVIOUS} file.py
+filename file.py
+{PREVIOUS} 1 1 1
+author Bob
+author-mail <bob@example.com>
+author-time 1700000000
+author-tz +0000
+committer Bob
+committer-mail <bob@example.com>
+committer-time 1700000000
+committer-tz +0000
+summary Initial commit
+boundary
+filename old.py
+{COMMIT} 5 4 1
+filename file.py
+""".encode()
+
+
+@pytest.mark.asyncio
+async def test_blame():
+    async def stream(*args, **kwargs):
+        # Split the output in the middle of lines
+        for i in range(0, len(BLAME_OUTPUT), 100):
+            yield BLAME_OUTPUT[i : i + 100]
+
+    with patch("jupyterlab_git_core.git.execute") as mock_execute, patch(
+        "jupyterlab_git_core.git.execute_stream", side_effect=stream
+    ) as mock_stream:
+        # Given
+        mock_execute.return_value = (0, COMMIT + "\n", "")
+        git = Git()
+
+        # When
+        ranges = [r async for batch in git.blame("repo", "file.py") for r in batch]
+        cached = [r async for batch in git.blame("repo", "file.py") for r in batch]
+
+        # Then
+        mock_stream.assert_called_once_with(
+            ["git", "blame", "--incremental", "--porcelain", COMMIT, "--", "file.py"],
+            cwd="repo",
+            timeout=20.0,
+        )
+        assert mock_execute.call_count == 2
+        assert ranges == cached
+        assert ranges == [
+            {
+                "commit": COMMIT,
+                "original_line": 3,
+                "final_line": 2,
+                "lines": 2,
+                "author": "Alice",
+                "author_mail": "<alice@example.com>",
+                "author_time": 1700000100,
+                "summary": "Update the file",
+                "previous": f"{PREVIOUS} file.py",
+                "filename": "file.py",
+            },
+            {
+                "commit": PREVIOUS,
+                "original_line": 1,
+                "final_line": 1,
+                "lines": 1,
+                "author": "Bob",
+                "author_mail": "<bob@example.com>",
+                "author_time": 1700000000,
+                "summary": "Initial commit",
+                "boundary": True,
+                "filename": "old.py",
+            },
+            {
+                "commit": COMMIT,
+                "original_line": 5,
+                "final_line": 4,
+                "lines": 1,
+                "author": "Alice",
+                "author_mail": "<alice@example.com>",
+                "author_time": 1700000100,
+                "summary": "Update the file",
+                "previous": f"{PREVIOUS} file.py",
+                "filename": "file.py",
+            },
+        ]
+
+
+@pytest.mark.asyncio
+async def test_blame_unknown_commit():
+    with patch("jupyterlab_git_core.git.execute") as mock_execute:
+        # Given
+        mock_execute.return_value = (1, "", "")
+
+        # When
+        with pytest.raises(GitCommandError):
+            async for _ in Git().blame("repo", "file.py", "unknown"):
+                pass
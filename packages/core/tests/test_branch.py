@@ -1,9 +1,63 @@
+import os
+import time
 from pathlib import Path
 from unittest.mock import call, patch
 
 import pytest
 
 from jupyterlab_git_core.git import Git
+from jupyterlab_git_core.refs import for_each_ref_command
+
+REFS_COMMAND = for_each_ref_command(ahead_behind=True)
+
+
+def ref_line(
+    refname,
+    name,
+    sha="abcdefghijklmnopqrstuvwxyz01234567890123",
+    peeled="",
+    head=" ",
+    upstream="",
+    remote="",
+    merge="",
+    track="",
+    date="",
+):
+    """Format a line of the references snapshot."""
+    return "\t".join(
+        [refname, name, sha, peeled, head, upstream, remote, merge, track, date]
+    )
+
+
+def local_branch(
+    name, sha, current=False, upstream=None, ahead=None, behind=None, date=None
+):
+    remote, _, merge = upstream.partition("/") if upstream else (None, None, None)
+    return {
+        "is_current_branch": current,
+        "is_remote_branch": False,
+        "name": name,
+        "upstream": upstream,
+        "top_commit": sha,
+        "tag": None,
+        "date": date,
+        "upstream_remote": remote,
+        "upstream_merge": f"refs/heads/{merge}" if merge else None,
+        "ahead": ahead,
+        "behind": behind,
+    }
+
+
+def remote_branch(name, sha, date=None):
+    return {
+        "is_current_branch": False,
+        "is_remote_branch": True,
+        "name": name,
+        "upstream": None,
+        "top_commit": sha,
+        "tag": None,
+        "date": date,
+    }
 
 
 @pytest.mark.parametrize(
@@ -436,7 +490,7 @@ async def test_get_current_branch_detached_failure():
     [
         ("feature-foo", "main", "origin/withslash"),
         ("main", "main", "origin"),
-        ("feature/bar", "feature-foo", ""),
+        ("feature/bar", "feature-foo", "."),
         # Test upstream branch name starts with a letter contained in remote name
         ("rbranch", "rbranch", "origin"),
     ],
@@ -444,10 +498,22 @@ async def test_get_current_branch_detached_failure():
 async def test_get_upstream_branch_success(branch, upstream, remotename):
     with patch("jupyterlab_git_core.git.execute") as mock_execute:
         # Given
-        mock_execute.side_effect = [
-            (0, remotename + "/" + upstream, ""),
-            (0, remotename, ""),
-        ]
+        mock_execute.return_value = (
+            0,
+            "\n".join(
+                [
+                    ref_line("refs/heads/other", "other"),
+                    ref_line(
+                        f"refs/heads/{branch}",
+                        branch,
+                        upstream=f"{remotename}/{upstream}",
+                        remote=remotename,
+                        merge=f"refs/heads/{upstream}",
+                    ),
+                ]
+            ),
+            "",
+        )
 
         # When
         actual_response = await Git().get_upstream_branch(
@@ -455,31 +521,13 @@ async def test_get_upstream_branch_success(branch, upstream, remotename):
         )
 
         # Then
-        mock_execute.assert_has_calls(
-            [
-                call(
-                    [
-                        "git",
-                        "rev-parse",
-                        "--abbrev-ref",
-                        "{}@{{upstream}}".format(branch),
-                    ],
-                    cwd=str(Path("/bin") / "test_curr_path"),
-                    env=None,
-                    username=None,
-                    password=None,
-                    is_binary=False,
-                ),
-                call(
-                    ["git", "config", "--local", "branch.{}.remote".format(branch)],
-                    cwd=str(Path("/bin") / "test_curr_path"),
-                    env=None,
-                    username=None,
-                    password=None,
-                    is_binary=False,
-                ),
-            ],
-            any_order=False,
+        mock_execute.assert_called_once_with(
+            REFS_COMMAND,
+            cwd=str(Path("/bin") / "test_curr_path"),
+            env=None,
+            username=None,
+            password=None,
+            is_binary=False,
         )
         assert {
             "code": 0,
@@ -490,55 +538,64 @@ async def test_get_upstream_branch_success(branch, upstream, remotename):
 
 @pytest.mark.asyncio
 @pytest.mark.parametrize(
-    "outputs, message",
+    "output, message",
     [
+        ("", "fatal: no such branch: 'blah'"),
         (
-            (128, "", "fatal: no such branch: 'blah'"),
-            "Error [fatal: no such branch: 'blah'] "
-            "occurred while executing [git rev-parse --abbrev-ref blah@{upstream}] command to get upstream branch.",
-        ),
-        ((128, "", "fatal: no upstream configured for branch"), ""),
-        (
-            (
-                128,
-                "",
-                "fatal: ambiguous argument 'blah@origin': unknown revision or path not in the working tree.",
-            ),
-            "",
+            ref_line("refs/heads/blah", "blah"),
+            "fatal: no upstream configured for branch 'blah'",
         ),
     ],
 )
-async def test_get_upstream_branch_failure(outputs, message):
+async def test_get_upstream_branch_failure(output, message):
     with patch("jupyterlab_git_core.git.execute") as mock_execute:
         # Given
-        mock_execute.return_value = outputs
+        mock_execute.return_value = (0, output, "")
 
         # When
         response = await Git().get_upstream_branch(
             path=str(Path("/bin/test_curr_path")), branch_name="blah"
         )
-        expected = {
+
+        # Then
+        assert response == {
             "code": 128,
-            "command": "git rev-parse --abbrev-ref blah@{upstream}",
-            "message": outputs[2],
+            "command": " ".join(for_each_ref_command()),
+            "message": message,
         }
 
-        assert response == expected
+
+@pytest.mark.asyncio
+async def test_get_upstream_branch_git_error():
+    with patch("jupyterlab_git_core.git.execute") as mock_execute:
+        # Given
+        mock_execute.side_effect = [
+            (128, "", "fatal: unknown field name: ahead-behind:HEAD"),
+            (128, "", "fatal: not a git repository"),
+        ]
+        manager = Git()
+
+        # When
+        response = await manager.get_upstream_branch(
+            path="test_curr_path", branch_name="blah"
+        )
 
         # Then
-        mock_execute.assert_has_calls(
-            [
-                call(
-                    ["git", "rev-parse", "--abbrev-ref", "blah@{upstream}"],
-                    cwd=str(Path("/bin") / "test_curr_path"),
-                    env=None,
-                    username=None,
-                    password=None,
-                    is_binary=False,
-                )
-            ],
-            any_order=False,
+        assert response == {
+            "code": 128,
+            "command": " ".join(for_each_ref_command()),
+            "message": "fatal: not a git repository",
+        }
+        mock_execute.assert_called_with(
+            for_each_ref_command(),
+            cwd="test_curr_path",
+            env=None,
+            username=None,
+            password=None,
+            is_binary=False,
         )
+        # The ahead-behind atom is not requested anymore
+        assert manager._ahead_behind_atom is False
 
 
 @pytest.mark.asyncio
@@ -657,113 +714,62 @@ async def test_no_tags():
 async def test_branch_success():
     with patch("jupyterlab_git_core.git.execute") as mock_execute:
         # Given
-        process_output_heads = [
-            "feature-foo\tabcdefghijklmnopqrstuvwxyz01234567890123\torigin/feature-foo\t*",
-            "main\tabcdefghijklmnopqrstuvwxyz01234567890123\torigin/main\t ",
-            "feature-bar\t01234567899999abcdefghijklmnopqrstuvwxyz\t\t ",
-        ]
-        process_output_remotes = [
-            "origin/feature-foo\tabcdefghijklmnopqrstuvwxyz01234567890123",
-            "origin/main\tabcdefghijklmnopqrstuvwxyz01234567890123",
-        ]
-
-        mock_execute.side_effect = [
-            # Response for get all refs/heads
-            (0, "\n".join(process_output_heads), ""),
-            # Response for get all refs/remotes
-            (0, "\n".join(process_output_remotes), ""),
+        sha = "abcdefghijklmnopqrstuvwxyz01234567890123"
+        other_sha = "01234567899999abcdefghijklmnopqrstuvwxyz"
+        process_output = [
+            ref_line(
+                "refs/heads/feature-foo",
+                "feature-foo",
+                sha,
+                head="*",
+                upstream="origin/feature-foo",
+                remote="origin",
+                merge="refs/heads/feature-foo",
+                track="ahead 2",
+            ),
+            ref_line(
+                "refs/heads/main",
+                "main",
+                sha,
+                upstream="origin/main",
+                remote="origin",
+                merge="refs/heads/main",
+                track="ahead 1, behind 3",
+            ),
+            ref_line("refs/heads/feature-bar", "feature-bar", other_sha),
+            ref_line("refs/remotes/origin/feature-foo", "origin/feature-foo", sha),
+            ref_line("refs/remotes/origin/main", "origin/main", sha),
+            ref_line("refs/tags/v1.0", "v1.0", other_sha, peeled=sha),
         ]
+        mock_execute.return_value = (0, "\n".join(process_output), "")
 
+        current_branch = local_branch(
+            "feature-foo", sha, True, "origin/feature-foo", 2, 0
+        )
         expected_response = {
             "code": 0,
             "branches": [
-                {
-                    "is_current_branch": True,
-                    "is_remote_branch": False,
-                    "name": "feature-foo",
-                    "upstream": "origin/feature-foo",
-                    "top_commit": "abcdefghijklmnopqrstuvwxyz01234567890123",
-                    "tag": None,
-                },
-                {
-                    "is_current_branch": False,
-                    "is_remote_branch": False,
-                    "name": "main",
-                    "upstream": "origin/main",
-                    "top_commit": "abcdefghijklmnopqrstuvwxyz01234567890123",
-                    "tag": None,
-                },
-                {
-                    "is_current_branch": False,
-                    "is_remote_branch": False,
-                    "name": "feature-bar",
-                    "upstream": None,
-                    "top_commit": "01234567899999abcdefghijklmnopqrstuvwxyz",
-                    "tag": None,
-                },
-                {
-                    "is_current_branch": False,
-                    "is_remote_branch": True,
-                    "name": "origin/feature-foo",
-                    "upstream": None,
-                    "top_commit": "abcdefghijklmnopqrstuvwxyz01234567890123",
-                    "tag": None,
-                },
-                {
-                    "is_current_branch": False,
-                    "is_remote_branch": True,
-                    "name": "origin/main",
-                    "upstream": None,
-                    "top_commit": "abcdefghijklmnopqrstuvwxyz01234567890123",
-                    "tag": None,
-                },
+                current_branch,
+                local_branch("main", sha, upstream="origin/main", ahead=1, behind=3),
+                local_branch("feature-bar", other_sha),
+                remote_branch("origin/feature-foo", sha),
+                remote_branch("origin/main", sha),
             ],
-            "current_branch": {
-                "is_current_branch": True,
-                "is_remote_branch": False,
-                "name": "feature-foo",
-                "upstream": "origin/feature-foo",
-                "top_commit": "abcdefghijklmnopqrstuvwxyz01234567890123",
-                "tag": None,
-            },
+            "current_branch": current_branch,
+            "total": 5,
         }
 
         # When
         actual_response = await Git().branch(path=str(Path("/bin/test_curr_path")))
 
         # Then
-        mock_execute.assert_has_calls(
-            [
-                # call to get refs/heads
-                call(
-                    [
-                        "git",
-                        "for-each-ref",
-                        "--format=%(refname:short)%09%(objectname)%09%(upstream:short)%09%(HEAD)",
-                        "refs/heads/",
-                    ],
-                    cwd=str(Path("/bin") / "test_curr_path"),
-                    env=None,
-                    username=None,
-                    password=None,
-                    is_binary=False,
-                ),
-                # call to get refs/remotes
-                call(
-                    [
-                        "git",
-                        "for-each-ref",
-                        "--format=%(refname:short)%09%(objectname)",
-                        "refs/remotes/",
-                    ],
-                    cwd=str(Path("/bin") / "test_curr_path"),
-                    env=None,
-                    username=None,
-                    password=None,
-                    is_binary=False,
-                ),
-            ],
-            any_order=False,
+        mock_execute.assert_called_once_with(
+            REFS_COMMAND,
+            cwd=str(Path("/bin") / "test_curr_path"),
+            env=None,
+            username=None,
+            password=None,
+            is_binary=False,
         )
 
         assert expected_response == actual_response
@@ -773,12 +779,6 @@ async def test_branch_success():
 async def test_branch_failure():
     with patch("jupyterlab_git_core.git.execute") as mock_execute:
         # Given
-        expected_cmd = [
-            "git",
-            "for-each-ref",
-            "--format=%(refname:short)%09%(objectname)%09%(upstream:short)%09%(HEAD)",
-            "refs/heads/",
-        ]
         mock_execute.return_value = (
             128,
             "",
@@ -786,7 +786,7 @@ async def test_branch_failure():
         )
         expected_response = {
             "code": 128,
-            "command": " ".join(expected_cmd),
+            "command": " ".join(for_each_ref_command()),
             "message": "fatal: Not a git repository (or any of the parent directories): .git",
         }
 
@@ -794,97 +794,94 @@ async def test_branch_failure():
         actual_response = await Git().branch(path=str(Path("/bin/test_curr_path")))
 
         # Then
-        mock_execute.assert_called_once_with(
-            expected_cmd,
-            cwd=str(Path("/bin") / "test_curr_path"),
-            env=None,
-            username=None,
-            password=None,
-            is_binary=False,
+        mock_execute.assert_has_calls(
+            [
+                call(
+                    command,
+                    cwd=str(Path("/bin") / "test_curr_path"),
+                    env=None,
+                    username=None,
+                    password=None,
+                    is_binary=False,
+                )
+                # Retried without the ahead-behind atom
+                for command in (REFS_COMMAND, for_each_ref_command())
+            ]
         )
 
         assert expected_response == actual_response
 
 
 @pytest.mark.asyncio
-async def test_branch_success_detached_head():
+@pytest.mark.parametrize(
+    "current_branch_output, current_name",
+    [
+        ("* (HEAD detached at origin/feature-foo)", "origin/feature-foo"),
+        ("* (no branch, rebasing feature-foo)", "feature-foo"),
+    ],
+)
+@pytest.mark.parametrize("sort", ["name", "date"])
+async def test_branch_success_detached_head(current_branch_output, current_name, sort):
     with patch("jupyterlab_git_core.git.execute") as mock_execute:
         # Given
-        process_output_heads = [
-            "main\tabcdefghijklmnopqrstuvwxyz01234567890123\torigin/main\t "
-        ]
-        process_output_remotes = [
-            "origin/feature-foo\tabcdefghijklmnopqrstuvwxyz01234567890123"
+        sha = "abcdefghijklmnopqrstuvwxyz01234567890123"
+        process_output = [
+            ref_line(
+                "refs/heads/main",
+                "main",
+                sha,
+                upstream="origin/main",
+                remote="origin",
+                merge="refs/heads/main",
+            ),
+            ref_line("refs/remotes/origin/feature-foo", "origin/feature-foo", sha),
         ]
         detached_head_output = [
-            "* (HEAD detached at origin/feature-foo)",
+            current_branch_output,
             "  main",
             "  remotes/origin/feature-foo",
         ]
 
         mock_execute.side_effect = [
-            # Response for get all refs/heads
-            (0, "\n".join(process_output_heads), ""),
+            # Response for get all references
+            (0, "\n".join(process_output), ""),
             # Response for get current branch
             (128, "", "fatal: ref HEAD is not a symbolic ref"),
             # Response for get current branch detached
             (0, "\n".join(detached_head_output), ""),
-            # Response for get all refs/remotes
-            (0, "\n".join(process_output_remotes), ""),
         ]
 
+        current_branch = {
+            "is_current_branch": True,
+            "is_remote_branch": False,
+            "name": current_name,
+            "upstream": None,
+            "top_commit": None,
+            "tag": None,
+            "date": None,
+        }
         expected_response = {
             "code": 0,
             "branches": [
-                {
-                    "is_current_branch": False,
-                    "is_remote_branch": False,
-                    "name": "main",
-                    "upstream": "origin/main",
-                    "top_commit": "abcdefghijklmnopqrstuvwxyz01234567890123",
-                    "tag": None,
-                },
-                {
-                    "is_current_branch": True,
-                    "is_remote_branch": False,
-                    "name": "origin/feature-foo",
-                    "upstream": None,
-                    "top_commit": None,
-                    "tag": None,
-                },
-                {
-                    "is_current_branch": False,
-                    "is_remote_branch": True,
-                    "name": "origin/feature-foo",
-                    "upstream": None,
-                    "top_commit": "abcdefghijklmnopqrstuvwxyz01234567890123",
-                    "tag": None,
-                },
+                local_branch("main", sha, upstream="origin/main", ahead=0, behind=0),
+                current_branch,
+                remote_branch("origin/feature-foo", sha),
             ],
-            "current_branch": {
-                "is_current_branch": True,
-                "is_remote_branch": False,
-                "name": "origin/feature-foo",
-                "upstream": None,
-                "top_commit": None,
-                "tag": None,
-            },
+            "current_branch": current_branch,
+            "total": 3,
         }
 
         # When
-        actual_response = await Git().branch(path=str(Path("/bin/test_curr_path")))
+        actual_response = await Git().branch(
+            path=str(Path("/bin/test_curr_path")), sort=sort
+        )
 
         # Then
         mock_execute.assert_has_calls(
             [
-                # call to get refs/heads
+                # call to get all references
                 call(
-                    [
-                        "git",
-                        "for-each-ref",
-                        "--format=%(refname:short)%09%(objectname)%09%(upstream:short)%09%(HEAD)",
-                        "refs/heads/",
-                    ],
+                    REFS_COMMAND,
                     cwd=str(Path("/bin") / "test_curr_path"),
                     env=None,
                     username=None,
@@ -909,20 +906,6 @@ async def test_branch_success_detached_head():
                     password=None,
                     is_binary=False,
                 ),
-                # call to get refs/remotes
-                call(
-                    [
-                        "git",
-                        "for-each-ref",
-                        "--format=%(refname:short)%09%(objectname)",
-                        "refs/remotes/",
-                    ],
-                    cwd=str(Path("/bin") / "test_curr_path"),
-                    env=None,
-                    username=None,
-                    password=None,
-                    is_binary=False,
-                ),
             ],
             any_order=False,
         )
@@ -930,135 +913,139 @@ async def test_branch_success_detached_head():
         assert expected_response == actual_response
 
 
+def make_git_dir(root, age=60):
+    """Create the reference storage of a repository, modified ``age`` seconds ago."""
+    git_dir = root / ".git"
+    (git_dir / "refs" / "heads").mkdir(parents=True)
+    (git_dir / "refs" / "remotes" / "origin").mkdir(parents=True)
+    (git_dir / "HEAD").write_text("ref: refs/heads/main\n")
+    (git_dir / "config").write_text("[core]\n")
+    touch_git_dir(git_dir, age)
+    return git_dir
+
+
+def touch_git_dir(git_dir, age):
+    mtime = time.time_ns() - age * 1_000_000_000
+    for root, dirs, files in os.walk(git_dir):
+        for name in dirs + files:
+            os.utime(os.path.join(root, name), ns=(mtime, mtime))
+
+
 @pytest.mark.asyncio
-async def test_branch_success_rebasing():
+@pytest.mark.parametrize(
+    "filename, content",
+    [
+        # Create a branch
+        ("refs/heads/feature", "0" * 40),
+        # Fetch a new remote branch
+        ("refs/remotes/origin/main", "0" * 40),
+        # Pack the references
+        ("packed-refs", "# pack-refs with: peeled fully-peeled sorted\n"),
+        # Checkout another branch
+        ("HEAD", "ref: refs/heads/feature\n"),
+        # Set an upstream
+        ("config", '[core]\n[branch "main"]\n\tremote = origin\n'),
+    ],
+)
+async def test_refs_cached_until_storage_changes(tmp_path, filename, content):
+    git_dir = make_git_dir(tmp_path)
     with patch("jupyterlab_git_core.git.execute") as mock_execute:
         # Given
-        process_output_heads = [
-            "main\tabcdefghijklmnopqrstuvwxyz01234567890123\torigin/main\t ",
-            "feature-foo\tabcdefghijklmnopqrstuvwxyz01234567890123\torigin/feature-foo\t ",
-        ]
-        process_output_remotes = [
-            "origin/feature-foo\tabcdefghijklmnopqrstuvwxyz01234567890123"
-        ]
-        detached_head_output = [
-            "* (no branch, rebasing feature-foo)",
-            "  main",
-            "  feature-foo",
-            "  remotes/origin/feature-foo",
-        ]
+        sha = "abcdefghijklmnopqrstuvwxyz01234567890123"
+        mock_execute.return_value = (0, ref_line("refs/tags/v1", "v1", sha), "")
+        manager = Git()
+        await manager.tags(str(tmp_path))
+        await manager.tags(str(tmp_path))
+        assert mock_execute.call_count == 1
 
-        mock_execute.side_effect = [
-            # Response for get all refs/heads
-            (0, "\n".join(process_output_heads), ""),
-            # Response for get current branch
-            (128, "", "fatal: ref HEAD is not a symbolic ref"),
-            # Response for get current branch detached
-            (0, "\n".join(detached_head_output), ""),
-            # Response for get all refs/remotes
-            (0, "\n".join(process_output_remotes), ""),
-        ]
+        # When
+        changed = git_dir / filename
+        changed.write_text(content)
+        mtime = time.time_ns() - 30_000_000_000
+        for modified in (changed, changed.parent):
+            os.utime(modified, ns=(mtime, mtime))
+        actual_response = await manager.tags(str(tmp_path))
 
-        expected_response = {
+        # Then
+        assert mock_execute.call_count == 2
+        assert {
             "code": 0,
-            "branches": [
-                {
-                    "is_current_branch": False,
-                    "is_remote_branch": False,
-                    "name": "main",
-                    "upstream": "origin/main",
-                    "top_commit": "abcdefghijklmnopqrstuvwxyz01234567890123",
-                    "tag": None,
-                },
-                {
-                    "is_current_branch": False,
-                    "is_remote_branch": False,
-                    "name": "feature-foo",
-                    "upstream": "origin/feature-foo",
-                    "top_commit": "abcdefghijklmnopqrstuvwxyz01234567890123",
-                    "tag": None,
-                },
-                {
-                    "is_current_branch": True,
-                    "is_remote_branch": False,
-                    "name": "feature-foo",
-                    "upstream": None,
-                    "top_commit": None,
-                    "tag": None,
-                },
-                {
-                    "is_current_branch": False,
-                    "is_remote_branch": True,
-                    "name": "origin/feature-foo",
-                    "upstream": None,
-                    "top_commit": "abcdefghijklmnopqrstuvwxyz01234567890123",
-                    "tag": None,
-                },
-            ],
-            "current_branch": {
-                "is_current_branch": True,
-                "is_remote_branch": False,
-                "name": "feature-foo",
-                "upstream": None,
-                "top_commit": None,
-                "tag": None,
-            },
-        }
+            "tags": [{"name": "v1", "baseCommitId": sha, "date": None}],
+            "total": 1,
+        } == actual_response
+
+
+@pytest.mark.asyncio
+async def test_refs_not_cached_when_recently_modified(tmp_path):
+    make_git_dir(tmp_path, age=0)
+    with patch("jupyterlab_git_core.git.execute") as mock_execute:
+        # Given
+        mock_execute.return_value = (0, "", "")
+        manager = Git()
 
         # When
-        actual_response = await Git().branch(path=str(Path("/bin/test_curr_path")))
+        await manager.branch_remotes(str(tmp_path))
+        await manager.branch_remotes(str(tmp_path))
 
         # Then
-        mock_execute.assert_has_calls(
-            [
-                # call to get refs/heads
-                call(
-                    [
-                        "git",
-                        "for-each-ref",
-                        "--format=%(refname:short)%09%(objectname)%09%(upstream:short)%09%(HEAD)",
-                        "refs/heads/",
-                    ],
-                    cwd=str(Path("/bin") / "test_curr_path"),
-                    env=None,
-                    username=None,
-                    password=None,
-                    is_binary=False,
-                ),
-                # call to get current branch
-                call(
-                    ["git", "symbolic-ref", "--short", "HEAD"],
-                    cwd=str(Path("/bin") / "test_curr_path"),
-                    env=None,
-                    username=None,
-                    password=None,
-                    is_binary=False,
-                ),
-                # call to get current branch name given a detached head
-                call(
-                    ["git", "branch", "-a"],
-                    cwd=str(Path("/bin") / "test_curr_path"),
-                    env=None,
-                    username=None,
-                    password=None,
-                    is_binary=False,
-                ),
-                # call to get refs/remotes
-                call(
-                    [
-                        "git",
-                        "for-each-ref",
-                        "--format=%(refname:short)%09%(objectname)",
-                        "refs/remotes/",
-                    ],
-                    cwd=str(Path("/bin") / "test_curr_path"),
-                    env=None,
-                    username=None,
-                    password=None,
-                    is_binary=False,
-                ),
-            ],
-            any_order=False,
-        )
+        assert mock_execute.call_count == 2
 
-        assert expected_response == actual_response
+
+SEARCHED_REFS = [
+    ref_line("refs/heads/feature-a", "feature-a", head="*", date="1700000300"),
+    ref_line("refs/heads/main", "main", date="1700000100"),
+    ref_line("refs/heads/release/1.0", "release/1.0", date="1700000000"),
+    ref_line("refs/remotes/origin/Feature-b", "origin/Feature-b", date="1700000400"),
+    ref_line("refs/remotes/origin/main", "origin/main", date="1700000200"),
+]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "options, names, total",
+    [
+        ({"query": "feature"}, ["feature-a", "origin/Feature-b"], 2),
+        ({"query": "main", "prefix": True}, ["main"], 1),
+        ({"query": "release/", "prefix": True}, ["release/1.0"], 1),
+        ({"query": "Feature", "prefix": True}, ["feature-a"], 1),
+        ({"query": "ORIGIN/f", "prefix": True}, ["origin/Feature-b"], 1),
+        (
+            {"query": "Origin/", "prefix": True, "sort": "date"},
+            ["origin/Feature-b", "origin/main"],
+            2,
+        ),
+        (
+            {"sort": "date"},
+            ["origin/Feature-b", "feature-a", "origin/main", "main", "release/1.0"],
+            5,
+        ),
+        ({"sort": "date", "offset": 1, "limit": 2}, ["feature-a", "origin/main"], 5),
+        ({"query": "main", "offset": 1, "limit": 5}, ["origin/main"], 2),
+    ],
+)
+async def test_branch_search(options, names, total):
+    with patch("jupyterlab_git_core.git.execute") as mock_execute:
+        # Given
+        mock_execute.return_value = (0, "\n".join(SEARCHED_REFS), "")
+
+        # When
+        actual_response = await Git().branch("test_curr_path", **options)
+
+        # Then
+        assert [b["name"] for b in actual_response["branches"]] == names
+        assert actual_response["total"] == total
+        assert actual_response["current_branch"]["name"] == "feature-a"
+
+
+@pytest.mark.asyncio
+async def test_branch_search_unknown_sort():
+    with patch("jupyterlab_git_core.git.execute") as mock_execute:
+        # Given
+        mock_execute.return_value = (0, "\n".join(SEARCHED_REFS), "")
+
+        # When
+        actual_response = await Git().branch("test_curr_path", sort="size")
+
+        # Then
+        assert actual_response["code"] == -1
+        assert "size" in actual_response["message"]
@@ -3,7 +3,7 @@ from unittest.mock import patch
 
 import pytest
 
-from jupyterlab_git_core.git import Git
+from jupyterlab_git_core.git import Git, GitParameterError
 
 
 @pytest.mark.asyncio
@@ -29,6 +29,7 @@ async def test_detailed_log():
             "code": 0,
             "commit_body": "Test Description with leading and trailing spaces",
             "modified_file_note": "7 files changed, 60 insertions(+), 19 deletions(-)",
+            "renames": "full",
             "modified_files_count": "7",
             "number_of_insertions": "60",
             "number_of_deletions": "19",
@@ -97,6 +98,7 @@ async def test_detailed_log():
             [
                 "git",
                 "log",
+                "-l1000",
                 "--cc",
                 "-m",
                 "-1",
@@ -111,6 +113,192 @@ async def test_detailed_log():
             username=None,
             password=None,
             is_binary=False,
+            timeout=10.0,
         )
 
         assert expected_response == actual_response
+
+
+@pytest.mark.asyncio
+async def test_detailed_log_paging_and_summary():
+    with patch("jupyterlab_git_core.git.execute") as mock_execute:
+        # Given
+        sha = "f29660a2472e24164906af8653babeb48e4bf2ab"
+        process_output = [
+            "Vendor update",
+            "\n1\t0\tREADME.md",
+            "2\t1\tvendor/a/x.py",
+            "3\t2\tvendor/a/y.py",
+            "4\t0\tvendor/b/z.py",
+            "5\t3\tvendor/setup.py",
+            "-\t-\tsrc/logo.png",
+        ]
+        mock_execute.return_value = (0, "\x00".join(process_output) + "\x00", "")
+        git = Git()
+
+        # When
+        summary = await git.detailed_log(sha, "repo", summary=True)
+        drill_down = await git.detailed_log(
+            sha, "repo", summary=True, directory="vendor", offset=1, limit=1
+        )
+        page = await git.detailed_log(
+            sha, "repo", directory="vendor/", offset=1, limit=2
+        )
+
+        # Then
+        mock_execute.assert_called_once()
+        assert "modified_files" not in summary
+        assert summary["modified_files_count"] == "6"
+        assert summary["directories_count"] == 3
+        assert summary["directories"] == [
+            {"directory": "", "modified_files_count": 1, "insertion": 1, "deletion": 0},
+            {
+                "directory": "src",
+                "modified_files_count": 1,
+                "insertion": 0,
+                "deletion": 0,
+            },
+            {
+                "directory": "vendor",
+                "modified_files_count": 4,
+                "insertion": 14,
+                "deletion": 6,
+            },
+        ]
+        assert drill_down["modified_file_note"] == (
+            "4 files changed, 14 insertions(+), 6 deletions(-)"
+        )
+        assert drill_down["directories_count"] == 3
+        assert drill_down["directories"] == [
+            {
+                "directory": "vendor/a",
+                "modified_files_count": 2,
+                "insertion": 5,
+                "deletion": 3,
+            }
+        ]
+        assert page["modified_files_count"] == "4"
+        assert [f["modified_file_path"] for f in page["modified_files"]] == [
+            "vendor/a/y.py",
+            "vendor/b/z.py",
+        ]
+
+
+@pytest.mark.asyncio
+async def test_detailed_logs():
+    with patch("jupyterlab_git_core.git.execute") as mock_execute:
+        # Given
+        merge = "57b84713f8bc4062684b06c62b18b488e1443fca"
+        commit = "8e0dbc6bf6d64d0bf56cbd3de9be320712fe241e"
+        process_output = (
+            f"\x1e{merge}\x00\x00\n1\t0\tz\x00"
+            f"\x00\x1e{merge}\x00\x00\n2\t1\tc\x00"
+            f"\x00\x1e{commit}\x00  Body of the commit \x00\n1\t0\tz\x00"
+            "0\t0\t\x00folder1/old.py\x00folder2/new.py\x00"
+            "-\t-\tbinary_file.png\x00"
+        )
+        mock_execute.return_value = (0, process_output, "")
+
+        # When
+        actual_response = await Git().detailed_logs(
+            path=str(Path("/bin/test_curr_path")),
+            selected_hashes=[merge, commit],
+        )
+
+        # Then
+        mock_execute.assert_called_once_with(
+            [
+                "git",
+                "log",
+                "-l1000",
+                "--cc",
+                "-m",
+                "--numstat",
+                "--pretty=format:%x1e%H%x00%b%x00",
+                "-z",
+                "--skip=0",
+                "--max-count=100",
+                "--no-walk=unsorted",
+                "--end-of-options",
+                merge,
+                commit,
+            ],
+            cwd=str(Path("/bin") / "test_curr_path"),
+            env=None,
+            username=None,
+            password=None,
+            is_binary=False,
+            timeout=10.0,
+        )
+
+        assert actual_response["code"] == 0
+        assert actual_response["renames"] == "full"
+        merge_details, commit_details = actual_response["commits"]
+        assert merge_details["commit"] == merge
+        assert merge_details["commit_body"] == ""
+        assert [f["modified_file_path"] for f in merge_details["modified_files"]] == [
+            "z",
+            "c",
+        ]
+        assert (
+            merge_details["modified_file_note"]
+            == "2 files changed, 3 insertions(+), 1 deletions(-)"
+        )
+        assert commit_details["commit"] == commit
+        assert commit_details["commit_body"] == "Body of the commit"
+        assert commit_details["modified_files"][1] == {
+            "modified_file_path": "folder2/new.py",
+            "modified_file_name": "folder1/old.py => folder2/new.py",
+            "previous_file_path": "folder1/old.py",
+            "insertion": "0",
+            "deletion": "0",
+            "is_binary": False,
+        }
+        assert commit_details["modified_files"][2]["is_binary"]
+
+
+@pytest.mark.asyncio
+async def test_detailed_logs_requires_commits():
+    with pytest.raises(GitParameterError):
+        await Git().detailed_logs(path="test_curr_path")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"revision_range": "--output=/tmp/log"},
+        {"selected_hashes": ["abc", "--output=/tmp/log"]},
+    ],
+)
+async def test_detailed_logs_rejects_options(options):
+    with patch("jupyterlab_git_core.git.execute") as mock_execute:
+        with pytest.raises(GitParameterError):
+            await Git().detailed_logs(path="test_curr_path", **options)
+        mock_execute.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_detailed_logs_range_paged():
+    with patch("jupyterlab_git_core.git.execute") as mock_execute:
+        # Given
+        mock_execute.return_value = (0, "", "warning: rename detection was skipped")
+
+        # When
+        actual_response = await Git().detailed_logs(
+            path="test_curr_path",
+            revision_range="main..feature",
+            offset=200,
+            limit=1000,
+        )
+
+        # Then
+        command = mock_execute.call_args.args[0]
+        assert command[:3] == ["git", "log", "-l1000"]
+        assert command[-4:] == [
+            "--skip=200",
+            "--max-count=100",
+            "--end-of-options",
+            "main..feature",
+        ]
+        assert actual_response == {"code": 0, "commits": [], "renames": "exact"}
@@ -1,13 +1,20 @@
 import json
+import os
+import shutil
+import subprocess
 import nbformat
 from pathlib import Path
-from subprocess import CalledProcessError
-from unittest.mock import patch
+from subprocess import CalledProcessError, TimeoutExpired
+from unittest.mock import call, patch
 
 import pytest
 
 
-from jupyterlab_git_core.git import Git, GitCommandError
+from jupyterlab_git_core import git as git_module
+from jupyterlab_git_core.git import EMPTY_TREE, Git, GitParameterError
+
+HEAD = "64950a634cd11d1a01ddfedaeffed67b531cb11e"
+ORIGIN_HEAD = "a6d8e3e1b2c4f5a7980b1c2d3e4f5a6b7c8d9e0f"
 
 
 @pytest.mark.asyncio
@@ -22,7 +29,14 @@ async def test_changed_files_invalid_input():
 async def test_changed_files_single_commit():
     with patch("jupyterlab_git_core.git.execute") as mock_execute:
         # Given
-        mock_execute.return_value = (0, "file1.ipynb\x00file2.py\x00", "")
+        mock_execute.side_effect = [
+            (
+                0,
+                "64950a634cd11d1a01ddfedaeffed67b531cb11e\n^a6d8e3e1b2c4f5a7980b1c2d3e4f5a6b7c8d9e0f\n",
+                "",
+            ),
+            (0, "file1.ipynb\x00file2.py\x00", ""),
+        ]
 
         # When
         actual_response = await Git().changed_files(
@@ -31,10 +45,11 @@ async def test_changed_files_single_commit():
         )
 
         # Then
-        mock_execute.assert_called_once_with(
+        mock_execute.assert_called_with(
             [
                 "git",
                 "diff",
+                "-l1000",
                 "64950a634cd11d1a01ddfedaeffed67b531cb11e^!",
                 "--name-only",
                 "-z",
@@ -44,8 +59,13 @@ async def test_changed_files_single_commit():
             username=None,
             password=None,
             is_binary=False,
+            timeout=10.0,
         )
-        assert {"code": 0, "files": ["file1.ipynb", "file2.py"]} == actual_response
+        assert {
+            "code": 0,
+            "files": ["file1.ipynb", "file2.py"],
+            "renames": "full",
+        } == actual_response
 
 
 @pytest.mark.asyncio
@@ -61,21 +81,29 @@ async def test_changed_files_working_tree():
 
         # Then
         mock_execute.assert_called_once_with(
-            ["git", "diff", "HEAD", "--name-only", "-z"],
+            ["git", "diff", "-l1000", "HEAD", "--name-only", "-z"],
             cwd="test-path",
             env=None,
             username=None,
             password=None,
             is_binary=False,
+            timeout=10.0,
         )
-        assert {"code": 0, "files": ["file1.ipynb", "file2.py"]} == actual_response
+        assert {
+            "code": 0,
+            "files": ["file1.ipynb", "file2.py"],
+            "renames": "full",
+        } == actual_response
 
 
 @pytest.mark.asyncio
 async def test_changed_files_index():
     with patch("jupyterlab_git_core.git.execute") as mock_execute:
         # Given
-        mock_execute.return_value = (0, "file1.ipynb\x00file2.py", "")
+        mock_execute.side_effect = [
+            (0, ".git/index\n" + HEAD + "\n", ""),
+            (0, "file1.ipynb\x00file2.py", ""),
+        ]
 
         # When
         actual_response = await Git().changed_files(
@@ -83,22 +111,30 @@ async def test_changed_files_index():
         )
 
         # Then
-        mock_execute.assert_called_once_with(
-            ["git", "diff", "--staged", "HEAD", "--name-only", "-z"],
+        mock_execute.assert_called_with(
+            ["git", "diff", "-l1000", "--staged", "HEAD", "--name-only", "-z"],
             cwd="test-path",
             env=None,
             username=None,
             password=None,
             is_binary=False,
+            timeout=10.0,
         )
-        assert {"code": 0, "files": ["file1.ipynb", "file2.py"]} == actual_response
+        assert {
+            "code": 0,
+            "files": ["file1.ipynb", "file2.py"],
+            "renames": "full",
+        } == actual_response
 
 
 @pytest.mark.asyncio
 async def test_changed_files_two_commits():
     with patch("jupyterlab_git_core.git.execute") as mock_execute:
         # Given
-        mock_execute.return_value = (0, "file1.ipynb\x00file2.py", "")
+        mock_execute.side_effect = [
+            (0, HEAD + "\n" + ORIGIN_HEAD + "\n", ""),
+            (0, "file1.ipynb\x00file2.py", ""),
+        ]
 
         # When
         actual_response = await Git().changed_files(
@@ -106,157 +142,217 @@ async def test_changed_files_two_commits():
         )
 
         # Then
-        mock_execute.assert_called_once_with(
-            ["git", "diff", "HEAD", "origin/HEAD", "--name-only", "-z", "--"],
+        mock_execute.assert_called_with(
+            [
+                "git",
+                "diff",
+                "-l1000",
+                "HEAD",
+                "origin/HEAD",
+                "--name-only",
+                "-z",
+                "--",
+            ],
             cwd="test-path",
             env=None,
             username=None,
             password=None,
             is_binary=False,
+            timeout=10.0,
         )
-        assert {"code": 0, "files": ["file1.ipynb", "file2.py"]} == actual_response
+        assert {
+            "code": 0,
+            "files": ["file1.ipynb", "file2.py"],
+            "renames": "full",
+        } == actual_response
 
 
 @pytest.mark.asyncio
-async def test_changed_files_git_diff_error():
+async def test_changed_files_cached_for_resolved_commits():
     with patch("jupyterlab_git_core.git.execute") as mock_execute:
         # Given
-        mock_execute.side_effect = CalledProcessError(128, b"cmd", b"error message")
+        mock_execute.side_effect = [
+            (0, HEAD + "\n" + ORIGIN_HEAD + "\n", ""),
+            (0, "file1.ipynb\x00file2.py", ""),
+            (0, HEAD + "\n" + ORIGIN_HEAD + "\n", ""),
+        ]
+        manager = Git()
+        await manager.changed_files(path="test-path", base="HEAD", remote="origin/HEAD")
 
         # When
-        actual_response = await Git().changed_files(
+        actual_response = await manager.changed_files(
             path="test-path", base="HEAD", remote="origin/HEAD"
         )
 
         # Then
-        mock_execute.assert_called_once_with(
-            ["git", "diff", "HEAD", "origin/HEAD", "--name-only", "-z", "--"],
+        assert mock_execute.call_count == 3
+        mock_execute.assert_called_with(
+            ["git", "rev-parse", "HEAD", "origin/HEAD"],
             cwd="test-path",
             env=None,
             username=None,
             password=None,
             is_binary=False,
         )
-        assert {"code": 128, "message": "error message"} == actual_response
+        assert {
+            "code": 0,
+            "files": ["file1.ipynb", "file2.py"],
+            "renames": "full",
+        } == actual_response
 
 
 @pytest.mark.asyncio
-@pytest.mark.parametrize(
-    "args, cli_result, cmd, expected",
-    [
-        (
-            ("dummy.txt", "ar539ie5", "/bin"),
-            (0, "2\t1\tdummy.txt", ""),
-            [
-                "git",
-                "diff",
-                "--numstat",
-                "4b825dc642cb6eb9a060e54bf8d69288fbee4904",
-                "ar539ie5",
-                "--",
-                "dummy.txt",
-            ],
-            False,
-        ),
-        (
-            ("dummy.png", "ar539ie5", "/bin"),
-            (0, "-\t-\tdummy.png", ""),
-            [
-                "git",
-                "diff",
-                "--numstat",
-                "4b825dc642cb6eb9a060e54bf8d69288fbee4904",
-                "ar539ie5",
-                "--",
-                "dummy.png",
-            ],
-            True,
-        ),
-        (
-            ("dummy.txt", "INDEX", "/bin"),
-            (0, "2\t1\tdummy.txt", ""),
-            [
-                "git",
-                "diff",
-                "--numstat",
-                "--cached",
-                "4b825dc642cb6eb9a060e54bf8d69288fbee4904",
-                "--",
-                "dummy.txt",
-            ],
-            False,
-        ),
-        (
-            ("dummy.png", "INDEX", "/bin"),
-            (0, "-\t-\tdummy.png", ""),
-            [
-                "git",
-                "diff",
-                "--numstat",
-                "--cached",
-                "4b825dc642cb6eb9a060e54bf8d69288fbee4904",
-                "--",
-                "dummy.png",
-            ],
-            True,
-        ),
-        (
-            ("dummy.txt", "ar539ie5", "/bin"),
-            (128, "", "fatal: Git command failed"),
+async def test_changed_files_index_cache_invalidated(tmp_path):
+    index = tmp_path / "index"
+    index.write_bytes(b"DIRC")
+    with patch("jupyterlab_git_core.git.execute") as mock_execute:
+        # Given
+        mock_execute.side_effect = [
+            (0, "index\n" + HEAD + "\n", ""),
+            (0, "file1.ipynb", ""),
+            (0, "index\n" + HEAD + "\n", ""),
+            (0, "file2.py", ""),
+        ]
+        manager = Git()
+        await manager.changed_files(path=str(tmp_path), base="INDEX", remote="HEAD")
+        index.write_bytes(b"DIRC staged")
+
+        # When
+        actual_response = await manager.changed_files(
+            path=str(tmp_path), base="INDEX", remote="HEAD"
+        )
+
+        # Then
+        assert mock_execute.call_count == 4
+        assert {"code": 0, "files": ["file2.py"], "renames": "full"} == actual_response
+
+
+@pytest.mark.asyncio
+async def test_changed_files_git_diff_error():
+    with patch("jupyterlab_git_core.git.execute") as mock_execute:
+        # Given
+        mock_execute.side_effect = [
+            (0, HEAD + "\n" + ORIGIN_HEAD + "\n", ""),
+            CalledProcessError(128, b"cmd", b"error message"),
+        ]
+
+        # When
+        actual_response = await Git().changed_files(
+            path="test-path", base="HEAD", remote="origin/HEAD"
+        )
+
+        # Then
+        mock_execute.assert_called_with(
             [
                 "git",
                 "diff",
-                "--numstat",
-                "4b825dc642cb6eb9a060e54bf8d69288fbee4904",
-                "ar539ie5",
+                "-l1000",
+                "HEAD",
+                "origin/HEAD",
+                "--name-only",
+                "-z",
                 "--",
-                "dummy.txt",
             ],
-            Exception,
-        ),
-        (
-            ("dummy.txt", "ar539ie5", "/bin"),
+            cwd="test-path",
+            env=None,
+            username=None,
+            password=None,
+            is_binary=False,
+            timeout=10.0,
+        )
+        assert {"code": 128, "message": "error message"} == actual_response
+
+
+@pytest.mark.asyncio
+async def test_changed_files_only_exact_renames():
+    with patch("jupyterlab_git_core.git.execute") as mock_execute:
+        # Given
+        mock_execute.side_effect = [
+            (0, HEAD + "\n" + ORIGIN_HEAD + "\n", ""),
             (
-                128,
-                "",
-                "fatal: Path 'dummy.txt' does not exist (neither on disk nor in the index)",
+                0,
+                "file1.ipynb\x00file2.py",
+                "warning: exhaustive rename detection was skipped due to too many files.\n",
             ),
-            [
-                "git",
-                "diff",
-                "--numstat",
-                "4b825dc642cb6eb9a060e54bf8d69288fbee4904",
-                "ar539ie5",
-                "--",
-                "dummy.txt",
-            ],
-            False,
-        ),
-    ],
-)
-async def test_is_binary_file(args, cli_result, cmd, expected):
+        ]
+
+        # When
+        actual_response = await Git().changed_files(
+            path="test-path", base="HEAD", remote="origin/HEAD"
+        )
+
+        # Then
+        assert actual_response["renames"] == "exact"
+
+
+@pytest.mark.asyncio
+async def test_changed_files_rename_timeout():
     with patch("jupyterlab_git_core.git.execute") as mock_execute:
         # Given
-        mock_execute.return_value = cli_result
-
-        if isinstance(expected, type) and issubclass(expected, Exception):
-            with pytest.raises(GitCommandError):
-                await Git()._is_binary(*args)
-        else:
-            # When
-            actual_response = await Git()._is_binary(*args)
-
-            # Then
-            mock_execute.assert_called_once_with(
-                cmd,
-                cwd="/bin",
-                env=None,
-                username=None,
-                password=None,
-                is_binary=False,
-            )
+        mock_execute.side_effect = [
+            (0, ".git/index\n" + HEAD + "\n", ""),
+            TimeoutExpired("git diff", 10.0),
+            (0, "file1.ipynb\x00file2.py", ""),
+        ]
+
+        # When
+        actual_response = await Git().changed_files(
+            path="test-path", base="INDEX", remote="HEAD"
+        )
+
+        # Then
+        assert mock_execute.call_args == call(
+            ["git", "diff", "--no-renames", "--staged", "HEAD", "--name-only", "-z"],
+            cwd="test-path",
+            env=None,
+            username=None,
+            password=None,
+            is_binary=False,
+        )
+        assert {
+            "code": 0,
+            "files": ["file1.ipynb", "file2.py"],
+            "renames": "none",
+        } == actual_response
 
-            assert actual_response == expected
+
+@pytest.mark.asyncio
+async def test_get_content_at_reference_without_batch_command(tmp_path, monkeypatch):
+    # Given
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "file.txt").write_text("staged content\n")
+    subprocess.run(["git", "init", "-q"], cwd=repo, check=True)
+    subprocess.run(["git", "add", "file.txt"], cwd=repo, check=True)
+    # Emulate git < 2.36
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    (bin_dir / "git").write_text(
+        "#!/bin/sh\n"
+        'for arg in "$@"; do\n'
+        '  if [ "$arg" = "--batch-command" ]; then\n'
+        '    echo "error: unknown option \\`batch-command\'" >&2; exit 129\n'
+        "  fi\n"
+        "done\n"
+        f'exec {shutil.which("git")} "$@"\n'
+    )
+    (bin_dir / "git").chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setattr(git_module, "_batch_command_supported", None)
+    git = Git()
+
+    # When
+    content = await git.get_content_at_reference(
+        "file.txt", {"special": "INDEX"}, str(repo), None
+    )
+    missing = await git.get_content_at_reference(
+        "unknown.txt", {"special": "INDEX"}, str(repo), None
+    )
+
+    # Then
+    assert content == {"content": "staged content\n", "size": 15, "is_binary": False}
+    assert missing == {"content": ""}
+    assert git_module._batch_command_supported is False
 
 
 nbdime = pytest.importorskip("nbdime", reason="nbdime is not installed")
@@ -290,6 +386,32 @@ async def test_Git_get_nbdiff_dict():
     assert result == expected_result
 
 
+@pytest.mark.asyncio
+async def test_Git_get_nbdiff_cached():
+    HERE = Path(__file__).parent.resolve()
+
+    manager = Git()
+    prev_content = (HERE / "samples" / "ipynb_base.json").read_text()
+    curr_content = (HERE / "samples" / "ipynb_remote.json").read_text()
+
+    with patch.object(
+        manager._notebook_pool, "run", wraps=manager._notebook_pool.run
+    ) as mock_diff:
+        first = await manager.get_nbdiff(prev_content, curr_content)
+        # A model is hashed from its serialization, not from the file text
+        second = await manager.get_nbdiff(prev_content, json.loads(curr_content))
+        reverse = await manager.get_nbdiff(curr_content, prev_content)
+        again = await manager.get_nbdiff(prev_content, curr_content)
+
+    assert mock_diff.call_count == 3
+    assert first == second
+    assert again is first
+    assert reverse != first
+    assert manager._nbdiff_cache.nbytes == sum(
+        len(json.dumps(r)) for r in (first, second, reverse)
+    )
+
+
 @pytest.mark.asyncio
 async def test_Git_get_nbdiff_no_content():
     HERE = Path(__file__).parent.resolve()
@@ -302,3 +424,224 @@ async def test_Git_get_nbdiff_no_content():
         "base": nbformat.versions[nbformat.current_nbformat].new_notebook(),
         "diff": [],
     }
+
+
+@pytest.mark.asyncio
+async def test_diff_file():
+    with patch("jupyterlab_git_core.git.execute") as mock_execute:
+        # Given
+        mock_execute.return_value = (
+            0,
+            "diff --git a/HEAD~1:data.csv b/HEAD:data.csv\n"
+            "index 8e1e71d..c1d4a43 100644\n"
+            "--- a/HEAD~1:data.csv\n"
+            "+++ b/HEAD:data.csv\n"
+            "@@ -2,3 +2,3 @@ header\n"
+            " a\n"
+            "-b\n"
+            "+c\n"
+            " d\n"
+            "@@ -40 +40,2 @@\n"
+            " z\n"
+            "+end\n"
+            "\\ No newline at end of file\n",
+            "",
+        )
+
+        # When
+        actual_response = await Git().diff_file(
+            "repo", "data.csv", {"git": "HEAD~1"}, {"git": "HEAD"}, context=1
+        )
+
+        # Then
+        mock_execute.assert_called_once_with(
+            [
+                "git",
+                "diff",
+                "--no-color",
+                "--no-ext-diff",
+                "-U1",
+                "HEAD~1:data.csv",
+                "HEAD:data.csv",
+            ],
+            cwd="repo",
+            env=None,
+            username=None,
+            password=None,
+            is_binary=False,
+        )
+        assert actual_response == {
+            "code": 0,
+            "is_binary": False,
+            "hunks": [
+                {
+                    "old_start": 2,
+                    "old_lines": 3,
+                    "new_start": 2,
+                    "new_lines": 3,
+                    "header": "header",
+                    "lines": [" a", "-b", "+c", " d"],
+                },
+                {
+                    "old_start": 40,
+                    "old_lines": 1,
+                    "new_start": 40,
+                    "new_lines": 2,
+                    "header": "",
+                    "lines": [" z", "+end", "\\ No newline at end of file"],
+                },
+            ],
+        }
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "previous, current, args",
+    [
+        ({"special": "INDEX"}, {"special": "WORKING"}, ["--", "file.txt"]),
+        ({"git": "HEAD"}, {"special": "WORKING"}, ["HEAD", "--", "file.txt"]),
+        ({"git": "HEAD"}, {"special": "INDEX"}, ["HEAD:file.txt", ":0:file.txt"]),
+        ({"special": "BASE"}, {"git": "HEAD"}, [":1:file.txt", "HEAD:file.txt"]),
+        ({}, {"git": "HEAD"}, [EMPTY_TREE, "HEAD", "--", "file.txt"]),
+        ({}, {"special": "INDEX"}, ["--cached", EMPTY_TREE, "--", "file.txt"]),
+    ],
+)
+async def test_diff_file_references(previous, current, args):
+    with patch("jupyterlab_git_core.git.execute") as mock_execute:
+        # Given
+        mock_execute.return_value = (0, "", "")
+
+        # When
+        actual_response = await Git().diff_file("repo", "file.txt", previous, current)
+
+        # Then
+        mock_execute.assert_called_once_with(
+            ["git", "diff", "--no-color", "--no-ext-diff", "-U3"] + args,
+            cwd="repo",
+            env=None,
+            username=None,
+            password=None,
+            is_binary=False,
+        )
+        assert actual_response == {"code": 0, "is_binary": False, "hunks": []}
+
+
+@pytest.mark.asyncio
+async def test_diff_file_rejects_working_as_previous():
+    with pytest.raises(GitParameterError):
+        await Git().diff_file(
+            "repo", "file.txt", {"special": "WORKING"}, {"special": "INDEX"}
+        )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("filename", ["../secret.txt", "link.txt", ".git/config"])
+async def test_working_tree_rejects_files_outside(tmp_path, filename):
+    # Given
+    repo = tmp_path / "repo"
+    (repo / ".git").mkdir(parents=True)
+    (repo / ".git" / "config").write_text("[core]\n")
+    (tmp_path / "secret.txt").write_text("secret\n")
+    (repo / "link.txt").symlink_to(tmp_path / "secret.txt")
+    working = {"special": "WORKING"}
+
+    with patch("jupyterlab_git_core.git.execute") as mock_execute:
+        # When / Then
+        with pytest.raises(GitParameterError):
+            await Git().file_lines(str(repo), filename, working, 1, 10)
+        with pytest.raises(GitParameterError):
+            await Git().diff_file(str(repo), filename, {}, working)
+        with pytest.raises(GitParameterError):
+            await Git().diff_file(str(repo), filename, {"git": "HEAD"}, working)
+        with pytest.raises(GitParameterError):
+            await Git().content_size(str(repo), filename, working)
+        with pytest.raises(GitParameterError):
+            async for _ in Git().stream_content(str(repo), filename, working):
+                pass
+        mock_execute.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_file_lines_stops_reading_after_end():
+    chunks = []
+
+    async def stream(*args, **kwargs):
+        for chunk in [b"1\n2\n3", b"\n4\n5\n", b"6\n7\n"]:
+            chunks.append(chunk)
+            yield chunk
+
+    with patch(
+        "jupyterlab_git_core.git.execute_stream", side_effect=stream
+    ) as mock_stream:
+        # When
+        actual_response = await Git().file_lines(
+            "repo", "file.txt", {"git": "HEAD"}, 3, 4
+        )
+
+        # Then
+        mock_stream.assert_called_once_with(
+            ["git", "cat-file", "blob", "HEAD:file.txt"], cwd="repo", timeout=20.0
+        )
+        assert actual_response == {"code": 0, "lines": ["3", "4"]}
+        assert len(chunks) == 2
+
+
+@pytest.mark.asyncio
+async def test_stream_content_range():
+    async def stream(*args, **kwargs):
+        for chunk in [b"0123", b"4567", b"89ab", b"cdef"]:
+            yield chunk
+
+    with patch(
+        "jupyterlab_git_core.git.execute_stream", side_effect=stream
+    ) as mock_stream:
+        # When
+        chunks = [
+            chunk
+            async for chunk in Git().stream_content(
+                "repo", "file.bin", {"special": "INDEX"}, 5, 10
+            )
+        ]
+
+        # Then
+        mock_stream.assert_called_once_with(
+            ["git", "cat-file", "blob", ":0:file.bin"], cwd="repo", timeout=20.0
+        )
+        assert chunks == [b"567", b"89"]
+
+
+@pytest.mark.asyncio
+async def test_diff_renamed_file(tmp_path):
+    # Given
+    def git(*args):
+        subprocess.run(["git", *args], cwd=tmp_path, check=True, capture_output=True)
+
+    git("init")
+    git("config", "user.name", "Test")
+    git("config", "user.email", "test@example.com")
+    (tmp_path / "old name.txt").write_text("".join(f"line {i}\n" for i in range(20)))
+    (tmp_path / "other.txt").write_text("a\n")
+    git("add", ".")
+    git("commit", "-m", "first")
+    git("mv", "old name.txt", "new name.txt")
+    (tmp_path / "other.txt").write_text("b\n")
+    git("add", ".")
+    git("commit", "-m", "second")
+
+    # When
+    actual_response = await Git().diff(str(tmp_path), "HEAD~1", "HEAD")
+
+    # Then
+    assert actual_response == {
+        "code": 0,
+        "result": [
+            {
+                "insertions": "0",
+                "deletions": "0",
+                "previous_filename": "old name.txt",
+                "filename": "new name.txt",
+            },
+            {"insertions": "1", "deletions": "1", "filename": "other.txt"},
+        ],
+        "renames": "full",
+    }
@@ -1,6 +1,10 @@
+import subprocess
+import sys
+
+import anyio
 import pytest
 from unittest.mock import patch
-from jupyterlab_git_core.git import Git, _get_execution_lock
+from jupyterlab_git_core.git import Git, _get_execution_lock, execute_stream
 
 
 @pytest.mark.anyio
@@ -24,3 +28,47 @@ async def test_execute_waits_on_index_lock(tmp_path):
         assert not lock.locked()
         assert not lock_file.exists()
         assert sleep_mock.call_count == 1
+
+
+@pytest.mark.anyio
+async def test_execute_stream_with_large_error_output(tmp_path):
+    # More than the capacity of a pipe is written to stderr before stdout
+    script = "import sys; sys.stderr.write('w' * 1000000); sys.stdout.write('ok')"
+
+    with anyio.fail_after(10):
+        chunks = [
+            chunk
+            async for chunk in execute_stream(
+                [sys.executable, "-c", script], cwd=str(tmp_path)
+            )
+        ]
+
+    assert b"".join(chunks) == b"ok"
+
+
+@pytest.mark.anyio
+async def test_execute_stream_timeout(tmp_path):
+    cmd = [sys.executable, "-c", "import time; time.sleep(30)"]
+
+    with pytest.raises(subprocess.TimeoutExpired):
+        async for _ in execute_stream(cmd, cwd=str(tmp_path), timeout=0.5):
+            pass
+
+
+@pytest.mark.anyio
+async def test_execute_stream_closed_early(tmp_path):
+    cmd = [sys.executable, "-c", "while True: print('y' * 1000, flush=True)"]
+    processes = []
+    open_process = anyio.open_process
+
+    async def spy(*args, **kwargs):
+        processes.append(await open_process(*args, **kwargs))
+        return processes[-1]
+
+    with patch("anyio.open_process", side_effect=spy):
+        stream = execute_stream(cmd, cwd=str(tmp_path))
+        assert await stream.__anext__()
+        await stream.aclose()
+
+    # The killed process is reaped
+    assert processes[0].returncode is not None
@@ -0,0 +1,69 @@
+import io
+import json
+
+from jupyterlab_git_core.filter import (
+    PKT_MAX_DATA,
+    clean_notebook,
+    read_content,
+    read_text,
+    run,
+    write_content,
+    write_text,
+)
+
+NOTEBOOK = {
+    "cells": [
+        {
+            "cell_type": "code",
+            "execution_count": 1,
+            "metadata": {"collapsed": False},
+            "outputs": [
+                {"output_type": "stream", "name": "stdout", "text": "é" * PKT_MAX_DATA}
+            ],
+            "source": "print('é')",
+        }
+    ],
+    "metadata": {},
+    "nbformat": 4,
+    "nbformat_minor": 4,
+}
+
+
+def test_clean_notebook():
+    cleaned = json.loads(clean_notebook(json.dumps(NOTEBOOK).encode()))
+
+    assert cleaned["cells"][0] == {
+        "cell_type": "code",
+        "execution_count": None,
+        "metadata": {},
+        "outputs": [],
+        "source": "print('é')",
+    }
+
+
+def test_clean_notebook_unchanged():
+    for content in (b"not a notebook", b'{"cells": []}', b""):
+        assert clean_notebook(content) is content
+
+
+def test_run():
+    stdin = io.BytesIO()
+    write_text(stdin, "git-filter-client", "version=2")
+    write_text(stdin, "capability=clean", "capability=smudge")
+    write_text(stdin, "command=clean", "pathname=notebook.ipynb")
+    write_content(stdin, json.dumps(NOTEBOOK).encode())
+    write_text(stdin, "command=smudge", "pathname=notebook.ipynb")
+    write_content(stdin, b"{}")
+    stdin.seek(0)
+    stdout = io.BytesIO()
+
+    run(stdin, stdout)
+
+    stdout.seek(0)
+    assert read_text(stdout) == ["git-filter-server", "version=2"]
+    assert read_text(stdout) == ["capability=clean"]
+    assert read_text(stdout) == ["status=success"]
+    assert read_content(stdout) == clean_notebook(json.dumps(NOTEBOOK).encode())
+    assert read_text(stdout) == []
+    assert read_text(stdout) == ["status=error"]
+    assert stdout.read() == b""
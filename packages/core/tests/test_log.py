@@ -1,9 +1,12 @@
+import sqlite3
+from contextlib import closing
 from pathlib import Path
 from unittest.mock import patch
 
 import pytest
 
 from jupyterlab_git_core.git import Git
+from jupyterlab_git_core.history import MAX_REACHABLE_SETS, HistoryIndex
 
 
 @pytest.mark.asyncio
@@ -63,3 +66,160 @@ async def test_log_genuine_failure_is_propagated():
 
         # Then
         assert expected_response == actual_response
+
+
+@pytest.mark.asyncio
+async def test_search_log_is_incremental(tmp_path):
+    with patch("jupyterlab_git_core.git.execute") as mock_execute:
+        # Given
+        git_dir = tmp_path / ".git"
+        first = "1" * 40
+        second = "2" * 40
+        third = "3" * 40
+        log_output = (
+            f"\x1e{second}\x1fAlice\x1falice@example.com\x1f1700000100\x1f{first}\x1fAdd data\x1fLong description\x00\n"
+            "data/values.csv\x00data/readme.md\x00"
+            f"\x1e{first}\x1fBob\x1fbob@example.com\x1f1700000000\x1f\x1fInitial commit\x1f\x00\n"
+            "setup.py\x00"
+        )
+        new_log_output = (
+            f"\x1e{third}\x1fBob\x1fbob@example.com\x1f1700000200\x1f{second}\x1fFix data\x1f\x00\n"
+            "data/values.csv\x00"
+        )
+        mock_execute.side_effect = [
+            (0, f"{git_dir}\n{second}\n", ""),
+            (0, log_output, ""),
+            (0, f"{git_dir}\n{third}\n", ""),
+            (0, f"{second}\n", ""),
+            (0, new_log_output, ""),
+            (0, f"{git_dir}\n{third}\n", ""),
+        ]
+
+        git = Git()
+
+        # When
+        first_response = await git.search_log(str(tmp_path), author="bob")
+        second_response = await git.search_log(str(tmp_path), file_path="data")
+        third_response = await git.search_log(
+            str(tmp_path), message="DESCRIPTION", since=1700000050
+        )
+
+        # Then
+        assert [c["commit"] for c in first_response["commits"]] == [first]
+        assert first_response["commits"][0]["commit_msg"] == "Initial commit"
+        assert first_response["commits"][0]["pre_commits"] == []
+        assert [c["commit"] for c in second_response["commits"]] == [third, second]
+        assert [c["commit"] for c in third_response["commits"]] == [second]
+
+        assert mock_execute.call_args_list[3][0][0] == [
+            "git",
+            "rev-list",
+            "--no-walk",
+            "--ignore-missing",
+            second,
+        ]
+        assert mock_execute.call_args_list[4][0][0] == [
+            "git",
+            "log",
+            "-z",
+            "--name-only",
+            "--no-renames",
+            "--format=%x1e%H%x1f%an%x1f%ae%x1f%at%x1f%P%x1f%s%x1f%b",
+            third,
+            "--not",
+            second,
+        ]
+        assert mock_execute.call_count == 6
+        assert (git_dir / "jupyterlab-git" / "history.sqlite").exists()
+
+
+@pytest.mark.asyncio
+async def test_search_log_after_rewrite_and_gc(tmp_path):
+    with patch("jupyterlab_git_core.git.execute") as mock_execute:
+        # Given
+        git_dir = tmp_path / ".git"
+        first = "1" * 40
+        amended = "2" * 40
+        rewritten = "3" * 40
+
+        def log(sha, parent, subject):
+            return f"\x1e{sha}\x1fBob\x1fbob@example.com\x1f170000000{sha[0]}\x1f{parent}\x1f{subject}\x1f\x00\nfile.txt\x00"
+
+        mock_execute.side_effect = [
+            (0, f"{git_dir}\n{amended}\n", ""),
+            (0, log(amended, first, "Typo") + log(first, "", "Initial"), ""),
+            # The amended commit was garbage collected
+            (0, f"{git_dir}\n{rewritten}\n", ""),
+            (0, "", ""),
+            (0, log(rewritten, first, "Fixed") + log(first, "", "Initial"), ""),
+        ]
+        git = Git()
+        await git.search_log(str(tmp_path))
+
+        # When
+        actual_response = await git.search_log(str(tmp_path))
+
+        # Then
+        assert mock_execute.call_args_list[4][0][0][-1] == rewritten
+        assert [c["commit"] for c in actual_response["commits"]] == [
+            rewritten,
+            first,
+        ]
+
+
+@pytest.mark.asyncio
+async def test_search_log_unborn_head_returns_empty_commits():
+    with patch("jupyterlab_git_core.git.execute") as mock_execute:
+        # Given
+        mock_execute.return_value = (
+            128,
+            "/bin/test_curr_path/.git\nHEAD\n",
+            "fatal: ambiguous argument 'HEAD': unknown revision or path not in the working tree.\n",
+        )
+
+        # When
+        actual_response = await Git().search_log(
+            path=str(Path("/bin/test_curr_path")), author="bob"
+        )
+
+        # Then
+        assert {"code": 0, "commits": []} == actual_response
+
+
+def test_history_index_stores_reachable_sets(tmp_path):
+    index = HistoryIndex(str(tmp_path / "history.sqlite"))
+    shas = [f"{i:040x}" for i in range(MAX_REACHABLE_SETS + 2)]
+    commits = [
+        {
+            "sha": sha,
+            "author": "author",
+            "email": "author@example.com",
+            "timestamp": i,
+            "parents": shas[i - 1] if i else "",
+            "subject": f"commit {i}",
+            "body": "",
+            "paths": [],
+        }
+        for i, sha in enumerate(shas)
+    ]
+    index.add(commits, shas[-1])
+
+    def stored_heads():
+        with closing(sqlite3.connect(index.db_path)) as connection:
+            return {row[0] for row in connection.execute("SELECT head FROM reachable")}
+
+    # The ancestors of a head are walked once and reused
+    assert [c["commit"] for c in index.search(shas[2])] == shas[2::-1]
+    with patch.object(index, "_forget_reachable") as mock_forget:
+        assert [c["commit"] for c in index.search(shas[2])] == shas[2::-1]
+        mock_forget.assert_not_called()
+    assert stored_heads() == {shas[2]}
+
+    # Only the last searched heads are kept
+    for sha in shas[3:]:
+        index.search(sha)
+    assert stored_heads() == set(shas[-MAX_REACHABLE_SETS:])
+
+    # The set of a removed tip is forgotten
+    index.remove_tips([shas[-2]])
+    assert stored_heads() == set(shas[-MAX_REACHABLE_SETS:-2]) | {shas[-1]}
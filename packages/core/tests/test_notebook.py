@@ -0,0 +1,239 @@
+import asyncio
+import io
+import json
+import os
+import time
+from unittest.mock import patch
+
+import anyio
+import pytest
+from traitlets.config import Config
+
+from jupyterlab_git import JupyterLabGit
+from jupyterlab_git_core.git import Git, GitParameterError
+from jupyterlab_git_core.notebook import (
+    NotebookPool,
+    clear_notebook_outputs,
+    iter_cell_outputs,
+    scan_notebook_outputs,
+)
+
+OUTPUTS = [{"output_type": "stream", "name": "stdout", "text": ['"}]\\']}]
+NOTEBOOK = {
+    "cells": [
+        {"cell_type": "markdown", "metadata": {}, "source": ['"outputs": [{', "\\"]},
+        {"cell_type": "code", "outputs": [], "source": "", "metadata": {}},
+        {"outputs": OUTPUTS, "metadata": {"outputs": []}, "cell_type": "code"},
+    ],
+    "metadata": {"cells": [{"cell_type": "code", "outputs": [{}]}]},
+    "nbformat": 4,
+    "nbformat_minor": 4,
+}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 1 << 20])
+def test_iter_cell_outputs(chunk_size):
+    stream = io.BytesIO(json.dumps(NOTEBOOK).encode())
+
+    assert list(iter_cell_outputs(stream, chunk_size)) == [
+        ("markdown", 0, 0),
+        ("code", 0, 2),
+        ("code", 1, len(json.dumps(OUTPUTS))),
+    ]
+
+
+def test_iter_cell_outputs_truncated():
+    stream = io.BytesIO(json.dumps(NOTEBOOK).encode()[:-10])
+
+    with pytest.raises(ValueError):
+        list(iter_cell_outputs(stream, 16))
+
+
+def test_scan_notebook_outputs(tmp_path):
+    notebook = tmp_path / "notebook.ipynb"
+    notebook.write_text(json.dumps(NOTEBOOK))
+
+    assert scan_notebook_outputs(str(notebook)) == {
+        "has_outputs": True,
+        "output_bytes": len(json.dumps(OUTPUTS)),
+    }
+
+
+@pytest.mark.asyncio
+async def test_notebook_pool_timeout_restarts_workers():
+    pool = NotebookPool(processes=1, timeout=0.5)
+    try:
+        with pytest.raises(TimeoutError):
+            await pool.run(time.sleep, 30)
+        assert pool._pool is None
+
+        # A new pool is started for the next job
+        assert await pool.run(sum, [1, 2, 3]) == 6
+    finally:
+        pool.close()
+
+
+@pytest.mark.asyncio
+async def test_notebook_pool_timeout_keeps_other_jobs():
+    pool = NotebookPool(processes=2, timeout=2)
+    try:
+
+        async def other_job():
+            # Still running when the first job times out
+            await asyncio.sleep(1.5)
+            return await pool.run(time.sleep, 1)
+
+        stuck, other = await asyncio.gather(
+            pool.run(time.sleep, 30), other_job(), return_exceptions=True
+        )
+
+        assert isinstance(stuck, TimeoutError)
+        assert other is None
+        # The pool with the stuck worker is terminated once the other job is done
+        assert pool._pool is None
+        assert pool._jobs == {}
+    finally:
+        pool.close()
+
+
+@pytest.mark.asyncio
+async def test_notebook_pool_waits_in_own_threads():
+    pool = NotebookPool(processes=1, timeout=10)
+    default_limiter = anyio.to_thread.current_default_thread_limiter()
+    try:
+        async with anyio.create_task_group() as tg:
+            for _ in range(3):
+                tg.start_soon(pool.run, time.sleep, 0.5)
+            await anyio.sleep(0.2)
+
+            # Only one job runs at a time; the others wait without a thread
+            assert pool._limiter.borrowed_tokens == 1
+            assert default_limiter.borrowed_tokens == 0
+    finally:
+        pool.close()
+
+
+@pytest.mark.asyncio
+async def test_notebook_pool_without_processes():
+    pool = NotebookPool(processes=0)
+
+    assert await pool.run(sum, [1, 2, 3]) == 6
+    assert pool._pool is None
+
+
+@pytest.mark.asyncio
+async def test_get_nbdiff_max_size():
+    manager = Git()
+    manager._nbdiff_max_size = 10
+
+    with pytest.raises(GitParameterError):
+        await manager.get_nbdiff('{"cells": []}', '{"cells": [], "metadata": {}}')
+
+
+@pytest.mark.asyncio
+async def test_check_notebooks_with_outputs_cached_per_blob():
+    null, dirty, source, copy, script, new_script = (str(i) * 40 for i in range(6))
+    staged = (
+        f":000000 100644 {null} {dirty} A\x00dirty.ipynb\x00"
+        f":100644 100644 {source} {copy} C75\x00dirty.ipynb\x00copy.ipynb\x00"
+        f":100644 100644 {script} {new_script} M\x00script.py\x00"
+    )
+    scans = {
+        dirty: {"has_outputs": True, "output_bytes": 10},
+        copy: {"has_outputs": False, "output_bytes": 0},
+    }
+    manager = Git()
+    with patch("jupyterlab_git_core.git.execute") as mock_execute, patch.object(
+        manager._notebook_pool, "run"
+    ) as mock_run:
+        # Given
+        mock_execute.return_value = (0, staged, "")
+        mock_run.side_effect = lambda func, path, oid, sizes: scans[oid]
+        await manager.check_notebooks_with_outputs("test-path")
+
+        # When
+        actual_response = await manager.check_notebooks_with_outputs("test-path")
+
+        # Then
+        mock_execute.assert_called_with(
+            [
+                "git",
+                "diff",
+                "--cached",
+                "--raw",
+                "-z",
+                "--no-abbrev",
+                "--diff-filter=ACM",
+            ],
+            cwd="test-path",
+            env=None,
+            username=None,
+            password=None,
+            is_binary=False,
+        )
+        assert mock_run.call_count == 2
+        assert actual_response == {
+            "notebooks_with_outputs": ["dirty.ipynb"],
+            "has_outputs": True,
+        }
+
+        # Scans stopped at the first outputs are done again to get their size
+        await manager.check_notebooks_with_outputs("test-path", sizes=True)
+        assert mock_run.call_count == 4
+
+
+@pytest.mark.asyncio
+async def test_strip_notebook_outputs_command():
+    config = JupyterLabGit(
+        output_cleaning_engine="command", output_cleaning_options="--inplace"
+    )
+    manager = Git(config=config)
+    with patch("jupyterlab_git_core.git.execute") as mock_execute:
+        # Given
+        mock_execute.return_value = (0, "", "")
+
+        # When
+        await manager.strip_notebook_outputs(["a.ipynb", "b.ipynb"], "test-path")
+
+        # Then
+        commands = [c[0][0] for c in mock_execute.call_args_list]
+        assert commands == [
+            ["jupyter", "nbconvert", "--inplace", os.path.join("test-path", "a.ipynb")],
+            ["jupyter", "nbconvert", "--inplace", os.path.join("test-path", "b.ipynb")],
+            ["git", "add", "--", "a.ipynb", "b.ipynb"],
+        ]
+
+
+@pytest.mark.parametrize(
+    "options, engine",
+    [
+        ({}, "builtin"),
+        ({"output_cleaning_command": "nbstripout"}, "command"),
+        ({"output_cleaning_options": "--inplace"}, "command"),
+        (
+            {
+                "output_cleaning_command": "nbstripout",
+                "output_cleaning_engine": "builtin",
+            },
+            "builtin",
+        ),
+    ],
+)
+def test_output_cleaning_engine_default(options, engine):
+    assert JupyterLabGit(**options).output_cleaning_engine == engine
+
+    config = Config({"JupyterLabGit": options})
+    assert JupyterLabGit(config=config).output_cleaning_engine == engine
+
+
+def test_clear_notebook_outputs(tmp_path):
+    notebook = tmp_path / "notebook.ipynb"
+    notebook.write_text(json.dumps(NOTEBOOK))
+
+    assert clear_notebook_outputs(str(notebook))
+    assert scan_notebook_outputs(str(notebook)) == {
+        "has_outputs": False,
+        "output_bytes": 0,
+    }
+    # Nothing left to clear
+    assert not clear_notebook_outputs(str(notebook))
@@ -1,4 +1,5 @@
 import os
+import time
 from unittest.mock import call, patch
 
 import pytest
@@ -523,3 +524,223 @@ async def test_git_push_no_tags_success():
                 is_binary=False,
             )
             assert {"code": 0, "message": output} == actual_response
+
+
+def make_repository(root):
+    """Create the HEAD and configuration of a repository modified a minute ago."""
+    git_dir = root / ".git"
+    git_dir.mkdir()
+    (git_dir / "HEAD").write_text("ref: refs/heads/feature\n")
+    (git_dir / "config").write_text("[core]\n")
+    age(git_dir / "config", 60)
+    return {
+        "GIT_CONFIG_GLOBAL": str(root / "global"),
+        "GIT_CONFIG_SYSTEM": str(root / "system"),
+    }
+
+
+def age(path, seconds):
+    mtime = time.time_ns() - seconds * 1_000_000_000
+    os.utime(path, ns=(mtime, mtime))
+
+
+def config_output(origin="file:.git/config", **options):
+    return "".join(f"{origin}\0{key}\n{value}\0" for key, value in options.items())
+
+
+@pytest.mark.asyncio
+async def test_git_push_current_branch_upstream(tmp_path):
+    with patch("os.environ", make_repository(tmp_path)):
+        with patch("jupyterlab_git_core.git.execute") as mock_execute:
+            # Given
+            options = {
+                "remote.origin.url": "https://example.com/repo.git",
+                "branch.feature.remote": "origin",
+                "branch.feature.merge": "refs/heads/main",
+            }
+            mock_execute.side_effect = [
+                (0, config_output(**options), ""),
+                (0, "", ""),
+                (0, "", ""),
+            ]
+            manager = Git()
+
+            # When
+            await manager.push_current_branch(str(tmp_path))
+            actual_response = await manager.push_current_branch(str(tmp_path))
+
+            # Then
+            assert [c.args[0] for c in mock_execute.call_args_list] == [
+                ["git", "config", "-z", "--list", "--show-origin"],
+                ["git", "push", "--tags", "origin", "HEAD:main"],
+                ["git", "push", "--tags", "origin", "HEAD:main"],
+            ]
+            assert {"code": 0, "message": ""} == actual_response
+
+
+@pytest.mark.asyncio
+async def test_git_push_current_branch_config_changed(tmp_path):
+    with patch("os.environ", make_repository(tmp_path)):
+        with patch("jupyterlab_git_core.git.execute") as mock_execute:
+            # Given
+            mock_execute.side_effect = [
+                (0, config_output(**{"remote.origin.url": "origin.git"}), ""),
+                (0, "", ""),
+                (
+                    0,
+                    config_output(
+                        **{
+                            "remote.origin.url": "origin.git",
+                            "branch.feature.remote": "origin",
+                            "branch.feature.merge": "refs/heads/feature",
+                        }
+                    ),
+                    "",
+                ),
+                (0, "", ""),
+            ]
+            manager = Git()
+            await manager.push_current_branch(str(tmp_path))
+
+            # When
+            config = tmp_path / ".git" / "config"
+            config.write_text('[core]\n[branch "feature"]\n\tremote = origin\n')
+            age(config, 30)
+            await manager.push_current_branch(str(tmp_path))
+
+            # Then
+            assert [c.args[0] for c in mock_execute.call_args_list] == [
+                ["git", "config", "-z", "--list", "--show-origin"],
+                ["git", "push", "--tags", "--set-upstream", "origin", "feature"],
+                ["git", "config", "-z", "--list", "--show-origin"],
+                ["git", "push", "--tags", "origin", "HEAD:feature"],
+            ]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "options, push",
+    [
+        (
+            {
+                "remote.origin.url": "origin.git",
+                "remote.fork.url": "fork.git",
+                "remote.pushdefault": "fork",
+            },
+            ["git", "push", "--tags", "--set-upstream", "fork", "feature"],
+        ),
+        (
+            {"remote.origin.url": "origin.git", "remote.fork.url": "fork.git"},
+            None,
+        ),
+    ],
+)
+async def test_git_push_current_branch_no_upstream(tmp_path, options, push):
+    with patch("os.environ", make_repository(tmp_path)):
+        with patch("jupyterlab_git_core.git.execute") as mock_execute:
+            # Given
+            mock_execute.side_effect = [(0, config_output(**options), ""), (0, "", "")]
+
+            # When
+            actual_response = await Git().push_current_branch(str(tmp_path))
+
+            # Then
+            commands = [c.args[0] for c in mock_execute.call_args_list]
+            assert commands == [["git", "config", "-z", "--list", "--show-origin"]] + (
+                [push] if push else []
+            )
+            if push is None:
+                assert {
+                    "code": 128,
+                    "message": "fatal: The current branch feature has no upstream branch.",
+                    "remotes": ["origin", "fork"],
+                } == actual_response
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "options, expected",
+    [
+        (
+            {"branch.feature.remote": ".", "branch.feature.merge": "refs/heads/main"},
+            {"code": 0, "remote_short_name": ".", "remote_branch": "main"},
+        ),
+        (
+            {"branch.main.remote": "origin", "branch.main.merge": "refs/heads/main"},
+            {
+                "code": 128,
+                "command": "git config -z --list --show-origin",
+                "message": "fatal: no upstream configured for branch 'feature'",
+            },
+        ),
+    ],
+)
+async def test_git_get_current_upstream_branch(tmp_path, options, expected):
+    with patch("os.environ", make_repository(tmp_path)):
+        with patch("jupyterlab_git_core.git.execute") as mock_execute:
+            # Given
+            mock_execute.return_value = (0, config_output(**options), "")
+
+            # When
+            actual_response = await Git().get_current_upstream_branch(str(tmp_path))
+
+            # Then
+            assert expected == actual_response
+
+
+@pytest.mark.asyncio
+async def test_repository_metadata_included_config_changed(tmp_path):
+    environment = make_repository(tmp_path)
+    included = tmp_path / ".git" / "included"
+    included.write_text('[branch "feature"]\n\tremote = origin\n')
+    age(included, 60)
+    with patch("os.environ", environment):
+        with patch("jupyterlab_git_core.git.execute") as mock_execute:
+            # Given
+            options = {
+                "branch.feature.remote": "origin",
+                "branch.feature.merge": "refs/heads/main",
+            }
+            mock_execute.side_effect = [
+                (0, config_output("file:.git/included", **options), ""),
+                (0, config_output("file:.git/included", **options), ""),
+                (0, config_output("file:.git/included", **options), ""),
+            ]
+            manager = Git()
+            await manager.repository_metadata(str(tmp_path))
+            await manager.repository_metadata(str(tmp_path))
+            assert mock_execute.call_count == 1
+
+            # When
+            included.write_text('[branch "feature"]\n\tremote = fork\n')
+            age(included, 30)
+            await manager.repository_metadata(str(tmp_path))
+            environment["GIT_CONFIG_NOSYSTEM"] = "1"
+            await manager.repository_metadata(str(tmp_path))
+
+            # Then
+            assert mock_execute.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_repository_metadata_reftable(tmp_path):
+    environment = make_repository(tmp_path)
+    (tmp_path / ".git" / "HEAD").write_text("ref: refs/heads/.invalid\n")
+    (tmp_path / ".git" / "reftable").mkdir()
+    with patch("os.environ", environment):
+        with patch("jupyterlab_git_core.git.execute") as mock_execute:
+            # Given
+            mock_execute.side_effect = [(0, "", ""), (0, "feature\n", "")]
+
+            # When
+            actual_response = await Git().repository_metadata(str(tmp_path))
+
+            # Then
+            assert mock_execute.call_args_list[1].args[0] == [
+                "git",
+                "symbolic-ref",
+                "-q",
+                "--short",
+                "HEAD",
+            ]
+            assert actual_response["current_branch"] == "feature"
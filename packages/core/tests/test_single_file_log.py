@@ -1,9 +1,14 @@
+import os
+import subprocess
 from pathlib import Path
 from unittest.mock import patch
 
 import pytest
 
 from jupyterlab_git_core.git import Git
+from jupyterlab_git_core.history import relative_date
+
+HEAD = "74baf6e1d18dfa004d9b9105ff86746ab78084eb"
 
 
 @pytest.mark.asyncio
@@ -13,23 +18,26 @@ async def test_single_file_log():
         process_output = [
             "74baf6e1d18dfa004d9b9105ff86746ab78084eb",
             "Lazy Senior Developer",
-            "1 hours ago",
+            "1700007200",
             "Something",
             "",
             "0	0	test.txt\x00\x008852729159bef63d7197f8aa26355b387283cb58",
             "Lazy Senior Developer",
-            "2 hours ago",
+            "1700003600",
             "Something Else",
             "e6d4eed300811e886cadffb16eeed19588eb5eec",
             "0	1	test.txt\x00\x00d19001d71bb928ec9ed6ae3fe1bfc474e1b771d0",
             "Lazy Junior Developer",
-            "5 hours ago",
+            "1700000000",
             "Something More",
             "263f762e0aad329c3c01bbd9a28f66403e6cfa5f e6d4eed300811e886cadffb16eeed19588eb5eec",
             "1	1	test.txt",
         ]
 
-        mock_execute.return_value = (0, "\n".join(process_output), "")
+        mock_execute.side_effect = [
+            (0, HEAD + "\n", ""),
+            (0, "\n".join(process_output), ""),
+        ]
 
         expected_response = {
             "code": 0,
@@ -37,7 +45,7 @@ async def test_single_file_log():
                 {
                     "commit": "74baf6e1d18dfa004d9b9105ff86746ab78084eb",
                     "author": "Lazy Senior Developer",
-                    "date": "1 hours ago",
+                    "date": relative_date(1700007200),
                     "commit_msg": "Something",
                     "pre_commits": [],
                     "is_binary": False,
@@ -46,7 +54,7 @@ async def test_single_file_log():
                 {
                     "commit": "8852729159bef63d7197f8aa26355b387283cb58",
                     "author": "Lazy Senior Developer",
-                    "date": "2 hours ago",
+                    "date": relative_date(1700003600),
                     "commit_msg": "Something Else",
                     "pre_commits": ["e6d4eed300811e886cadffb16eeed19588eb5eec"],
                     "is_binary": False,
@@ -55,7 +63,7 @@ async def test_single_file_log():
                 {
                     "commit": "d19001d71bb928ec9ed6ae3fe1bfc474e1b771d0",
                     "author": "Lazy Junior Developer",
-                    "date": "5 hours ago",
+                    "date": relative_date(1700000000),
                     "commit_msg": "Something More",
                     "pre_commits": [
                         "263f762e0aad329c3c01bbd9a28f66403e6cfa5f",
@@ -75,15 +83,17 @@ async def test_single_file_log():
         )
 
         # Then
-        mock_execute.assert_called_once_with(
+        assert mock_execute.call_count == 2
+        mock_execute.assert_called_with(
             [
                 "git",
                 "log",
-                "--pretty=format:%H%n%an%n%ar%n%s%n%P",
+                "--pretty=format:%H%n%an%n%at%n%s%n%P",
                 "-25",
                 "-z",
                 "--numstat",
                 "--follow",
+                HEAD,
                 "--",
                 "folder/test.txt",
             ],
@@ -95,3 +105,108 @@ async def test_single_file_log():
         )
 
         assert expected_response == actual_response
+
+
+@pytest.mark.asyncio
+async def test_single_file_log_is_cached_per_tip():
+    with patch("jupyterlab_git_core.git.execute") as mock_execute:
+        # Given
+        new_head = "1111111111111111111111111111111111111111"
+        first_output = [
+            HEAD,
+            "Lazy Senior Developer",
+            "1700003600",
+            "Something",
+            "",
+            "0	1	old.txt	test.txt",
+        ]
+        new_output = [
+            new_head,
+            "Lazy Junior Developer",
+            "1700007200",
+            "Something New",
+            HEAD,
+            "2	0	test.txt",
+        ]
+        mock_execute.side_effect = [
+            (0, HEAD + "\n", ""),
+            (0, "\n".join(first_output), ""),
+            # Same tip: served from the cache
+            (0, HEAD + "\n", ""),
+            # Tip moved forward: only the new commits are requested
+            (0, new_head + "\n", ""),
+            (0, "", ""),
+            (0, "", ""),
+            (0, "\n".join(new_output), ""),
+        ]
+        git = Git()
+
+        # When
+        first = await git.log("test_curr_path", 25, "test.txt")
+        second = await git.log("test_curr_path", 25, "test.txt")
+        third = await git.log("test_curr_path", 25, "test.txt")
+
+        # Then
+        assert first == second
+        assert first["commits"][0]["previous_file_path"] == "old.txt"
+        assert [c["commit"] for c in third["commits"]] == [new_head, HEAD]
+        assert mock_execute.call_count == 7
+        assert mock_execute.call_args_list[4][0][0] == [
+            "git",
+            "merge-base",
+            "--is-ancestor",
+            HEAD,
+            new_head,
+        ]
+        assert mock_execute.call_args_list[5][0][0] == [
+            "git",
+            "rev-list",
+            "--merges",
+            "-n",
+            "1",
+            f"{HEAD}..{new_head}",
+        ]
+        assert f"{HEAD}..{new_head}" in mock_execute.call_args_list[6][0][0]
+
+
+@pytest.mark.asyncio
+async def test_single_file_log_rewalked_after_merge(tmp_path):
+    # Given
+    def git(*args, date=None):
+        env = dict(
+            os.environ,
+            GIT_AUTHOR_NAME="a",
+            GIT_AUTHOR_EMAIL="a@b",
+            GIT_COMMITTER_NAME="a",
+            GIT_COMMITTER_EMAIL="a@b",
+        )
+        if date is not None:
+            env["GIT_AUTHOR_DATE"] = env["GIT_COMMITTER_DATE"] = f"{date} +0000"
+        subprocess.run(["git", *args], cwd=tmp_path, env=env, check=True)
+
+    def commit(message, date):
+        with open(tmp_path / "file.txt", "a") as f:
+            f.write(message + "\n")
+        git("commit", "-qam", message, date=date)
+
+    git("init", "-q", "-b", "main")
+    (tmp_path / "file.txt").write_text("")
+    git("add", "file.txt")
+    git("commit", "-qm", "c1", date=1700000000)
+    git("checkout", "-qb", "side")
+    commit("side1", 1700000100)
+    git("checkout", "-q", "main")
+    commit("m2", 1700000200)
+    manager = Git()
+    await manager.log(str(tmp_path), 25, "file.txt")
+
+    # When
+    commit("m3", 1700000300)
+    git("merge", "-q", "-X", "ours", "side", "-m", "merge", date=1700000400)
+    cached = await manager.log(str(tmp_path), 25, "file.txt")
+    fresh = await Git().log(str(tmp_path), 25, "file.txt")
+
+    # Then
+    assert [c["commit"] for c in cached["commits"]] == [
+        c["commit"] for c in fresh["commits"]
+    ]
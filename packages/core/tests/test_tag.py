@@ -3,12 +3,20 @@ from unittest.mock import patch
 import pytest
 
 from jupyterlab_git_core.git import Git
+from jupyterlab_git_core.refs import for_each_ref_command
 
 
 @pytest.mark.asyncio
 async def test_git_tag_success():
     with patch("jupyterlab_git_core.git.execute") as mock_execute:
-        output_tags = "v1.0.0\t6db57bf4987d387d439acd16ddfe8d54d46e8f4\nv2.0.1\t2aeae86b6010dd1f05b820d8753cff8349c181a6"
+        output_tags = "\n".join(
+            [
+                "refs/heads/main\tmain\t2aeae86b6010dd1f05b820d8753cff8349c181a6\t\t*\t\t\t\t\t1700000000",
+                "refs/tags/v1.0.0\tv1.0.0\t6db57bf4987d387d439acd16ddfe8d54d46e8f4\t\t \t\t\t\t\t1700000100",
+                # Annotated tags point to their commit
+                "refs/tags/v2.0.1\tv2.0.1\t1f2e3d4c5b6a79881f2e3d4c5b6a79881f2e3d4c\t2aeae86b6010dd1f05b820d8753cff8349c181a6\t \t\t\t\t\t1700000200",
+            ]
+        )
 
         # Given
         mock_execute.return_value = (0, output_tags, "")
@@ -18,12 +26,7 @@ async def test_git_tag_success():
 
         # Then
         mock_execute.assert_called_once_with(
-            [
-                "git",
-                "for-each-ref",
-                "--format=%(refname:short)%09%(objectname)",
-                "refs/tags",
-            ],
+            for_each_ref_command(ahead_behind=True),
             cwd="test_curr_path",
             env=None,
             username=None,
@@ -37,17 +40,50 @@ async def test_git_tag_success():
                 {
                     "name": "v1.0.0",
                     "baseCommitId": "6db57bf4987d387d439acd16ddfe8d54d46e8f4",
+                    "date": 1700000100,
                 },
                 {
                     "name": "v2.0.1",
                     "baseCommitId": "2aeae86b6010dd1f05b820d8753cff8349c181a6",
+                    "date": 1700000200,
                 },
             ],
+            "total": 2,
         }
 
         assert expected_response == actual_response
 
 
+@pytest.mark.asyncio
+async def test_git_tag_search():
+    with patch("jupyterlab_git_core.git.execute") as mock_execute:
+        # Given
+        mock_execute.return_value = (
+            0,
+            "\n".join(
+                f"refs/tags/{name}\t{name}\t{'0' * 40}\t\t \t\t\t\t\t{date}"
+                for name, date in [
+                    ("v1.0.0", 1700000000),
+                    ("v1.1.0", 1700000200),
+                    ("v2.0.0", 1700000100),
+                ]
+            ),
+            "",
+        )
+
+        # When
+        actual_response = await Git().tags(
+            "test_curr_path", query="v1.", prefix=True, sort="date", limit=1
+        )
+
+        # Then
+        assert {
+            "code": 0,
+            "tags": [{"name": "v1.1.0", "baseCommitId": "0" * 40, "date": 1700000200}],
+            "total": 2,
+        } == actual_response
+
+
 @pytest.mark.asyncio
 async def test_git_tag_checkout_success():
     with patch("os.environ", {"TEST": "test"}):
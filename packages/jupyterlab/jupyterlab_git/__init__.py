@@ -1,6 +1,6 @@
 """Initialize the backend server extension"""
 
-from traitlets import CFloat, List, Dict, Unicode, default
+from traitlets import Bool, CFloat, CInt, Enum, List, Dict, Unicode, default
 from traitlets.config import Configurable
 
 from jupyterlab_git_core import __version__  # noqa: F401
@@ -23,6 +23,12 @@ class JupyterLabGit(Configurable):
         # TODO Validate
     )
 
+    content_size_limit = CInt(
+        0,
+        help="Size in bytes above which only the metadata of a file content are returned instead of the content itself. By default (0) there is no limit.",
+        config=True,
+    )
+
     excluded_paths = List(help="Paths to be excluded", config=True, trait=Unicode())
 
     credential_helper = Unicode(
@@ -38,6 +44,54 @@ class JupyterLabGit(Configurable):
         config=True,
     )
 
+    diff_paired_notebooks = Bool(
+        False,
+        help="Whether notebooks paired by jupytext with a text file are diffed through that text file rather than with nbdime. Requests may set 'pairing' to override it.",
+        config=True,
+    )
+
+    notebook_diff_processes = CInt(
+        2,
+        help="Number of worker processes computing notebook diffs and merges. If 0, they are computed in a thread of the server process.",
+        config=True,
+    )
+
+    notebook_diff_timeout = CFloat(
+        60.0,
+        help="Timeout in seconds of a notebook diff or merge; the worker processes are restarted when it is reached. By default it is set to 60 seconds.",
+        config=True,
+    )
+
+    notebook_diff_max_tasks_per_process = CInt(
+        50,
+        help="Number of notebook diffs and merges after which a worker process is replaced. If 0, worker processes are never replaced.",
+        config=True,
+    )
+
+    notebook_diff_max_size = CInt(
+        0,
+        help="Total size in bytes of the notebooks above which they are not compared. By default (0) there is no limit.",
+        config=True,
+    )
+
+    rename_limit = CInt(
+        1000,
+        help="Number of added and deleted files above which git only detects exact renames in diffs. By default it is set to 1000.",
+        config=True,
+    )
+
+    rename_timeout = CFloat(
+        10.0,
+        help="Time in seconds after which a diff is computed again without rename detection. By default it is set to 10 seconds; 0 disables it.",
+        config=True,
+    )
+
+    output_cleaning_engine = Enum(
+        ["builtin", "command"],
+        help="Engine stripping the notebook outputs: 'builtin' clears them in the server worker processes; 'command' runs output_cleaning_command on each notebook. By default it is 'builtin', unless output_cleaning_command or output_cleaning_options are set.",
+        config=True,
+    )
+
     output_cleaning_command = Unicode(
         "jupyter nbconvert",
         help="Notebook cleaning command. Configurable by server admin.",
@@ -59,6 +113,14 @@ class JupyterLabGit(Configurable):
     def _git_command_timeout_default(self):
         return 20.0
 
+    @default("output_cleaning_engine")
+    def _output_cleaning_engine_default(self):
+        # Keep running the cleaning command configured before the builtin engine
+        for name in ("output_cleaning_command", "output_cleaning_options"):
+            if getattr(self, name) != self.trait_defaults(name):
+                return "command"
+        return "builtin"
+
 
 def _jupyter_server_extension_points():
     return [{"module": "jupyterlab_git"}]
@@ -75,9 +137,21 @@ def _load_jupyter_server_extension(server_app):
     from .handlers import setup_handlers
 
     config = JupyterLabGit(config=server_app.config)
-    server_app.web_app.settings["git"] = Git(config)
+    git = Git(config)
+    server_app.web_app.settings["git"] = git
     setup_handlers(server_app.web_app)
 
+    # Module extensions have no shutdown hook; close along the extension apps
+    cleanup_extensions = server_app.cleanup_extensions
+
+    async def _cleanup_extensions():
+        try:
+            await cleanup_extensions()
+        finally:
+            git.close()
+
+    server_app.cleanup_extensions = _cleanup_extensions
+
 
 # For backward compatibility
 load_jupyter_server_extension = _load_jupyter_server_extension
@@ -5,11 +5,13 @@ Module with all the individual handlers, which execute git commands and return t
 import fnmatch
 import functools
 import json
+import mimetypes
 import os
 from pathlib import Path
 from typing import Tuple, Union
 
 import tornado
+from jupyter_core.paths import is_hidden
 from jupyter_server.base.handlers import APIHandler, path_regex
 from jupyter_server.services.contents.manager import ContentsManager
 from jupyter_server.utils import ensure_async, url2path, url_path_join
@@ -24,6 +26,8 @@ except ImportError:
 from jupyterlab_git_core import __version__
 from jupyterlab_git_core.git import (
     DEFAULT_REMOTE_NAME,
+    DETAILED_LOGS_MAX_COUNT,
+    DIFF_CONTEXT_LINES,
     Git,
     GitCommandError,
     GitParameterError,
@@ -246,6 +250,43 @@ class GitLogHandler(GitHandler):
         self.finish(json.dumps(result))
 
 
+class GitLogSearchHandler(GitHandler):
+    """
+    Handler to search the commit history through the persistent history index.
+    """
+
+    @tornado.web.authenticated
+    async def post(self, path: str = ""):
+        """
+        POST request handler, fetches the commits matching the filters.
+
+        Body: {
+            "author": Substring of the author name or email,
+            "message": Substring of the commit message,
+            "file_path": File or directory touched by the commits,
+            "since": Minimal commit timestamp in seconds,
+            "until": Maximal commit timestamp in seconds,
+            "limit": Maximal number of commits; default 25,
+            "offset": Number of commits to skip; default 0
+        }
+        """
+        body = self.get_json_body()
+        result = await self.git.search_log(
+            self.url2localpath(path),
+            author=body.get("author"),
+            message=body.get("message"),
+            file_path=body.get("file_path"),
+            since=body.get("since"),
+            until=body.get("until"),
+            limit=body.get("limit", 25),
+            offset=body.get("offset", 0),
+        )
+
+        if result["code"] != 0:
+            self.set_status(500)
+        self.finish(json.dumps(result))
+
+
 class GitDetailedLogHandler(GitHandler):
     """
     Handler for 'git log -m --cc -1 --stat --numstat --oneline -z' command.
@@ -258,10 +299,39 @@ class GitDetailedLogHandler(GitHandler):
         """
         POST request handler, fetches file names of committed files, Number of
         insertions & deletions in that commit.
+
+        Several commits can be requested at once by providing either the list
+        "selected_hashes" or a "range" instead of "selected_hash"; the
+        commits are then paged with "offset" and "limit".
+
+        The files of a single commit can be paged with "offset" and "limit",
+        restricted to a "directory" and aggregated per sub-directory with
+        "summary".
         """
         data = self.get_json_body()
-        selected_hash = data["selected_hash"]
-        result = await self.git.detailed_log(selected_hash, self.url2localpath(path))
+        local_path = self.url2localpath(path)
+        if "selected_hashes" in data or "range" in data:
+            try:
+                result = await self.git.detailed_logs(
+                    local_path,
+                    data.get("selected_hashes"),
+                    data.get("range"),
+                    offset=data.get("offset", 0),
+                    limit=data.get("limit", DETAILED_LOGS_MAX_COUNT),
+                )
+            except Exception as e:
+                self.handle_git_error(e)
+                return
+        else:
+            selected_hash = data["selected_hash"]
+            result = await self.git.detailed_log(
+                selected_hash,
+                local_path,
+                offset=data.get("offset", 0),
+                limit=data.get("limit"),
+                summary=data.get("summary", False),
+                directory=data.get("directory"),
+            )
 
         if result["code"] != 0:
             self.set_status(500)
@@ -295,6 +365,65 @@ class GitDiffHandler(GitHandler):
         self.finish(my_output)
 
 
+class GitDiffFileHandler(GitHandler):
+    """
+    Handler for 'git diff -U<n>' on a single file. Fetches the diff hunks.
+    """
+
+    @tornado.web.authenticated
+    async def post(self, path: str = ""):
+        """
+        POST request handler, fetches the hunks of the differences of a file
+        between two references.
+
+        Body: {
+            "filename": File path relatively to the repository,
+            "previous": Previous reference,
+            "current": Current reference,
+            "context": Optional number of context lines,
+            "pairing": Optional, whether to diff the text file paired with a notebook
+        }
+
+        To expand the context lazily, the lines of a file version are fetched with
+
+        Body: {
+            "filename": File path relatively to the repository,
+            "reference": File version,
+            "start": First line,
+            "end": Last line
+        }
+
+        References follow the format of the /content endpoint.
+        """
+        data = self.get_json_body()
+        local_path = self.url2localpath(path)
+        try:
+            if "reference" in data:
+                result = await self.git.file_lines(
+                    local_path,
+                    data["filename"],
+                    data["reference"],
+                    data["start"],
+                    data["end"],
+                )
+            else:
+                result = await self.git.diff_file(
+                    local_path,
+                    data["filename"],
+                    data["previous"],
+                    data["current"],
+                    data.get("context", DIFF_CONTEXT_LINES),
+                    data.get("pairing", self.git.diff_paired_notebooks),
+                )
+        except Exception as e:
+            self.handle_git_error(e)
+            return
+
+        if result["code"] != 0:
+            self.set_status(500)
+        self.finish(json.dumps(result))
+
+
 class GitBranchHandler(GitHandler):
     """
     Handler for 'git branch -a'. Fetches list of all branches in current repository
@@ -304,8 +433,16 @@ class GitBranchHandler(GitHandler):
     async def post(self, path: str = ""):
         """
         POST request handler, fetches all branches in current repository.
+
+        Body: {"query": str, "prefix": bool, "sort": "name" | "date", "offset": int, "limit": int}
         """
-        result = await self.git.branch(self.url2localpath(path))
+        data = self.get_json_body() or {}
+        options = {
+            key: data[key]
+            for key in ("query", "prefix", "sort", "offset", "limit")
+            if data.get(key) is not None
+        }
+        result = await self.git.branch(self.url2localpath(path), **options)
 
         if result["code"] != 0:
             self.set_status(500)
@@ -607,7 +744,66 @@ class GitCheckNotebooksHandler(GitHandler):
 
     @tornado.web.authenticated
     async def get(self, path: str = ""):
-        body = await self.git.check_notebooks_with_outputs(self.url2localpath(path))
+        """
+        GET request handler, lists the staged notebooks with outputs.
+
+        The query argument ``sizes=true`` adds the size of the outputs of each notebook.
+        """
+        sizes = self.get_query_argument("sizes", "false").lower() == "true"
+        body = await self.git.check_notebooks_with_outputs(
+            self.url2localpath(path), sizes
+        )
+        self.finish(json.dumps(body))
+
+
+class GitOutputFilterHandler(GitHandler):
+    """
+    Handler to enable the filter stripping the outputs of the staged notebooks.
+    """
+
+    @tornado.web.authenticated
+    async def get(self, path: str = ""):
+        """
+        GET request handler, tells whether the filter is enabled.
+        """
+        body = await self.git.get_output_filter(self.url2localpath(path))
+        self.finish(json.dumps(body))
+
+    @tornado.web.authenticated
+    async def post(self, path: str = ""):
+        """
+        POST request handler, enables or disables the filter.
+        """
+        data = self.get_json_body()
+        body = await self.git.set_output_filter(
+            self.url2localpath(path), bool(data.get("enabled", True))
+        )
+        if body["code"] != 0:
+            self.set_status(500)
+        self.finish(json.dumps(body))
+
+
+class GitNotebookOutputsHandler(GitHandler):
+    """
+    Handler reporting the notebooks, cells and commits with the largest outputs.
+    """
+
+    @tornado.web.authenticated
+    async def post(self, path: str = ""):
+        """
+        POST request handler, scans a tree or the history for notebook outputs.
+
+        Body: {"reference": str, "history": bool, "max_count": int, "limit": int}
+        """
+        data = self.get_json_body() or {}
+        options = {
+            key: data[key]
+            for key in ("reference", "history", "max_count", "limit")
+            if data.get(key) is not None
+        }
+        body = await self.git.notebook_outputs(self.url2localpath(path), **options)
+        if body["code"] != 0:
+            self.set_status(500)
         self.finish(json.dumps(body))
 
 
@@ -615,12 +811,10 @@ class GitUpstreamHandler(GitHandler):
     @tornado.web.authenticated
     async def post(self, path: str = ""):
         """
-        Handler for the `git rev-parse --abbrev-ref $CURRENT_BRANCH_NAME@{upstream}` on the repo. Used to check if there
+        Handler resolving the upstream branch of the current branch from the repository metadata. Used to check if there
         is a upstream branch defined for the current Git repo (and a side-effect is disabling the Git push/pull actions)
         """
-        local_path = self.url2localpath(path)
-        current_branch = await self.git.get_current_branch(local_path)
-        response = await self.git.get_upstream_branch(local_path, current_branch)
+        response = await self.git.get_current_upstream_branch(self.url2localpath(path))
         if response["code"] != 0:
             self.set_status(500)
         self.finish(json.dumps(response))
@@ -760,13 +954,210 @@ class GitContentHandler(GitHandler):
 
         try:
             response = await self.git.get_content_at_reference(
-                filename, reference, local_path, cm
+                filename,
+                reference,
+                local_path,
+                cm,
+                max_size=self.git.content_size_limit,
+                pairing=data.get("pairing", False),
+            )
+        except Exception as e:
+            self.handle_git_error(e)
+            return
+
+        filename = response.get("paired_file", filename)
+        if response.get("too_large"):
+            self.finish(json.dumps(self._metadata(filename, response["size"])))
+            return
+        body = {"code": 0, "content": response["content"]}
+        if "paired_file" in response:
+            body["paired_file"] = response["paired_file"]
+        self.finish(json.dumps(body))
+
+    @tornado.web.authenticated
+    async def get(self, path: str = ""):
+        """
+        GET request handler, streams the raw content of a file at a git reference.
+
+        Query arguments:
+            filename: File path relatively to the repository
+            reference: Commit reference; default HEAD
+            special: WORKING, INDEX or BASE; takes precedence over reference
+
+        HTTP Range requests are honoured. If the file is larger than the
+        content size limit, only its metadata are returned unless a range is
+        requested.
+        """
+        filename = self.get_query_argument("filename")
+        special = self.get_query_argument("special", None)
+        if special:
+            reference = {"special": special}
+        else:
+            reference = {"git": self.get_query_argument("reference", "HEAD")}
+        local_path = self.url2localpath(path)
+        if reference.get("special") == "WORKING":
+            self._check_working_file(path, filename)
+
+        try:
+            size = await self.git.content_size(local_path, filename, reference)
+        except FileNotFoundError:
+            raise tornado.web.HTTPError(404)
+        except Exception as e:
+            self.handle_git_error(e)
+            return
+
+        start, end = 0, size
+        range_header = self.request.headers.get("Range")
+        request_range = (
+            tornado.httputil._parse_request_range(range_header)
+            if range_header
+            else None
+        )
+        if request_range is not None:
+            # Same handling as tornado.web.StaticFileHandler
+            start, end = request_range
+            if start is not None and start < 0:
+                start = max(0, start + size)
+            if (
+                start is not None
+                and (start >= size or (end is not None and start >= end))
+            ) or end == 0:
+                self.set_status(416)
+                self.set_header("Content-Range", f"bytes */{size}")
+                self.finish()
+                return
+            start = start or 0
+            end = size if end is None or end > size else end
+            if end - start < size:
+                self.set_status(206)
+                self.set_header(
+                    "Content-Range",
+                    tornado.httputil._get_content_range(start, end, size),
+                )
+        elif self.git.content_size_limit and size > self.git.content_size_limit:
+            self.finish(json.dumps(self._metadata(filename, size)))
+            return
+
+        self.set_header("Accept-Ranges", "bytes")
+        self.set_header("Content-Type", self._content_type(filename))
+        self.set_header("Content-Length", end - start)
+        chunks = self.git.stream_content(local_path, filename, reference, start, end)
+        try:
+            async for chunk in chunks:
+                self.write(chunk)
+                await self.flush()
+        finally:
+            await chunks.aclose()
+        self.finish()
+
+    def _check_working_file(self, path: str, filename: str) -> None:
+        """Apply the rules of the contents manager to a working tree file.
+
+        Raises:
+            tornado.web.HTTPError: 404 if the file is outside the server root,
+                hidden while hidden files are not allowed or excluded
+        """
+        local_path, cm = self.url2localpath(path, with_contents_manager=True)
+        root = os.path.realpath(os.path.expanduser(cm.root_dir))
+        filepath = os.path.realpath(os.path.join(local_path, filename))
+        relative = Path(os.path.relpath(filepath, root)).as_posix()
+        if (
+            relative == ".."
+            or relative.startswith("../")
+            or (not cm.allow_hidden and is_hidden(filepath, root))
+            or any(
+                fnmatch.fnmatchcase(relative.casefold(), excluded_path.casefold())
+                for excluded_path in self.git.excluded_paths
+            )
+        ):
+            raise tornado.web.HTTPError(404)
+
+    def _content_type(self, filename: str) -> str:
+        return mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+    def _metadata(self, filename: str, size: int) -> dict:
+        """Describe a file too large to be sent."""
+        return {
+            "code": 0,
+            "content": None,
+            "size": size,
+            "content_type": self._content_type(filename),
+            "too_large": True,
+        }
+
+
+class GitConflictsHandler(GitHandler):
+    """
+    Handler for 'git ls-files -u'. Fetches the three-way material of all conflicted files.
+    """
+
+    @tornado.web.authenticated
+    async def post(self, path: str = ""):
+        """
+        POST request handler, fetches the base, ours and theirs blobs of every
+        unmerged file.
+
+        Body: {
+            "contents": Optional; whether to return the contents of each version
+                or, for notebooks, the nbdime merge decisions
+        }
+        """
+        data = self.get_json_body() or {}
+        try:
+            result = await self.git.conflicts(
+                self.url2localpath(path),
+                data.get("contents", False),
+                max_size=self.git.content_size_limit,
             )
         except Exception as e:
             self.handle_git_error(e)
             return
 
-        self.finish(json.dumps({"code": 0, "content": response["content"]}))
+        if result["code"] != 0:
+            self.set_status(500)
+        self.finish(json.dumps(result))
+
+
+class GitBlameHandler(GitHandler):
+    """
+    Handler for 'git blame --incremental'. Streams the line attributions of a file.
+    """
+
+    @tornado.web.authenticated
+    async def post(self, path: str = ""):
+        """
+        POST request handler, streams the attribution of the file lines as
+        newline-delimited JSON; one line range per line.
+
+        Body: {
+            "filename": File path relatively to the repository,
+            "commit": Commit reference; default HEAD
+        }
+        """
+        data = self.get_json_body()
+        ranges = self.git.blame(
+            self.url2localpath(path), data["filename"], data.get("commit", "HEAD")
+        )
+        started = False
+        try:
+            async for batch in ranges:
+                if not started:
+                    self.set_header("Content-Type", "application/x-ndjson")
+                    started = True
+                self.write("".join(json.dumps(r) + "\n" for r in batch))
+                await self.flush()
+        except Exception as e:
+            if not started:
+                self.handle_git_error(e)
+                return
+            # Headers are already sent; report the error as the last line
+            get_logger().error("Error while streaming blame.", exc_info=e)
+            self.write(json.dumps({"code": -1, "message": str(e)}) + "\n")
+        finally:
+            await ranges.aclose()
+        if not started:
+            self.set_header("Content-Type", "application/x-ndjson")
+        self.finish()
 
 
 class GitDiffNotebookHandler(GitHandler):
@@ -775,21 +1166,50 @@ class GitDiffNotebookHandler(GitHandler):
     """
 
     @tornado.web.authenticated
-    async def post(self):
+    async def post(self, path: str = ""):
+        """
+        POST request handler, computes the diff of a notebook.
+
+        The notebook versions are either provided as "previousContent",
+        "currentContent" and optionally "baseContent". Or they are read on the
+        server from the repository ``path`` given the notebook "filename" and
+        the "previousRef", "currentRef" and optionally "baseRef" references
+        in the format of the /content endpoint. In the latter case, a notebook
+        paired by jupytext with a text file is diffed through that file if
+        "pairing" is set; the response is then the one of /diff/file.
+        """
         data = self.get_json_body()
+        by_reference = "previousRef" in data
         try:
-            prev_content = data["previousContent"]
-            curr_content = data["currentContent"]
+            if by_reference:
+                filename = data["filename"]
+                previous = data["previousRef"]
+                current = data["currentRef"]
+            else:
+                prev_content = data["previousContent"]
+                curr_content = data["currentContent"]
         except KeyError as e:
             get_logger().error("Missing key in POST request.", exc_info=e)
             raise tornado.web.HTTPError(
                 status_code=400, reason=f"Missing POST key: {e}"
             )
         try:
-            base_content = data.get("baseContent")
-            content = await self.git.get_nbdiff(
-                prev_content, curr_content, base_content
-            )
+            if by_reference:
+                local_path, cm = self.url2localpath(path, with_contents_manager=True)
+                content = await self.git.get_nbdiff_at_references(
+                    local_path,
+                    filename,
+                    previous,
+                    current,
+                    data.get("baseRef"),
+                    cm,
+                    data.get("pairing", self.git.diff_paired_notebooks),
+                )
+            else:
+                base_content = data.get("baseContent")
+                content = await self.git.get_nbdiff(
+                    prev_content, curr_content, base_content
+                )
         except Exception as e:
             get_logger().error("Error computing notebook diff.", exc_info=e)
             self.handle_git_error(e)
@@ -870,8 +1290,16 @@ class GitTagHandler(GitHandler):
     async def post(self, path: str = ""):
         """
         POST request handler, fetches all tags in current repository.
+
+        Body: {"query": str, "prefix": bool, "sort": "name" | "date", "offset": int, "limit": int}
         """
-        result = await self.git.tags(self.url2localpath(path))
+        data = self.get_json_body() or {}
+        options = {
+            key: data[key]
+            for key in ("query", "prefix", "sort", "offset", "limit")
+            if data.get(key) is not None
+        }
+        result = await self.git.tags(self.url2localpath(path), **options)
 
         if result["code"] != 0:
             self.set_status(500)
@@ -1104,6 +1532,7 @@ def setup_handlers(web_app):
     handlers_with_path = [
         ("/add_all_unstaged", GitAddAllUnstagedHandler),
         ("/add_all_untracked", GitAddAllUntrackedHandler),
+        ("/blame", GitBlameHandler),
         ("/branch/delete", GitBranchDeleteHandler),
         ("/branch", GitBranchHandler),
         ("/changed_files", GitChangedFilesHandler),
@@ -1111,12 +1540,16 @@ def setup_handlers(web_app):
         ("/clone", GitCloneHandler),
         ("/commit", GitCommitHandler),
         ("/config", GitConfigHandler),
+        ("/conflicts", GitConflictsHandler),
         ("/content", GitContentHandler),
         ("/delete_commit", GitDeleteCommitHandler),
         ("/detailed_log", GitDetailedLogHandler),
         ("/diff", GitDiffHandler),
+        ("/diff/file", GitDiffFileHandler),
+        ("/diffnotebook", GitDiffNotebookHandler),
         ("/init", GitInitHandler),
         ("/log", GitLogHandler),
+        ("/log/search", GitLogSearchHandler),
         ("/merge", GitMergeHandler),
         ("/pull", GitPullHandler),
         ("/push", GitPushHandler),
@@ -1140,11 +1573,12 @@ def setup_handlers(web_app):
         ("/stash_apply", GitStashApplyHandler),
         ("/submodules", GitSubmodulesHandler),
         ("/check_notebooks", GitCheckNotebooksHandler),
+        ("/output_filter", GitOutputFilterHandler),
+        ("/notebook_outputs", GitNotebookOutputsHandler),
         ("/strip_notebooks", GitStripNotebooksHandler),
     ]
 
     handlers = [
-        ("/diffnotebook", GitDiffNotebookHandler),
         ("/settings", GitSettingsHandler),
         ("/known_hosts", SshHostHandler),
     ]
@@ -1,3 +1,4 @@
+import base64
 import json
 from unittest.mock import ANY, MagicMock, Mock, call, patch
 
@@ -284,6 +285,30 @@ async def test_branch_handler_localbranch(mock_git, jp_fetch, jp_root_dir):
     assert payload == {"code": 0, "branches": branch["branches"]}
 
 
+@patch("jupyterlab_git.handlers.GitBranchHandler.git", spec=Git)
+async def test_branch_handler_search(mock_git, jp_fetch, jp_root_dir):
+    # Given
+    local_path = jp_root_dir / "test_path"
+    mock_git.branch.return_value = {
+        "code": 0,
+        "branches": [],
+        "current_branch": None,
+        "total": 0,
+    }
+
+    # When
+    body = {"query": "feature", "sort": "date", "offset": 20, "limit": 10}
+    response = await jp_fetch(
+        NAMESPACE, local_path.name, "branch", body=json.dumps(body), method="POST"
+    )
+
+    # Then
+    mock_git.branch.assert_called_with(
+        str(local_path), query="feature", sort="date", offset=20, limit=10
+    )
+    assert response.code == 200
+
+
 @patch("jupyterlab_git.handlers.GitLogHandler.git", spec=Git)
 async def test_log_handler(mock_git, jp_fetch, jp_root_dir):
     # Given
@@ -325,6 +350,65 @@ async def test_log_handler_no_history_count(mock_git, jp_fetch, jp_root_dir):
     assert payload == log
 
 
+@patch("jupyterlab_git.handlers.GitLogSearchHandler.git", spec=Git)
+async def test_log_search_handler(mock_git, jp_fetch, jp_root_dir):
+    # Given
+    local_path = jp_root_dir / "test_path"
+    log = {"code": 0, "commits": []}
+    mock_git.search_log.return_value = log
+
+    # When
+    body = {"author": "alice", "file_path": "data", "limit": 10}
+    response = await jp_fetch(
+        NAMESPACE,
+        local_path.name,
+        "log",
+        "search",
+        body=json.dumps(body),
+        method="POST",
+    )
+
+    # Then
+    mock_git.search_log.assert_called_with(
+        str(local_path),
+        author="alice",
+        message=None,
+        file_path="data",
+        since=None,
+        until=None,
+        limit=10,
+        offset=0,
+    )
+
+    assert response.code == 200
+    payload = json.loads(response.body)
+    assert payload == log
+
+
+@patch("jupyterlab_git.handlers.GitDetailedLogHandler.git", spec=Git)
+async def test_detailed_log_handler_batch(mock_git, jp_fetch, jp_root_dir):
+    # Given
+    local_path = jp_root_dir / "test_path"
+    log = {"code": 0, "commits": []}
+    mock_git.detailed_logs.return_value = log
+
+    # When
+    body = {"selected_hashes": ["abc", "def"]}
+    response = await jp_fetch(
+        NAMESPACE, local_path.name, "detailed_log", body=json.dumps(body), method="POST"
+    )
+
+    # Then
+    mock_git.detailed_logs.assert_called_with(
+        str(local_path), ["abc", "def"], None, offset=0, limit=100
+    )
+    mock_git.detailed_log.assert_not_called()
+
+    assert response.code == 200
+    payload = json.loads(response.body)
+    assert payload == log
+
+
 @patch("jupyterlab_git.handlers.GitPushHandler.git", spec=Git)
 async def test_push_handler_localbranch(mock_git, jp_fetch, jp_root_dir):
     # Given
@@ -538,13 +622,12 @@ async def test_push_handler_noupstream_pass_remote_branch(
 async def test_upstream_handler_forward_slashes(mock_git, jp_fetch, jp_root_dir):
     # Given
     local_path = jp_root_dir / "test_path"
-    mock_git.get_current_branch.return_value = "foo/bar"
     upstream = {
         "code": 0,
         "remote_short_name": "origin/something",
         "remote_branch": "foo/bar",
     }
-    mock_git.get_upstream_branch.return_value = upstream
+    mock_git.get_current_upstream_branch.return_value = upstream
 
     # When
     response = await jp_fetch(
@@ -552,8 +635,7 @@ async def test_upstream_handler_forward_slashes(mock_git, jp_fetch, jp_root_dir)
     )
 
     # Then
-    mock_git.get_current_branch.assert_called_with(str(local_path))
-    mock_git.get_upstream_branch.assert_called_with(str(local_path), "foo/bar")
+    mock_git.get_current_upstream_branch.assert_called_with(str(local_path))
 
     assert response.code == 200
     payload = json.loads(response.body)
@@ -564,9 +646,8 @@ async def test_upstream_handler_forward_slashes(mock_git, jp_fetch, jp_root_dir)
 async def test_upstream_handler_localbranch(mock_git, jp_fetch, jp_root_dir):
     # Given
     local_path = jp_root_dir / "test_path"
-    mock_git.get_current_branch.return_value = "foo/bar"
     upstream = {"code": 0, "remote_short_name": ".", "remote_branch": "foo/bar"}
-    mock_git.get_upstream_branch.return_value = upstream
+    mock_git.get_current_upstream_branch.return_value = upstream
 
     # When
     response = await jp_fetch(
@@ -574,25 +655,27 @@ async def test_upstream_handler_localbranch(mock_git, jp_fetch, jp_root_dir):
     )
 
     # Then
-    mock_git.get_current_branch.assert_called_with(str(local_path))
-    mock_git.get_upstream_branch.assert_called_with(str(local_path), "foo/bar")
+    mock_git.get_current_upstream_branch.assert_called_with(str(local_path))
 
     assert response.code == 200
     payload = json.loads(response.body)
     assert payload == upstream
 
 
-@patch("jupyterlab_git_core.git.execute")
-async def test_content(mock_execute, jp_fetch, jp_root_dir):
+@patch("jupyterlab_git_core.git.read_object")
+async def test_content(mock_read_object, jp_fetch, jp_root_dir):
     # Given
     local_path = jp_root_dir / "test_path"
     filename = "my/file"
     content = "dummy content file\nwith multiple lines"
+    blob = "8f3e4b6de62a0c2ba8d3d9a0f4c6f1fd3e6ec0d4"
 
-    mock_execute.side_effect = [
-        (0, "1\t1\t{}".format(filename), ""),
-        (0, content, ""),
-    ]
+    mock_read_object.return_value = (
+        blob,
+        "blob",
+        len(content),
+        content.encode("utf-8"),
+    )
 
     # When
     body = {
@@ -607,36 +690,42 @@ async def test_content(mock_execute, jp_fetch, jp_root_dir):
     assert response.code == 200
     payload = json.loads(response.body)
     assert payload["content"] == content
-    mock_execute.assert_has_calls(
-        [
-            call(
-                [
-                    "git",
-                    "diff",
-                    "--numstat",
-                    "4b825dc642cb6eb9a060e54bf8d69288fbee4904",
-                    "previous",
-                    "--",
-                    filename,
-                ],
-                cwd=str(local_path),
-                env=None,
-                username=None,
-                password=None,
-                is_binary=False,
-            ),
-            call(
-                ["git", "show", "{}:{}".format("previous", filename)],
-                cwd=str(local_path),
-                env=None,
-                username=None,
-                password=None,
-                is_binary=False,
-            ),
-        ]
+    mock_read_object.assert_called_once_with(
+        str(local_path), "previous:{}".format(filename), ANY
     )
 
 
+@patch("jupyterlab_git_core.git.read_object")
+async def test_content_cached_per_blob(mock_read_object, jp_fetch, jp_root_dir):
+    # Given
+    local_path = jp_root_dir / "test_path"
+    filename = "my/file"
+    content = b"dummy content file\nwith multiple lines"
+    blob = "8f3e4b6de62a0c2ba8d3d9a0f4c6f1fd3e6ec0d4"
+    read = []
+
+    async def read_object(cwd, object_name, with_contents):
+        data = content if with_contents(blob, "blob", len(content)) else None
+        read.append(data is not None)
+        return blob, "blob", len(content), data
+
+    mock_read_object.side_effect = read_object
+
+    # When
+    contents = []
+    for reference in ({"git": "HEAD"}, {"special": "INDEX"}):
+        body = {"filename": filename, "reference": reference}
+        response = await jp_fetch(
+            NAMESPACE, local_path.name, "content", body=json.dumps(body), method="POST"
+        )
+        contents.append(json.loads(response.body)["content"])
+
+    # Then
+    assert contents == [content.decode("utf-8")] * 2
+    assert read == [True, False]
+    assert mock_read_object.call_args == call(str(local_path), ":" + filename, ANY)
+
+
 async def test_content_working(jp_fetch, jp_root_dir):
     # Given
     local_path = jp_root_dir / "test_path"
@@ -703,17 +792,19 @@ async def test_content_notebook_working(jp_fetch, jp_root_dir):
     assert payload["content"] == content
 
 
-@patch("jupyterlab_git_core.git.execute")
-async def test_content_index(mock_execute, jp_fetch, jp_root_dir):
+@patch("jupyterlab_git_core.git.read_object")
+async def test_content_index(mock_read_object, jp_fetch, jp_root_dir):
     # Given
     local_path = jp_root_dir / "test_path"
     filename = "my/file"
     content = "dummy content file\nwith multiple lines"
 
-    mock_execute.side_effect = [
-        (0, "1\t1\t{}".format(filename), ""),
-        (0, content, ""),
-    ]
+    mock_read_object.return_value = (
+        "8f3e4b6de62a0c2ba8d3d9a0f4c6f1fd3e6ec0d4",
+        "blob",
+        len(content),
+        content.encode("utf-8"),
+    )
 
     # When
     body = {
@@ -728,54 +819,24 @@ async def test_content_index(mock_execute, jp_fetch, jp_root_dir):
     assert response.code == 200
     payload = json.loads(response.body)
     assert payload["content"] == content
-    mock_execute.assert_has_calls(
-        [
-            call(
-                [
-                    "git",
-                    "diff",
-                    "--numstat",
-                    "--cached",
-                    "4b825dc642cb6eb9a060e54bf8d69288fbee4904",
-                    "--",
-                    filename,
-                ],
-                cwd=str(local_path),
-                env=None,
-                username=None,
-                password=None,
-                is_binary=False,
-            ),
-            call(
-                ["git", "show", "{}:{}".format("", filename)],
-                cwd=str(local_path),
-                env=None,
-                username=None,
-                password=None,
-                is_binary=False,
-            ),
-        ],
+    mock_read_object.assert_called_once_with(
+        str(local_path), ":{}".format(filename), ANY
     )
 
 
-@patch("jupyterlab_git_core.git.execute")
-async def test_content_base(mock_execute, jp_fetch, jp_root_dir):
+@patch("jupyterlab_git_core.git.read_object")
+async def test_content_base(mock_read_object, jp_fetch, jp_root_dir):
     # Given
     local_path = jp_root_dir / "test_path"
     filename = "my/file"
     content = "dummy content file\nwith multiple lines"
-    obj_ref = "915bb14609daab65e5304e59d89c626283ae49fc"
 
-    mock_execute.side_effect = [
-        (
-            0,
-            "100644 {1} 1       {0}\x00100644 285bdbc14e499b85ec407512a3bb3992fa3d4082 2 {0}\x00100644 66ac842dfb0b5c20f757111d6b3edd56d80622b4 3 {0}\x00".format(
-                filename, obj_ref
-            ),
-            "",
-        ),
-        (0, content, ""),
-    ]
+    mock_read_object.return_value = (
+        "915bb14609daab65e5304e59d89c626283ae49fc",
+        "blob",
+        len(content),
+        content.encode("utf-8"),
+    )
 
     # When
     body = {
@@ -790,25 +851,8 @@ async def test_content_base(mock_execute, jp_fetch, jp_root_dir):
     assert response.code == 200
     payload = json.loads(response.body)
     assert payload["content"] == content
-    mock_execute.assert_has_calls(
-        [
-            call(
-                ["git", "ls-files", "-u", "-z", filename],
-                cwd=str(local_path),
-                env=None,
-                username=None,
-                password=None,
-                is_binary=False,
-            ),
-            call(
-                ["git", "show", "915bb14609daab65e5304e59d89c626283ae49fc"],
-                cwd=str(local_path),
-                env=None,
-                username=None,
-                password=None,
-                is_binary=False,
-            ),
-        ]
+    mock_read_object.assert_called_once_with(
+        str(local_path), ":1:{}".format(filename), ANY
     )
 
 
@@ -837,19 +881,13 @@ async def test_content_unknown_special(mock_execute, jp_fetch, jp_root_dir):
     assert_http_error(e, 500, expected_message="unknown special ref")
 
 
-@patch("jupyterlab_git_core.git.execute")
-async def test_content_show_handled_error(mock_execute, jp_fetch, jp_root_dir):
+@patch("jupyterlab_git_core.git.read_object")
+async def test_content_show_handled_error(mock_read_object, jp_fetch, jp_root_dir):
     # Given
     local_path = jp_root_dir / "test_path"
     filename = "my/file"
 
-    mock_execute.return_value = (
-        -1,
-        "",
-        "fatal: Path '{}' does not exist (neither on disk nor in the index)".format(
-            filename
-        ),
-    )
+    mock_read_object.return_value = None
 
     # When
     body = {
@@ -866,63 +904,40 @@ async def test_content_show_handled_error(mock_execute, jp_fetch, jp_root_dir):
     assert payload["content"] == ""
 
 
-@patch("jupyterlab_git_core.git.execute")
-async def test_content_binary(mock_execute, jp_fetch, jp_root_dir):
+@patch("jupyterlab_git_core.git.read_object")
+async def test_content_binary(mock_read_object, jp_fetch, jp_root_dir):
     # Given
     local_path = jp_root_dir / "test_path"
     filename = "my/file"
+    data = b"\x89PNG\x00\x01"
 
-    mock_execute.return_value = (0, "-\t-\t{}".format(filename), "")
+    mock_read_object.return_value = (
+        "8f3e4b6de62a0c2ba8d3d9a0f4c6f1fd3e6ec0d4",
+        "blob",
+        len(data),
+        data,
+    )
 
     # When
     body = {
         "filename": filename,
         "reference": {"git": "current"},
     }
-
-    # Then
     response = await jp_fetch(
         NAMESPACE, local_path.name, "content", body=json.dumps(body), method="POST"
     )
 
-    mock_execute.assert_has_calls(
-        [
-            call(
-                [
-                    "git",
-                    "diff",
-                    "--numstat",
-                    "4b825dc642cb6eb9a060e54bf8d69288fbee4904",
-                    "current",
-                    "--",
-                    filename,
-                ],
-                cwd=str(local_path),
-                env=None,
-                username=None,
-                password=None,
-                is_binary=False,
-            ),
-            call(
-                ["git", "show", "{}:{}".format("current", filename)],
-                cwd=str(local_path),
-                env=None,
-                username=None,
-                password=None,
-                is_binary=True,
-            ),
-        ]
-    )
+    # Then
+    payload = json.loads(response.body)
+    assert base64.decodebytes(payload["content"].encode("ascii")) == data
 
 
-@patch("jupyterlab_git_core.git.execute")
-async def test_content_show_unhandled_error(mock_execute, jp_fetch, jp_root_dir):
+async def test_content_show_unhandled_error(jp_fetch, jp_root_dir):
     # Given
     local_path = jp_root_dir / "test_path"
+    local_path.mkdir()
     filename = "my/file"
 
-    mock_execute.return_value = (-1, "", "Dummy error")
-
     # When
     body = {
         "filename": filename,
@@ -934,7 +949,7 @@ async def test_content_show_unhandled_error(mock_execute, jp_fetch, jp_root_dir)
         await jp_fetch(
             NAMESPACE, local_path.name, "content", body=json.dumps(body), method="POST"
         )
-    assert_http_error(e, 500, expected_message="Dummy error")
+    assert_http_error(e, 500, expected_message="not a git repository")
 
 
 @patch("jupyterlab_git_core.git.execute")
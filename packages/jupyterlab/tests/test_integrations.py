@@ -1,8 +1,16 @@
+import base64
 import os
 import json
+import anyio
+import subprocess
+import shutil
 from pathlib import Path
+from unittest.mock import PropertyMock, patch
 
 import pytest
+import tornado
+
+from jupyterlab_git_core.git import Git
 
 
 async def test_git_show_prefix(tmp_path, jp_fetch, jp_root_dir, git_repo_factory):
@@ -57,3 +65,732 @@ async def test_git_show_prefix_symlink(
     assert response.code == 200
     payload = json.loads(response.body)
     assert payload["path"] == ""
+
+
+async def test_git_blame(jp_fetch, jp_root_dir, git_repo_factory):
+    # Given
+    repo = git_repo_factory(jp_root_dir)
+
+    # When
+    response = await jp_fetch(
+        "git",
+        repo.relative_to(jp_root_dir).as_posix(),
+        "blame",
+        body=json.dumps({"filename": "diff.ipynb"}),
+        method="POST",
+    )
+
+    # Then
+    assert response.code == 200
+    assert response.headers["Content-Type"] == "application/x-ndjson"
+    ranges = [json.loads(line) for line in response.body.decode().splitlines()]
+    assert {r["summary"] for r in ranges} == {
+        "init base branch",
+        "create local branch",
+    }
+    lines = len((repo / "diff.ipynb").read_text().splitlines())
+    assert sum(r["lines"] for r in ranges) == lines
+
+
+async def test_git_blame_unknown_file(jp_fetch, jp_root_dir, git_repo_factory):
+    # Given
+    repo = git_repo_factory(jp_root_dir)
+
+    # When
+    with pytest.raises(tornado.httpclient.HTTPClientError) as error:
+        await jp_fetch(
+            "git",
+            repo.relative_to(jp_root_dir).as_posix(),
+            "blame",
+            body=json.dumps({"filename": "unknown.py"}),
+            method="POST",
+        )
+
+    # Then
+    assert error.value.code == 500
+
+
+async def test_git_diff_file_outside_working_tree(
+    jp_fetch, jp_root_dir, git_repo_factory
+):
+    # Given
+    repo = git_repo_factory(jp_root_dir)
+    (jp_root_dir / "secret.txt").write_text("secret\n")
+    filename = os.path.relpath(jp_root_dir / "secret.txt", repo)
+
+    # When
+    with pytest.raises(tornado.httpclient.HTTPClientError) as error:
+        await jp_fetch(
+            "git",
+            repo.relative_to(jp_root_dir).as_posix(),
+            "diff",
+            "file",
+            body=json.dumps(
+                {
+                    "filename": filename,
+                    "reference": {"special": "WORKING"},
+                    "start": 1,
+                    "end": 10,
+                }
+            ),
+            method="POST",
+        )
+
+    # Then
+    assert error.value.code == 400
+
+
+async def test_git_diff_file(jp_fetch, jp_root_dir, git_repo_factory):
+    # Given
+    repo = git_repo_factory(jp_root_dir)
+    lines = [f"line {i}" for i in range(1, 21)]
+    (repo / "data.csv").write_text("\n".join(lines) + "\n")
+    subprocess.run(["git", "add", "data.csv"], cwd=repo, check=True)
+    lines[9] = "changed"
+    (repo / "data.csv").write_text("\n".join(lines) + "\n")
+
+    # When
+    response = await jp_fetch(
+        "git",
+        repo.relative_to(jp_root_dir).as_posix(),
+        "diff",
+        "file",
+        body=json.dumps(
+            {
+                "filename": "data.csv",
+                "previous": {"special": "INDEX"},
+                "current": {"special": "WORKING"},
+                "context": 1,
+            }
+        ),
+        method="POST",
+    )
+    expanded = await jp_fetch(
+        "git",
+        repo.relative_to(jp_root_dir).as_posix(),
+        "diff",
+        "file",
+        body=json.dumps(
+            {
+                "filename": "data.csv",
+                "reference": {"special": "INDEX"},
+                "start": 7,
+                "end": 9,
+            }
+        ),
+        method="POST",
+    )
+
+    # Then
+    assert response.code == 200
+    assert json.loads(response.body)["hunks"] == [
+        {
+            "old_start": 9,
+            "old_lines": 3,
+            "new_start": 9,
+            "new_lines": 3,
+            "header": "line 8",
+            "lines": [" line 9", "-line 10", "+changed", " line 11"],
+        }
+    ]
+    assert json.loads(expanded.body) == {
+        "code": 0,
+        "lines": ["line 7", "line 8", "line 9"],
+    }
+
+
+async def test_git_content_raw(jp_fetch, jp_root_dir, git_repo_factory):
+    # Given
+    repo = git_repo_factory(jp_root_dir)
+    content = bytes(range(256)) * 1024
+    (repo / "data.bin").write_bytes(content)
+    subprocess.run(["git", "add", "data.bin"], cwd=repo, check=True)
+    (repo / "data.bin").write_bytes(b"working version")
+    path = repo.relative_to(jp_root_dir).as_posix()
+
+    # When
+    index = await jp_fetch(
+        "git", path, "content", params={"filename": "data.bin", "special": "INDEX"}
+    )
+    partial = await jp_fetch(
+        "git",
+        path,
+        "content",
+        params={"filename": "data.bin", "special": "INDEX"},
+        headers={"Range": "bytes=100000-100009"},
+    )
+    working = await jp_fetch(
+        "git",
+        path,
+        "content",
+        params={"filename": "data.bin", "special": "WORKING"},
+        headers={"Range": "bytes=-7"},
+    )
+
+    # Then
+    assert index.code == 200
+    assert index.headers["Content-Type"] == "application/octet-stream"
+    assert index.body == content
+    assert partial.code == 206
+    assert partial.headers["Content-Range"] == f"bytes 100000-100009/{len(content)}"
+    assert partial.body == content[100000:100010]
+    assert working.code == 206
+    assert working.body == b"version"
+
+
+@pytest.mark.parametrize(
+    "filename, status",
+    [
+        # Within the server root but outside the repository
+        ("../secret.txt", 400),
+        ("../../secret.txt", 404),
+        (".hidden.txt", 404),
+        (".git/config", 404),
+    ],
+)
+async def test_git_content_raw_forbidden(
+    filename, status, jp_fetch, jp_root_dir, git_repo_factory
+):
+    # Given
+    repo = git_repo_factory(jp_root_dir)
+    (repo.parent / "secret.txt").write_text("secret\n")
+    (repo / ".hidden.txt").write_text("hidden\n")
+
+    # When
+    with pytest.raises(tornado.httpclient.HTTPClientError) as error:
+        await jp_fetch(
+            "git",
+            repo.relative_to(jp_root_dir).as_posix(),
+            "content",
+            params={"filename": filename, "special": "WORKING"},
+        )
+
+    # Then
+    assert error.value.code == status
+
+
+async def test_git_content_size_limit(jp_fetch, jp_root_dir, git_repo_factory):
+    # Given
+    repo = git_repo_factory(jp_root_dir)
+    path = repo.relative_to(jp_root_dir).as_posix()
+    (repo / "big.txt").write_text("x" * 100)
+
+    # When
+    with patch.object(
+        Git, "content_size_limit", new_callable=PropertyMock, return_value=10
+    ):
+        raw = await jp_fetch(
+            "git",
+            path,
+            "content",
+            params={"filename": "big.txt", "special": "WORKING"},
+        )
+        response = await jp_fetch(
+            "git",
+            path,
+            "content",
+            body=json.dumps(
+                {"filename": "big.txt", "reference": {"special": "WORKING"}}
+            ),
+            method="POST",
+        )
+
+    # Then
+    expected = {
+        "code": 0,
+        "content": None,
+        "size": 100,
+        "content_type": "text/plain",
+        "too_large": True,
+    }
+    assert json.loads(raw.body) == expected
+    assert json.loads(response.body) == expected
+
+
+@pytest.mark.parametrize(
+    "reference", ({"git": "HEAD"}, {"special": "INDEX"}, {"git": "unknown"})
+)
+async def test_git_content_single_process(
+    reference, jp_fetch, jp_root_dir, git_repo_factory
+):
+    # Given
+    repo = git_repo_factory(jp_root_dir)
+    open_process = anyio.open_process
+
+    # When
+    with patch(
+        "jupyterlab_git_core.git.anyio.open_process", side_effect=open_process
+    ) as mock_open_process, patch("jupyterlab_git_core.git.execute") as mock_execute:
+        response = await jp_fetch(
+            "git",
+            repo.relative_to(jp_root_dir).as_posix(),
+            "content",
+            body=json.dumps({"filename": "diff.ipynb", "reference": reference}),
+            method="POST",
+        )
+
+    # Then
+    assert response.code == 200
+    assert mock_open_process.call_count == 1
+    mock_execute.assert_not_called()
+    content = json.loads(response.body)["content"]
+    if "unknown" in reference.values():
+        assert content == ""
+    else:
+        assert content == (repo / "diff.ipynb").read_bytes().decode("utf-8")
+
+
+async def test_git_diff_notebook_by_reference(jp_fetch, jp_root_dir, git_repo_factory):
+    # Given
+    repo = git_repo_factory(jp_root_dir)
+    path = repo.relative_to(jp_root_dir).as_posix()
+    contents = [
+        subprocess.run(
+            ["git", "show", f"{ref}:diff.ipynb"],
+            cwd=repo,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        for ref in ("master", "local")
+    ]
+
+    # When
+    by_reference = await jp_fetch(
+        "git",
+        path,
+        "diffnotebook",
+        body=json.dumps(
+            {
+                "filename": "diff.ipynb",
+                "previousRef": {"git": "master"},
+                "currentRef": {"git": "local"},
+            }
+        ),
+        method="POST",
+    )
+    by_content = await jp_fetch(
+        "git",
+        "diffnotebook",
+        body=json.dumps(
+            {"previousContent": contents[0], "currentContent": contents[1]}
+        ),
+        method="POST",
+    )
+
+    # Then
+    assert by_reference.code == 200
+    result = json.loads(by_reference.body)
+    assert result["diff"]
+    assert result == json.loads(by_content.body)
+
+
+async def test_git_conflicts(jp_fetch, jp_root_dir, git_repo_factory):
+    # Given
+    repo = git_repo_factory(jp_root_dir)
+    (repo / "notes.txt").write_text("base\n")
+    subprocess.run(["git", "add", "notes.txt"], cwd=repo, check=True)
+    subprocess.run(["git", "commit", "-qm", "notes"], cwd=repo, check=True)
+    subprocess.run(["git", "checkout", "-q", "remote-conflict"], cwd=repo, check=True)
+    (repo / "notes.txt").write_text("theirs\n")
+    shutil.copy(repo / "diff.ipynb", repo / "added.ipynb")
+    subprocess.run(["git", "add", "notes.txt", "added.ipynb"], cwd=repo, check=True)
+    subprocess.run(["git", "commit", "-qm", "theirs notes"], cwd=repo, check=True)
+    subprocess.run(["git", "checkout", "-q", "local"], cwd=repo, check=True)
+    (repo / "notes.txt").write_text("ours\n")
+    # Added on both sides with different contents
+    shutil.copy(repo / "diff.ipynb", repo / "added.ipynb")
+    subprocess.run(["git", "add", "added.ipynb"], cwd=repo, check=True)
+    subprocess.run(["git", "commit", "-qam", "our notes"], cwd=repo, check=True)
+    subprocess.run(["git", "merge", "remote-conflict"], cwd=repo)
+
+    # When
+    response = await jp_fetch(
+        "git",
+        repo.relative_to(jp_root_dir).as_posix(),
+        "conflicts",
+        body=json.dumps({"contents": True}),
+        method="POST",
+    )
+
+    # Then
+    assert response.code == 200
+    files = {f["path"]: f for f in json.loads(response.body)["files"]}
+    assert set(files) == {"added.ipynb", "merge-conflict.ipynb", "notes.txt"}
+    notebook = files["merge-conflict.ipynb"]
+    assert all(notebook[stage] for stage in ("base", "ours", "theirs"))
+    assert notebook["merge"]["merge_decisions"]
+    added = files["added.ipynb"]
+    assert added["base"] is None
+    assert "merge" not in added
+    assert added["diff"]["diff"]
+    notes = files["notes.txt"]
+    assert notes["base"] is None
+    assert notes["contents"] == {
+        "base": None,
+        "ours": {"content": "ours\n", "is_binary": False, "size": 5},
+        "theirs": {"content": "theirs\n", "is_binary": False, "size": 7},
+    }
+
+
+async def test_git_conflicts_binary_and_empty_base(
+    jp_fetch, jp_root_dir, git_repo_factory
+):
+    # Given
+    repo = git_repo_factory(jp_root_dir)
+
+    def commit(notebook, data, message):
+        content = (repo / notebook).read_text() if notebook else ""
+        (repo / "empty.ipynb").write_text(content)
+        (repo / "data.bin").write_bytes(data)
+        subprocess.run(["git", "add", "empty.ipynb", "data.bin"], cwd=repo, check=True)
+        subprocess.run(["git", "commit", "-qm", message], cwd=repo, check=True)
+
+    commit(None, b"\0base", "base")
+    subprocess.run(["git", "checkout", "-qb", "other"], cwd=repo, check=True)
+    commit("diff.ipynb", b"\0theirs", "theirs")
+    subprocess.run(["git", "checkout", "-q", "local"], cwd=repo, check=True)
+    commit("merge-conflict.ipynb", b"\0ours", "ours")
+    subprocess.run(["git", "merge", "other"], cwd=repo)
+
+    # When
+    response = await jp_fetch(
+        "git",
+        repo.relative_to(jp_root_dir).as_posix(),
+        "conflicts",
+        body=json.dumps({"contents": True}),
+        method="POST",
+    )
+
+    # Then
+    files = {f["path"]: f for f in json.loads(response.body)["files"]}
+    notebook = files["empty.ipynb"]
+    assert notebook["base"] is not None
+    assert "merge" not in notebook
+    assert notebook["diff"]["diff"]
+    assert files["data.bin"]["contents"]["ours"] == {
+        "content": base64.encodebytes(b"\0ours").decode("ascii"),
+        "is_binary": True,
+        "size": 5,
+    }
+
+
+async def test_git_conflicts_size_limit(jp_fetch, jp_root_dir, git_repo_factory):
+    # Given
+    repo = git_repo_factory(jp_root_dir)
+    subprocess.run(["git", "merge", "remote-conflict"], cwd=repo)
+
+    # When
+    with patch.object(
+        Git, "content_size_limit", new_callable=PropertyMock, return_value=10
+    ):
+        response = await jp_fetch(
+            "git",
+            repo.relative_to(jp_root_dir).as_posix(),
+            "conflicts",
+            body=json.dumps({"contents": True}),
+            method="POST",
+        )
+
+    # Then
+    (notebook,) = json.loads(response.body)["files"]
+    assert notebook["too_large"]
+    assert "merge" not in notebook
+    assert notebook["sizes"] == {
+        stage: len(
+            subprocess.run(
+                ["git", "cat-file", "blob", notebook[stage]],
+                cwd=repo,
+                capture_output=True,
+                check=True,
+            ).stdout
+        )
+        for stage in ("base", "ours", "theirs")
+    }
+
+
+async def test_git_check_notebooks(jp_fetch, jp_root_dir, git_repo_factory):
+    # Given
+    repo = git_repo_factory(jp_root_dir)
+    output = {"output_type": "stream", "name": "stdout", "text": ["1\n"]}
+    for name, outputs in (("clean.ipynb", []), ("dirty.ipynb", [output])):
+        notebook = {
+            "cells": [
+                {"cell_type": "markdown", "metadata": {}, "source": '# {[\\"'},
+                {
+                    "cell_type": "code",
+                    "execution_count": 1,
+                    "metadata": {},
+                    "outputs": outputs,
+                    "source": "print(1)",
+                },
+            ],
+            "metadata": {},
+            "nbformat": 4,
+            "nbformat_minor": 5,
+        }
+        (repo / name).write_text(json.dumps(notebook))
+    subprocess.run(["git", "add", "clean.ipynb", "dirty.ipynb"], cwd=repo, check=True)
+    # The staged notebook is checked, not the working tree one
+    (repo / "dirty.ipynb").write_text((repo / "clean.ipynb").read_text())
+
+    # When
+    response = await jp_fetch(
+        "git",
+        repo.relative_to(jp_root_dir).as_posix(),
+        "check_notebooks",
+        params={"sizes": "true"},
+    )
+
+    # Then
+    assert response.code == 200
+    assert json.loads(response.body) == {
+        "notebooks_with_outputs": ["dirty.ipynb"],
+        "has_outputs": True,
+        "output_sizes": {
+            "clean.ipynb": 0,
+            "dirty.ipynb": len(json.dumps([output])),
+        },
+    }
+
+
+async def test_git_strip_notebooks(jp_fetch, jp_root_dir, git_repo_factory):
+    # Given
+    repo = git_repo_factory(jp_root_dir)
+    notebooks = [f"notebook{index}.ipynb" for index in range(6)]
+    for name in notebooks:
+        notebook = {
+            "cells": [
+                {
+                    "cell_type": "code",
+                    "execution_count": 3,
+                    "metadata": {"scrolled": True, "tags": []},
+                    "outputs": [
+                        {"output_type": "stream", "name": "stdout", "text": ["1\n"]}
+                    ],
+                    "source": "print(1)",
+                },
+            ],
+            "metadata": {},
+            "nbformat": 4,
+            "nbformat_minor": 5,
+        }
+        (repo / name).write_text(json.dumps(notebook))
+
+    # When
+    response = await jp_fetch(
+        "git",
+        repo.relative_to(jp_root_dir).as_posix(),
+        "strip_notebooks",
+        body=json.dumps({"notebooks": notebooks}),
+        method="POST",
+    )
+
+    # Then
+    assert response.code == 200
+    staged = subprocess.run(
+        ["git", "diff", "--cached", "--name-only"],
+        cwd=repo,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    assert staged.stdout.splitlines() == notebooks
+    for name in notebooks:
+        cell = json.loads((repo / name).read_text())["cells"][0]
+        assert cell["outputs"] == []
+        assert cell["execution_count"] is None
+        assert cell["metadata"] == {"tags": []}
+
+
+async def test_git_output_filter(jp_fetch, jp_root_dir, git_repo_factory):
+    # Given
+    repo = git_repo_factory(jp_root_dir)
+    notebook = {
+        "cells": [
+            {
+                "cell_type": "code",
+                "execution_count": 1,
+                "metadata": {},
+                "outputs": [
+                    {"output_type": "stream", "name": "stdout", "text": ["1\n"]}
+                ],
+                "source": "print(1)",
+            },
+        ],
+        "metadata": {},
+        "nbformat": 4,
+        "nbformat_minor": 4,
+    }
+    (repo / "notebook.ipynb").write_text(json.dumps(notebook))
+    local_path = repo.relative_to(jp_root_dir).as_posix()
+
+    # When
+    response = await jp_fetch(
+        "git",
+        local_path,
+        "output_filter",
+        body=json.dumps({"enabled": True}),
+        method="POST",
+    )
+    subprocess.run(["git", "add", "notebook.ipynb"], cwd=repo, check=True)
+
+    # Then
+    assert response.code == 200
+    response = await jp_fetch("git", local_path, "output_filter")
+    assert json.loads(response.body) == {"code": 0, "enabled": True}
+    staged = subprocess.run(
+        ["git", "show", ":notebook.ipynb"],
+        cwd=repo,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    assert json.loads(staged.stdout)["cells"][0]["outputs"] == []
+    # The working tree keeps the outputs
+    assert json.loads((repo / "notebook.ipynb").read_text()) == notebook
+
+    response = await jp_fetch(
+        "git",
+        local_path,
+        "output_filter",
+        body=json.dumps({"enabled": False}),
+        method="POST",
+    )
+    assert json.loads(response.body) == {"code": 0, "enabled": False}
+    response = await jp_fetch("git", local_path, "output_filter")
+    assert json.loads(response.body) == {"code": 0, "enabled": False}
+
+
+async def test_git_notebook_outputs(jp_fetch, jp_root_dir, git_repo_factory):
+    # Given
+    repo = git_repo_factory(jp_root_dir)
+
+    def write_notebook(name, *texts):
+        cells = [
+            {
+                "cell_type": "code",
+                "execution_count": None,
+                "metadata": {},
+                "outputs": (
+                    [{"output_type": "stream", "name": "stdout", "text": text}]
+                    if text
+                    else []
+                ),
+                "source": "",
+            }
+            for text in texts
+        ]
+        notebook = {"cells": cells, "metadata": {}, "nbformat": 4, "nbformat_minor": 4}
+        (repo / name).write_text(json.dumps(notebook))
+        subprocess.run(["git", "add", name], cwd=repo, check=True)
+        subprocess.run(["git", "commit", "-qm", name], cwd=repo, check=True)
+        return [len(json.dumps(c["outputs"])) if c["outputs"] else 0 for c in cells]
+
+    first = write_notebook("heavy.ipynb", "", "x" * 1000, "x" * 10)
+    second = write_notebook("heavy.ipynb", "x" * 100, "", "")
+    light = write_notebook("light.ipynb", "x")
+    local_path = repo.relative_to(jp_root_dir).as_posix()
+
+    # When
+    tree = await jp_fetch(
+        "git", local_path, "notebook_outputs", body="{}", method="POST"
+    )
+    history = await jp_fetch(
+        "git",
+        local_path,
+        "notebook_outputs",
+        body=json.dumps({"history": True, "max_count": 3}),
+        method="POST",
+    )
+    recent = await jp_fetch(
+        "git",
+        local_path,
+        "notebook_outputs",
+        body=json.dumps({"history": True, "max_count": 2}),
+        method="POST",
+    )
+
+    # Then
+    tree = json.loads(tree.body)
+    sizes = {f["path"]: f["output_bytes"] for f in tree["files"]}
+    assert sizes["heavy.ipynb"] == second[0]
+    assert sizes["light.ipynb"] == light[0]
+    assert "commits" not in tree
+    history = json.loads(history.body)
+    assert history["output_bytes"] == sum(first) + sum(second) + sum(light)
+    heaviest = history["files"][0]
+    assert heaviest["cells"] == [
+        {"index": 1, "output_bytes": first[1]},
+        {"index": 2, "output_bytes": first[2]},
+    ]
+    # The second commit shrank the outputs of the notebook
+    assert [c["output_bytes"] for c in history["commits"]] == [
+        sum(first),
+        sum(light),
+    ]
+    assert history["commits"][0]["commit"] == heaviest["commit"]
+    # The parent versions are scanned but not reported
+    recent = json.loads(recent.body)
+    assert recent["output_bytes"] == sum(second) + sum(light)
+    assert [f["path"] for f in recent["files"]] == ["heavy.ipynb", "light.ipynb"]
+    assert [c["output_bytes"] for c in recent["commits"]] == [sum(light)]
+
+
+async def test_git_diff_paired_notebook(jp_fetch, jp_root_dir, git_repo_factory):
+    # Given
+    repo = git_repo_factory(jp_root_dir)
+    header = (
+        "# ---\n# jupyter:\n#   jupytext:\n#     formats: ipynb,py:percent\n# ---\n"
+    )
+    (repo / "paired.ipynb").write_text(
+        json.dumps({"cells": [], "metadata": {}, "nbformat": 4, "nbformat_minor": 4})
+    )
+    (repo / "paired.py").write_text(header + "# %%\na = 1\n")
+    # Not paired as its header does not list the ipynb format
+    (repo / "paired.md").write_text(
+        "---\njupyter:\n  jupytext:\n    formats: md\n---\n"
+    )
+    subprocess.run(["git", "add", "."], cwd=repo, check=True)
+    subprocess.run(["git", "commit", "-qm", "paired"], cwd=repo, check=True)
+    (repo / "paired.py").write_text(header + "# %%\na = 2\n")
+    local_path = repo.relative_to(jp_root_dir).as_posix()
+
+    # When
+    response = await jp_fetch(
+        "git",
+        local_path,
+        "diffnotebook",
+        body=json.dumps(
+            {
+                "filename": "paired.ipynb",
+                "previousRef": {"git": "HEAD"},
+                "currentRef": {"special": "WORKING"},
+                "pairing": True,
+            }
+        ),
+        method="POST",
+    )
+    content = await jp_fetch(
+        "git",
+        local_path,
+        "content",
+        body=json.dumps(
+            {
+                "filename": "paired.ipynb",
+                "reference": {"git": "HEAD"},
+                "pairing": True,
+            }
+        ),
+        method="POST",
+    )
+
+    # Then
+    result = json.loads(response.body)
+    assert result["paired_file"] == "paired.py"
+    assert result["hunks"][0]["lines"][-2:] == ["-a = 1", "+a = 2"]
+    assert json.loads(content.body) == {
+        "code": 0,
+        "content": header + "# %%\na = 1\n",
+        "paired_file": "paired.py",
+    }
@@ -104,3 +104,15 @@ async def test_git_get_settings_no_jlab(mock_execute, jp_fetch):
         "gitVersion": git_version,
         "serverVersion": str(parse(__version__)),
     }
+
+
+async def test_git_closed_on_shutdown(jp_serverapp):
+    # Given
+    git = jp_serverapp.web_app.settings["git"]
+
+    # When
+    with patch.object(git, "close") as mock_close:
+        await jp_serverapp.cleanup_extensions()
+
+    # Then
+    mock_close.assert_called_once_with()